@@ -0,0 +1,75 @@
+"""stock lookup indexes and unique stock_store balance
+
+Revision ID: 0001_stock_lookup_indexes
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+Adiciona os índices compostos das consultas mais frequentes de estoque:
+- stock_store(store_id, product_id): constraint única, que também serve de
+  índice para get_or_create_stock, validações e /stock/stores/{id}/products/{id}
+- stock_movements(reference_type, reference_id): /movements/by-reference
+- stock_movements(store_id, product_id, movement_date): listagem filtrada de /movements
+
+Saldos duplicados existentes são consolidados (soma das quantidades na linha de
+menor id) antes da criação da constraint.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_stock_lookup_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Consolidar saldos duplicados por (store_id, product_id)
+    op.execute(
+        """
+        UPDATE stock_store
+        SET quantity = (
+            SELECT SUM(s2.quantity) FROM stock_store s2
+            WHERE s2.store_id = stock_store.store_id
+              AND s2.product_id = stock_store.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM stock_store
+            GROUP BY store_id, product_id
+            HAVING COUNT(*) > 1
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM stock_store
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM stock_store
+            GROUP BY store_id, product_id
+        )
+        """
+    )
+
+    with op.batch_alter_table('stock_store') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_stock_store_store_product', ['store_id', 'product_id']
+        )
+
+    op.create_index(
+        'ix_stock_movements_reference',
+        'stock_movements',
+        ['reference_type', 'reference_id'],
+    )
+    op.create_index(
+        'ix_stock_movements_store_product_date',
+        'stock_movements',
+        ['store_id', 'product_id', 'movement_date'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_movements_store_product_date', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_reference', table_name='stock_movements')
+
+    with op.batch_alter_table('stock_store') as batch_op:
+        batch_op.drop_constraint('uq_stock_store_store_product', type_='unique')
@@ -0,0 +1,56 @@
+"""materialized stock summary per store and category
+
+Revision ID: 0002_stock_summary
+Revises: 0001_stock_lookup_indexes
+Create Date: 2026-10-17 11:00:00.000000
+
+Cria a tabela stock_summary (unidades e valor de custo/venda por loja e
+categoria), mantida incrementalmente pelo StockService, e a preenche a partir
+dos saldos atuais de stock_store.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_stock_summary'
+down_revision = '0001_stock_lookup_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_summary',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_units', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cost_value', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('sale_value', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('store_id', 'category_id', name='uq_stock_summary_store_category'),
+    )
+    op.create_index('ix_stock_summary_id', 'stock_summary', ['id'])
+
+    # Carga inicial a partir dos saldos existentes
+    op.execute(
+        """
+        INSERT INTO stock_summary
+            (store_id, category_id, total_units, cost_value, sale_value, updated_at)
+        SELECT s.store_id,
+               COALESCE(p.category_id, 0),
+               SUM(s.quantity),
+               SUM(s.quantity * p.cost_price),
+               SUM(s.quantity * p.sale_price),
+               CURRENT_TIMESTAMP
+        FROM stock_store s
+        JOIN products p ON p.id = s.product_id
+        GROUP BY s.store_id, COALESCE(p.category_id, 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_summary_id', table_name='stock_summary')
+    op.drop_table('stock_summary')
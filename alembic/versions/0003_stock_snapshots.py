@@ -0,0 +1,54 @@
+"""stock snapshots for point-in-time balances
+
+Revision ID: 0003_stock_snapshots
+Revises: 0002_stock_summary
+Create Date: 2026-10-17 12:00:00.000000
+
+Cria as tabelas de fotografias periódicas de saldos (stock_snapshots e
+stock_snapshot_items), usadas por /stock/as-of para reconstruir saldos em uma
+data aplicando apenas as movimentações posteriores à fotografia.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_stock_snapshots'
+down_revision = '0002_stock_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.Column('last_movement_id', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_stock_snapshots_id', 'stock_snapshots', ['id'])
+    op.create_index('ix_stock_snapshots_taken_at', 'stock_snapshots', ['taken_at'])
+
+    op.create_table(
+        'stock_snapshot_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('snapshot_id', sa.Integer(), sa.ForeignKey('stock_snapshots.id'), nullable=False),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), nullable=False),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_stock_snapshot_items_id', 'stock_snapshot_items', ['id'])
+    op.create_index(
+        'ix_stock_snapshot_items_snapshot_store',
+        'stock_snapshot_items',
+        ['snapshot_id', 'store_id', 'product_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_snapshot_items_snapshot_store', table_name='stock_snapshot_items')
+    op.drop_index('ix_stock_snapshot_items_id', table_name='stock_snapshot_items')
+    op.drop_table('stock_snapshot_items')
+    op.drop_index('ix_stock_snapshots_taken_at', table_name='stock_snapshots')
+    op.drop_index('ix_stock_snapshots_id', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
@@ -0,0 +1,41 @@
+"""idempotency keys for document creation
+
+Revision ID: 0004_idempotency_keys
+Revises: 0003_stock_snapshots
+Create Date: 2026-10-17 14:00:00.000000
+
+Cria a tabela idempotency_keys, que guarda a resposta original de POST /sales,
+/entries e /internal-distributions por (scope, key) para que repetições com o
+mesmo Idempotency-Key não movimentem o estoque novamente.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_idempotency_keys'
+down_revision = '0003_stock_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('scope', sa.String(length=50), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
+    op.create_index('ix_idempotency_keys_id', 'idempotency_keys', ['id'])
+    op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+    op.drop_index('ix_idempotency_keys_id', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,37 @@
+"""table version counters for conditional GETs
+
+Revision ID: 0005_table_versions
+Revises: 0004_idempotency_keys
+Create Date: 2026-10-17 16:00:00.000000
+
+Cria a tabela table_versions (um contador por tabela versionada, usado nos ETags
+de GET /products e /stores/{id}) e o índice de stock_store.updated_at, usado no
+ETag de GET /stock.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_table_versions'
+down_revision = '0004_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(table_versions, [
+        {'table_name': 'products', 'version': 0},
+        {'table_name': 'stores', 'version': 0},
+    ])
+    op.create_index('ix_stock_store_updated_at', 'stock_store', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_store_updated_at', table_name='stock_store')
+    op.drop_table('table_versions')
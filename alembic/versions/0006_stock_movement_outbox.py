@@ -0,0 +1,45 @@
+"""transactional outbox for stock movements
+
+Revision ID: 0006_stock_movement_outbox
+Revises: 0005_table_versions
+Create Date: 2026-10-17 18:00:00.000000
+
+Cria outbox_events (movimentações pendentes de entrega, com sequência por loja)
+e outbox_sequences (último número de sequência de cada loja).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_stock_movement_outbox'
+down_revision = '0005_table_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('sequence', sa.BigInteger(), nullable=False),
+        sa.Column('movement_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.UniqueConstraint('store_id', 'sequence', name='uq_outbox_events_store_sequence'),
+    )
+    op.create_index('ix_outbox_events_pending', 'outbox_events', ['dispatched_at', 'id'])
+    op.create_table(
+        'outbox_sequences',
+        sa.Column('store_id', sa.Integer(), primary_key=True),
+        sa.Column('last_sequence', sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_sequences')
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,32 @@
+"""product revision for delta sync
+
+Revision ID: 0007_product_revision
+Revises: 0006_stock_movement_outbox
+Create Date: 2026-10-17 19:00:00.000000
+
+Adiciona products.revision (versão de products em que o produto mudou pela
+última vez, usada por GET /sync) e o índice (revision, id) para a paginação.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_product_revision'
+down_revision = '0006_stock_movement_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'products',
+        sa.Column('revision', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_products_revision_id', 'products', ['revision', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_revision_id', table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('revision')
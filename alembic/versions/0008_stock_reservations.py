@@ -0,0 +1,53 @@
+"""stock reservations
+
+Revision ID: 0008_stock_reservations
+Revises: 0007_product_revision
+Create Date: 2026-10-17 20:00:00.000000
+
+Adiciona stock_store.reserved (soma das reservas ativas) e a tabela
+stock_reservations, com os índices da varredura de vencidas e da busca por
+documento.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_stock_reservations'
+down_revision = '0007_product_revision'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'stock_store',
+        sa.Column('reserved', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'stock_reservations',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), nullable=False),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('reference_type', sa.String(50), nullable=True),
+        sa.Column('reference_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'ix_stock_reservations_status_expires', 'stock_reservations', ['status', 'expires_at'],
+    )
+    op.create_index(
+        'ix_stock_reservations_reference', 'stock_reservations', ['reference_type', 'reference_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_reservations_reference', table_name='stock_reservations')
+    op.drop_index('ix_stock_reservations_status_expires', table_name='stock_reservations')
+    op.drop_table('stock_reservations')
+    with op.batch_alter_table('stock_store') as batch_op:
+        batch_op.drop_column('reserved')
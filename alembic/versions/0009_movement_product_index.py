@@ -0,0 +1,28 @@
+"""stock movement index for reconciliation
+
+Revision ID: 0009_movement_product_index
+Revises: 0008_stock_reservations
+Create Date: 2026-10-17 21:00:00.000000
+
+Adiciona ix_stock_movements_product_store (product_id, store_id), usado pela
+reconciliação do razão com os saldos, que agrega stock_movements por faixas de
+produtos.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_movement_product_index'
+down_revision = '0008_stock_reservations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_stock_movements_product_store', 'stock_movements', ['product_id', 'store_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_movements_product_store', table_name='stock_movements')
@@ -0,0 +1,189 @@
+"""partition stock_movements by month and archive tables
+
+Revision ID: 0010_partition_stock_movements
+Revises: 0009_movement_product_index
+Create Date: 2026-10-17 22:00:00.000000
+
+Cria stock_movement_archives, stock_movement_archive_totals e
+stock_movement_archive_references (registro dos meses arquivados, efeito líquido
+de cada um, usado pela reconciliação, e documentos com movimentações arquivadas,
+que não podem mais ser estornados). Tabelas já criadas pela aplicação
+(Base.metadata.create_all) são mantidas.
+
+Só no PostgreSQL: recria stock_movements particionada por RANGE (movement_date),
+com uma partição por mês desde a movimentação mais antiga até 3 meses à frente
+e uma partição DEFAULT. A chave primária passa a ser (id, movement_date), exigência
+do particionamento; o id continua vindo da mesma sequência. As linhas são copiadas
+com INSERT ... SELECT, em uma transação: em bases grandes, rodar na janela de
+manutenção. Nos demais bancos, stock_movements não muda.
+
+O downgrade volta a tabela comum, mas não restaura meses já arquivados.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_partition_stock_movements'
+down_revision = '0009_movement_product_index'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, product_id, store_id, movement_type, quantity, movement_date, "
+    "reference_id, reference_type, stock_before, stock_after, notes"
+)
+COLUMN_DEFINITIONS = """
+    id INTEGER NOT NULL DEFAULT nextval('stock_movements_id_seq'),
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    store_id INTEGER NOT NULL REFERENCES stores (id),
+    movement_type VARCHAR(50) NOT NULL,
+    quantity INTEGER NOT NULL,
+    movement_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    reference_id INTEGER,
+    reference_type VARCHAR(50),
+    stock_before INTEGER,
+    stock_after INTEGER,
+    notes VARCHAR(500)
+"""
+INDEXES = (
+    ('ix_stock_movements_id', 'id'),
+    ('ix_stock_movements_reference', 'reference_type, reference_id'),
+    ('ix_stock_movements_store_product_date', 'store_id, product_id, movement_date'),
+    ('ix_stock_movements_product_store', 'product_id, store_id'),
+)
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == 'postgresql'
+
+
+def _create_indexes() -> None:
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON stock_movements ({columns})")
+
+
+def _drop_indexes() -> None:
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _has_table(name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    # Banco criado pela aplicação (create_all) e depois carimbado em 0009
+    if _has_table('stock_movement_archives'):
+        _partition()
+        return
+
+    op.create_table(
+        'stock_movement_archives',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('period_start', sa.DateTime(), nullable=False, unique=True),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('path', sa.String(500), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('min_movement_id', sa.Integer(), nullable=True),
+        sa.Column('max_movement_id', sa.Integer(), nullable=True),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        'stock_movement_archive_totals',
+        sa.Column(
+            'archive_id', sa.Integer(), sa.ForeignKey('stock_movement_archives.id'), primary_key=True,
+        ),
+        sa.Column('store_id', sa.Integer(), primary_key=True),
+        sa.Column('product_id', sa.Integer(), primary_key=True),
+        sa.Column('net_quantity', sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        'stock_movement_archive_references',
+        sa.Column(
+            'archive_id', sa.Integer(), sa.ForeignKey('stock_movement_archives.id'), primary_key=True,
+        ),
+        sa.Column('reference_type', sa.String(50), primary_key=True),
+        sa.Column('reference_id', sa.Integer(), primary_key=True),
+    )
+    op.create_index(
+        'ix_stock_movement_archive_references_reference', 'stock_movement_archive_references',
+        ['reference_type', 'reference_id'],
+    )
+    _partition()
+
+
+def _partition() -> None:
+    if not _is_postgresql():
+        return
+
+    op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_unpartitioned")
+    op.execute(
+        "ALTER TABLE stock_movements_unpartitioned "
+        "RENAME CONSTRAINT stock_movements_pkey TO stock_movements_unpartitioned_pkey"
+    )
+    _drop_indexes()
+    op.execute(f"""
+        CREATE TABLE stock_movements ({COLUMN_DEFINITIONS},
+            CONSTRAINT stock_movements_pkey PRIMARY KEY (id, movement_date)
+        ) PARTITION BY RANGE (movement_date)
+    """)
+    op.execute("CREATE TABLE stock_movements_default PARTITION OF stock_movements DEFAULT")
+    op.execute("""
+        DO $$
+        DECLARE
+            month timestamp := date_trunc('month', COALESCE(
+                (SELECT min(movement_date) FROM stock_movements_unpartitioned), now()
+            ));
+            last_month timestamp := date_trunc('month', now()) + interval '3 months';
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF stock_movements FOR VALUES FROM (%L) TO (%L)',
+                    'stock_movements_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute(
+        f"INSERT INTO stock_movements ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM stock_movements_unpartitioned"
+    )
+    op.execute("ALTER SEQUENCE stock_movements_id_seq OWNED BY stock_movements.id")
+    op.execute("DROP TABLE stock_movements_unpartitioned")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    if _is_postgresql():
+        op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_partitioned")
+        op.execute(
+            "ALTER TABLE stock_movements_partitioned "
+            "RENAME CONSTRAINT stock_movements_pkey TO stock_movements_partitioned_pkey"
+        )
+        _drop_indexes()
+        op.execute(f"""
+            CREATE TABLE stock_movements ({COLUMN_DEFINITIONS},
+                CONSTRAINT stock_movements_pkey PRIMARY KEY (id)
+            )
+        """)
+        op.execute(
+            f"INSERT INTO stock_movements ({COLUMNS}) "
+            f"SELECT {COLUMNS} FROM stock_movements_partitioned"
+        )
+        op.execute("ALTER SEQUENCE stock_movements_id_seq OWNED BY stock_movements.id")
+        # Remove também as partições
+        op.execute("DROP TABLE stock_movements_partitioned")
+        _create_indexes()
+
+    op.drop_index(
+        'ix_stock_movement_archive_references_reference', table_name='stock_movement_archive_references',
+    )
+    op.drop_table('stock_movement_archive_references')
+    op.drop_table('stock_movement_archive_totals')
+    op.drop_table('stock_movement_archives')
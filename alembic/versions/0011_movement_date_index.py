@@ -0,0 +1,30 @@
+"""stock movement index for keyset pagination
+
+Revision ID: 0011_movement_date_index
+Revises: 0010_partition_stock_movements
+Create Date: 2026-10-18 09:00:00.000000
+
+Adiciona ix_stock_movements_date_id (movement_date, id). GET /movements e
+/movements/all ordenam por (movement_date DESC, id DESC); sem filtros, nenhum
+índice existente começava por movement_date e cada página ordenava todo o
+razão. No PostgreSQL particionado, o índice é criado em cada partição. Bancos
+criados pela aplicação (create_all) já têm o índice.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_movement_date_index'
+down_revision = '0010_partition_stock_movements'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_stock_movements_date_id', 'stock_movements', ['movement_date', 'id'], if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_movements_date_id', table_name='stock_movements')
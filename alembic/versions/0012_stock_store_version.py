@@ -0,0 +1,34 @@
+"""stock_store version counter for the /stock ETag
+
+Revision ID: 0012_stock_store_version
+Revises: 0011_movement_date_index
+Create Date: 2026-10-18 11:00:00.000000
+
+O ETag de GET /stock passa a usar o contador de stock_store em table_versions,
+incrementado no commit das transações que alteram saldos, em vez de agregar
+MAX(updated_at), COUNT e SUM(quantity) das linhas filtradas. Semeia o contador
+e remove ix_stock_store_updated_at, que só servia a essa agregação e pesava em
+cada atualização de saldo.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_stock_store_version'
+down_revision = '0011_movement_date_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO table_versions (table_name, version) "
+        "SELECT 'stock_store', 0 WHERE NOT EXISTS "
+        "(SELECT 1 FROM table_versions WHERE table_name = 'stock_store')"
+    )
+    op.drop_index('ix_stock_store_updated_at', table_name='stock_store', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('ix_stock_store_updated_at', 'stock_store', ['updated_at'])
+    op.execute("DELETE FROM table_versions WHERE table_name = 'stock_store'")
@@ -0,0 +1,102 @@
+"""
+Adaptação dos routers para a pilha assíncrona (ASYNC_DB=true).
+
+Cada rota síncrona é recriada como um endpoint async que recebe uma AsyncSession
+(get_async_db) e executa o handler original com AsyncSession.run_sync. Assim o
+event loop não fica bloqueado esperando o banco, e não há uma segunda cópia das
+regras de negócio para manter: o mesmo código ORM roda sobre o driver asyncpg.
+
+A resposta é validada com o response_model ainda dentro de run_sync, para que
+qualquer carregamento de relacionamento aconteça enquanto a sessão está ativa.
+
+As exportações em streaming (rotas /all, que recebem um ExportFormat) continuam
+na sessão síncrona: o corpo é lido do banco depois que o handler retorna, fora
+do contexto de run_sync. Endpoints que já são async (como a importação de
+produtos, que lê o corpo em streaming) também são mantidos como estão.
+"""
+import inspect
+from typing import Any, Callable
+from fastapi import APIRouter, Depends, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.export import ExportFormat
+from app.db.database import get_async_db, get_db
+
+
+def _session_parameter(endpoint: Callable) -> str | None:
+    """Nome do parâmetro que recebe Depends(get_db), se houver."""
+    for name, parameter in inspect.signature(endpoint).parameters.items():
+        if getattr(parameter.default, "dependency", None) is get_db:
+            return name
+    return None
+
+
+def _is_streaming_export(endpoint: Callable) -> bool:
+    return any(
+        parameter.annotation is ExportFormat
+        for parameter in inspect.signature(endpoint).parameters.values()
+    )
+
+
+def _async_endpoint(route: APIRoute, session_name: str) -> Callable:
+    """Cria o endpoint async equivalente a uma rota síncrona."""
+    endpoint = route.endpoint
+    adapter = TypeAdapter(route.response_model) if route.response_model else None
+
+    async def async_endpoint(**kwargs: Any) -> Any:
+        db: AsyncSession = kwargs.pop(session_name)
+
+        def call(session) -> Any:
+            result = endpoint(**kwargs, **{session_name: session})
+            if adapter is None or result is None or isinstance(result, Response):
+                return result
+            return adapter.validate_python(result, from_attributes=True)
+
+        return await db.run_sync(call)
+
+    signature = inspect.signature(endpoint)
+    async_endpoint.__signature__ = signature.replace(parameters=[
+        parameter.replace(annotation=AsyncSession, default=Depends(get_async_db))
+        if name == session_name else parameter
+        for name, parameter in signature.parameters.items()
+    ])
+    async_endpoint.__name__ = endpoint.__name__
+    async_endpoint.__doc__ = endpoint.__doc__
+    return async_endpoint
+
+
+def make_async_router(router: APIRouter) -> APIRouter:
+    """
+    Converte um router síncrono em um router com endpoints async.
+
+    Args:
+        router: Router com handlers que dependem de get_db
+
+    Returns:
+        APIRouter: Router equivalente, com sessões assíncronas
+    """
+    async_router = APIRouter()
+    for route in router.routes:
+        session_name = _session_parameter(route.endpoint) if isinstance(route, APIRoute) else None
+        if (
+            session_name is None
+            or _is_streaming_export(route.endpoint)
+            or inspect.iscoroutinefunction(route.endpoint)
+        ):
+            async_router.routes.append(route)
+            continue
+
+        async_router.add_api_route(
+            route.path,
+            _async_endpoint(route, session_name),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            summary=route.summary,
+            description=route.description,
+            responses=route.responses,
+            name=route.name,
+        )
+    return async_router
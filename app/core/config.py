@@ -9,6 +9,45 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = Field(..., alias="DATABASE_URL")
+    async_db: bool = Field(False, alias="ASYNC_DB")
+    async_database_url_override: str | None = Field(None, alias="ASYNC_DATABASE_URL")
+    db_echo: bool = Field(False, alias="DB_ECHO")
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(3600, alias="DB_POOL_RECYCLE")
+    db_statement_timeout_ms: int = Field(0, alias="DB_STATEMENT_TIMEOUT_MS")
+    sql_profiling: bool = Field(False, alias="SQL_PROFILING")
+    sql_profile_history: int = Field(100, alias="SQL_PROFILE_HISTORY")
+    sql_slow_query_ms: float = Field(0, alias="SQL_SLOW_QUERY_MS")
+    
+    # Vendas em lote (POST /sales/batch): vendas por transação
+    sales_batch_chunk_size: int = Field(500, alias="SALES_BATCH_CHUNK_SIZE")
+    
+    # Cache de dados de referência (categorias, lojas, transportadoras, fornecedores)
+    reference_cache_ttl: float = Field(300, alias="REFERENCE_CACHE_TTL")
+    reference_cache_max_entries: int = Field(1000, alias="REFERENCE_CACHE_MAX_ENTRIES")
+    cache_invalidation_dir: str | None = Field(None, alias="CACHE_INVALIDATION_DIR")
+    
+    # /stock/stream (SSE): fila por assinante e intervalo do heartbeat
+    stock_stream_queue_size: int = Field(100, alias="STOCK_STREAM_QUEUE_SIZE")
+    stock_stream_heartbeat: float = Field(15.0, alias="STOCK_STREAM_HEARTBEAT")
+    
+    # Outbox transacional das movimentações (scripts/dispatch_outbox.py)
+    outbox_enabled: bool = Field(False, alias="OUTBOX_ENABLED")
+    
+    # /sync: idade mínima (s) de uma movimentação para o token avançar além dela
+    sync_settle_seconds: float = Field(60, alias="SYNC_SETTLE_SECONDS")
+    
+    # Fotografias de estoque: idade mínima (s) das movimentações incluídas (last_movement_id)
+    snapshot_settle_seconds: float = Field(60, alias="SNAPSHOT_SETTLE_SECONDS")
+    
+    # Reservas de estoque: validade padrão (s) de uma reserva (scripts/expire_reservations.py)
+    reservation_ttl_seconds: int = Field(900, alias="RESERVATION_TTL_SECONDS")
+    
+    # stock_movements: partições mensais criadas à frente (PostgreSQL) e diretório dos arquivos
+    movement_partitions_ahead: int = Field(3, alias="MOVEMENT_PARTITIONS_AHEAD")
+    movement_archive_dir: str = Field("archive/movements", alias="MOVEMENT_ARCHIVE_DIR")
     
     # API
     api_title: str = Field("Systock API", alias="API_TITLE")
@@ -23,5 +62,21 @@ class Settings(BaseSettings):
         case_sensitive=False
     )
 
+    @property
+    def async_database_url(self) -> str:
+        """URL do banco com driver assíncrono (asyncpg/aiosqlite), derivada de DATABASE_URL."""
+        if self.async_database_url_override:
+            return self.async_database_url_override
+
+        url = self.database_url
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix):]
+        return url
+
 
 settings = Settings()
@@ -0,0 +1,155 @@
+"""
+ETags fracos e GET condicional (If-None-Match) para leituras consultadas com frequência.
+
+Painéis consultam /products, /stock e /stores/{id} a cada poucos segundos. O ETag
+é calculado a partir de um valor barato, sem executar a consulta da listagem nem
+serializar a resposta:
+
+- products e stores: contador de versão da tabela (table_versions), incrementado
+  na mesma transação de cada escrita por um evento before_flush da sessão;
+- stock_store: o mesmo contador, incrementado só no commit (before_commit).
+  Toda movimentação de estoque escreve em stock_store; incrementado no meio da
+  transação, o contador ficaria bloqueado enquanto ela segura os saldos e
+  formaria ciclos de espera com os bloqueios das linhas. No commit, a
+  transação já tem todos os seus bloqueios e a linha do contador fica presa
+  só durante a confirmação.
+
+Os parâmetros da requisição entram no hash, então cada página/filtro tem o seu
+ETag. Se o cliente envia If-None-Match com o ETag atual, a resposta é 304 sem corpo.
+"""
+import hashlib
+from collections import defaultdict
+from fastapi import Response
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, SessionTransaction
+from app.models import TableVersion
+
+ETAG_HEADER = "ETag"
+# Tabelas com contador de versão mantido automaticamente
+VERSIONED_TABLES = ("products", "stores")
+# Tabelas versionadas cujo contador só é incrementado no commit
+COMMIT_VERSIONED_TABLES = ("stock_store",)
+# Chave em Session.info com as tabelas a incrementar no commit
+CHANGED_TABLES_KEY = "changed_versioned_tables"
+
+
+def make_etag(*parts) -> str:
+    """
+    Monta um ETag fraco a partir das partes que identificam a versão da resposta.
+
+    Returns:
+        str: ETag no formato W/"<hash>"
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparação fraca (RFC 9110) entre If-None-Match e o ETag atual."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Resposta 304 com o ETag atual."""
+    return Response(status_code=304, headers={ETAG_HEADER: etag})
+
+
+def table_version(db: Session, table: str) -> int:
+    """Versão atual de uma tabela versionada (0 se ainda não houve escrita)."""
+    version = db.query(TableVersion.version).filter(TableVersion.table_name == table).scalar()
+    return version or 0
+
+
+def bump_table_versions(db: Session, tables) -> dict[str, int]:
+    """
+    Incrementa a versão das tabelas na transação atual.
+
+    A linha de cada tabela fica bloqueada até o commit, então as versões são
+    confirmadas na ordem em que foram geradas. Chamado automaticamente para
+    escritas via ORM; gravações em massa com Core (ex.: importação de produtos)
+    devem chamá-lo explicitamente.
+
+    Returns:
+        dict: Tabela -> nova versão
+    """
+    connection = db.connection()
+    versions = {}
+    for table in sorted(set(tables)):
+        version = connection.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == table)
+            .values(version=TableVersion.version + 1)
+            .returning(TableVersion.version)
+        ).scalar()
+        if version is None:
+            # Banco criado sem a migração que semeia os contadores
+            version = 1
+            connection.execute(TableVersion.__table__.insert().values(table_name=table, version=version))
+        versions[table] = version
+    return versions
+
+
+def mark_tables_changed(db: Session, tables) -> None:
+    """
+    Anota tabelas de COMMIT_VERSIONED_TABLES alteradas na transação.
+
+    A versão é incrementada uma vez no commit; se a transação for desfeita, a
+    anotação é descartada. Escritas via ORM são anotadas automaticamente;
+    gravações com Core (ex.: StockService.register_movements) devem chamá-lo.
+    """
+    db.info.setdefault(CHANGED_TABLES_KEY, set()).update(tables)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    touched = defaultdict(list)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table not in VERSIONED_TABLES + COMMIT_VERSIONED_TABLES:
+            continue
+        if instance in session.dirty and not session.is_modified(instance):
+            continue
+        if table in COMMIT_VERSIONED_TABLES:
+            mark_tables_changed(session, [table])
+        else:
+            touched[table].append(instance)
+    if not touched:
+        return
+
+    versions = bump_table_versions(session, touched)
+    # Modelos com coluna revision (Product) registram a versão em que mudaram (/sync)
+    for table, changed in touched.items():
+        for instance in changed:
+            if hasattr(instance, "revision") and instance not in session.deleted:
+                instance.revision = versions[table]
+
+
+def _before_commit(session: Session) -> None:
+    # Savepoints (begin_nested) também disparam before_commit
+    if session.in_nested_transaction() or not session.info.get(CHANGED_TABLES_KEY):
+        return
+    # O commit faria o flush depois deste evento; antes, para anotar as escritas pendentes
+    session.flush()
+    bump_table_versions(session, session.info.pop(CHANGED_TABLES_KEY))
+
+
+def _after_soft_rollback(session: Session, previous_transaction: SessionTransaction) -> None:
+    # Só o rollback da transação inteira descarta as anotações; depois de um
+    # savepoint desfeito, o incremento no commit é apenas desnecessário
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGED_TABLES_KEY, None)
+
+
+def track_table_versions() -> None:
+    """Registra o incremento automático de versão em todas as sessões."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_soft_rollback", _after_soft_rollback)
@@ -0,0 +1,129 @@
+"""
+Exportação em streaming para as rotas /all.
+
+As rotas /all retornam a tabela inteira. Em vez de carregar tudo com .all() e
+serializar uma lista gigante, a consulta é lida com yield_per (cursor do lado do
+servidor, stream_results) e cada bloco de registros é serializado e enviado assim
+que lido, mantendo o uso de memória constante independentemente do volume.
+
+Formatos suportados:
+- json: array JSON (mesmo corpo de antes, agora enviado incrementalmente)
+- ndjson: um objeto JSON por linha
+- csv: uma linha por registro; campos aninhados (ex.: items) são omitidos
+
+Além de consultas, aceita qualquer iterável de registros já lidos (ex.: as
+movimentações arquivadas de GET /movements/archived), consumido sob demanda.
+"""
+import csv
+import io
+import json
+from enum import Enum
+from typing import Iterable, Iterator
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+# Quantidade de registros lidos do banco e enviados por bloco
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    """Formatos de exportação das rotas /all."""
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.json: "application/json",
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _scalar_fields(schema: type[BaseModel]) -> list[str]:
+    """Campos do schema que cabem em uma coluna CSV (sem listas aninhadas)."""
+    return [
+        name for name, field in schema.model_fields.items()
+        if getattr(field.annotation, "__origin__", None) is not list
+    ]
+
+
+def _iter_chunks(query: Query | Iterable, schema: type[BaseModel]) -> Iterator[list[dict]]:
+    """Lê a consulta (ou o iterável) em blocos e converte cada registro com o schema de leitura."""
+    rows = query.yield_per(EXPORT_CHUNK_SIZE) if isinstance(query, Query) else query
+    chunk = []
+    for row in rows:
+        chunk.append(schema.model_validate(row).model_dump(mode="json"))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stream_json(query: Query, schema: type[BaseModel]) -> Iterator[str]:
+    yield "["
+    first = True
+    for chunk in _iter_chunks(query, schema):
+        body = ",".join(json.dumps(record, ensure_ascii=False) for record in chunk)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def _stream_ndjson(query: Query, schema: type[BaseModel]) -> Iterator[str]:
+    for chunk in _iter_chunks(query, schema):
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk)
+
+
+def _stream_csv(query: Query, schema: type[BaseModel]) -> Iterator[str]:
+    fields = _scalar_fields(schema)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in _iter_chunks(query, schema):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Cabeçalho quando não há registros
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+STREAMERS = {
+    ExportFormat.json: _stream_json,
+    ExportFormat.ndjson: _stream_ndjson,
+    ExportFormat.csv: _stream_csv,
+}
+
+
+def stream_export(
+    query: Query | Iterable,
+    schema: type[BaseModel],
+    export_format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Cria uma resposta em streaming para exportar o resultado de uma consulta.
+
+    Args:
+        query: Consulta já filtrada e ordenada, ou iterável de registros
+        schema: Schema Pydantic de leitura dos registros
+        export_format: Formato de saída (json, ndjson ou csv)
+        filename: Nome base do arquivo para downloads ndjson/csv
+
+    Returns:
+        StreamingResponse: Resposta enviada incrementalmente
+    """
+    headers = {}
+    if export_format != ExportFormat.json:
+        headers["Content-Disposition"] = (
+            f'attachment; filename="{filename}.{export_format.value}"'
+        )
+    return StreamingResponse(
+        STREAMERS[export_format](query, schema),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers,
+    )
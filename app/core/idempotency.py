@@ -0,0 +1,39 @@
+"""
+Suporte HTTP ao cabeçalho Idempotency-Key.
+"""
+import json
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Presente nas respostas devolvidas a partir de uma execução anterior
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def replay_response(record: IdempotencyKey | None, request_hash: str) -> JSONResponse | None:
+    """
+    Reconstrói a resposta original de uma chave já utilizada.
+
+    Args:
+        record: Registro encontrado para a chave (ou None)
+        request_hash: Hash da requisição atual
+
+    Returns:
+        JSONResponse | None: Resposta gravada, ou None se a chave é nova
+
+    Raises:
+        HTTPException: 422 se a chave foi usada com outro corpo de requisição
+    """
+    if record is None:
+        return None
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} já utilizada com uma requisição diferente",
+        )
+    return JSONResponse(
+        status_code=record.status_code,
+        content=json.loads(record.response_body),
+        headers={IDEMPOTENT_REPLAY_HEADER: "true"},
+    )
@@ -0,0 +1,352 @@
+"""
+Métricas no formato texto do Prometheus.
+
+Implementação mínima (contadores, gauges e histogramas com rótulos) sem
+dependências externas, exposta em GET /metrics. Coleta:
+
+- latência e contagem por rota (template do path, não o path concreto);
+- requisições em andamento;
+- instruções SQL e tempo de banco por requisição, via eventos
+  before/after_cursor_execute de todos os engines;
+- movimentações de estoque registradas pelo StockService, por tipo.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Buckets de latência (segundos), os mesmos do cliente oficial do Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Buckets de quantidade de instruções SQL por requisição
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        """Copia um total acumulado em outro lugar (ex.: contadores do pool)."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Valor que sobe e desce."""
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos, soma e contagem."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        bucket_counts, total, count = value
+        names = self.label_names + ("le",)
+        lines = [
+            f"{self.name}_bucket{_format_labels(names, key + (bound,))} {bucket_count}"
+            for bound, bucket_count in zip(self.buckets, bucket_counts)
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas renderizadas juntas em /metrics."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        """Registra uma função chamada antes de renderizar (para gauges lidos sob demanda)."""
+        self._collectors.append(collector)
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "systock_http_requests_total", "Requisições HTTP atendidas.", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "systock_http_request_duration_seconds", "Latência das requisições HTTP.", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "systock_http_requests_in_flight", "Requisições HTTP em andamento.", ("method",),
+))
+http_request_db_statements = registry.register(Histogram(
+    "systock_http_request_db_statements", "Instruções SQL executadas por requisição.",
+    ("method", "route"), buckets=STATEMENT_BUCKETS,
+))
+http_request_db_seconds = registry.register(Histogram(
+    "systock_http_request_db_seconds", "Tempo de banco por requisição.", ("method", "route"),
+))
+db_statements_total = registry.register(Counter(
+    "systock_db_statements_total", "Instruções SQL executadas.",
+))
+db_statement_seconds_total = registry.register(Counter(
+    "systock_db_statement_seconds_total", "Tempo acumulado de execução de instruções SQL.",
+))
+stock_movements_total = registry.register(Counter(
+    "systock_stock_movements_total", "Movimentações de estoque registradas.", ("movement_type",),
+))
+stock_movement_batches_total = registry.register(Counter(
+    "systock_stock_movement_batches_total", "Lotes gravados por StockService.register_movements.",
+))
+stock_reservations_total = registry.register(Counter(
+    "systock_stock_reservations_total", "Reservas de estoque por desfecho.", ("outcome",),
+))
+db_pool_connections = registry.register(Gauge(
+    "systock_db_pool_connections", "Conexões do pool por estado.", ("engine", "state"),
+))
+db_pool_checkouts_total = registry.register(Counter(
+    "systock_db_pool_checkouts_total", "Checkouts de conexão acumulados.", ("engine",),
+))
+db_pool_wait_seconds_total = registry.register(Counter(
+    "systock_db_pool_wait_seconds_total", "Espera acumulada por conexão livre.", ("engine",),
+))
+db_pool_timeouts_total = registry.register(Counter(
+    "systock_db_pool_timeouts_total", "Timeouts esperando conexão do pool.", ("engine",),
+))
+
+
+def register_pool(engine_name: str, pool_source, pool_metrics) -> None:
+    """
+    Publica as métricas de um pool (ver app.db.pool_metrics) em /metrics.
+
+    Args:
+        engine_name: Rótulo do engine (sync/async)
+        pool_source: Função que retorna o pool atual do engine
+        pool_metrics: Contadores do pool
+    """
+    def collect():
+        snapshot = pool_metrics.snapshot(pool_source())
+        for state in ("checked_out", "checked_in", "overflow"):
+            if state in snapshot:
+                db_pool_connections.set(snapshot[state], engine=engine_name, state=state)
+        db_pool_checkouts_total.set(snapshot["checkouts"], engine=engine_name)
+        db_pool_wait_seconds_total.set(snapshot["wait_seconds_total"], engine=engine_name)
+        db_pool_timeouts_total.set(snapshot["timeouts"], engine=engine_name)
+
+    registry.add_collector(collect)
+
+
+class RequestDbStats:
+    """Instruções SQL e tempo de banco acumulados durante uma requisição."""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Objeto mutável compartilhado com a threadpool/greenlet que executa o endpoint
+current_request_db_stats: ContextVar[RequestDbStats | None] = ContextVar(
+    "current_request_db_stats", default=None,
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # O início fica no contexto da execução, e não em uma pilha na conexão: uma
+    # instrução que falha não passa por after_cursor_execute
+    if context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(context)
+
+
+def _handle_error(exception_context):
+    # Instruções que falham também consomem tempo de banco
+    _record_statement(exception_context.execution_context)
+
+
+def _record_statement(context) -> None:
+    start = getattr(context, "metrics_query_start", None)
+    if start is None:
+        return
+    context.metrics_query_start = None
+    elapsed = time.perf_counter() - start
+    db_statements_total.inc()
+    db_statement_seconds_total.inc(elapsed)
+    stats = current_request_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+
+
+def instrument_engines() -> None:
+    """Registra os eventos de cursor em todos os engines (inclusive o assíncrono)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def record_stock_movements(stock_events: list[dict]) -> None:
+    """Conta um lote de movimentações de estoque confirmado (eventos de app.core.stock_events)."""
+    stock_movement_batches_total.inc()
+    for stock_event in stock_events:
+        stock_movements_total.inc(movement_type=stock_event["type"])
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP.
+
+    O rótulo route é o template da rota (/sales/{sale_id}), para manter a
+    cardinalidade fixa; requisições que não casam com nenhuma rota usam
+    "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    def _route_label(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        stats = RequestDbStats()
+        token = current_request_db_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_db_stats.reset(token)
+            http_requests_in_flight.dec(method=method)
+            route = self._route_label(scope)
+            http_requests_total.inc(method=method, route=route, status=status["code"])
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            http_request_db_statements.observe(stats.statements, method=method, route=route)
+            http_request_db_seconds.observe(stats.seconds, method=method, route=route)
@@ -0,0 +1,122 @@
+"""
+Paginação por cursor (keyset) para as rotas de listagem.
+
+Em vez de OFFSET, que obriga o banco a ler e descartar todas as linhas das páginas
+anteriores, a próxima página é buscada a partir da chave de ordenação do último
+registro retornado (WHERE (coluna, id) > (:valor, :id)). O cursor é opaco para o
+cliente e devolvido no header X-Next-Cursor; o corpo da resposta continua sendo a
+lista de registros, de modo que clientes antigos com skip seguem funcionando.
+"""
+import base64
+import json
+from datetime import date, datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Codifica os valores da chave de ordenação em um cursor opaco.
+
+    Args:
+        values: Valores das colunas de ordenação do último registro
+
+    Returns:
+        str: Cursor em base64 url-safe
+    """
+    payload = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """
+    Decodifica um cursor opaco de volta para os valores tipados da chave.
+
+    Args:
+        cursor: Cursor recebido do cliente
+        columns: Colunas de ordenação, usadas para converter os tipos
+
+    Returns:
+        list: Valores da chave de ordenação
+
+    Raises:
+        HTTPException: 400 se o cursor for inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError(cursor)
+
+        values = []
+        for column, value in zip(columns, payload):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif python_type is date:
+                values.append(date.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def paginate(
+    query: Query,
+    response: Response,
+    columns: list,
+    limit: int,
+    cursor: str | None = None,
+    skip: int = 0,
+    descending: bool = False,
+) -> list:
+    """
+    Aplica ordenação estável e paginação por cursor (ou por skip) a uma consulta.
+
+    A última coluna de `columns` deve ser única (normalmente o id), garantindo
+    ordenação total: inserções concorrentes não deslocam as páginas seguintes.
+    Quando há mais registros, o cursor da próxima página é definido no header
+    X-Next-Cursor.
+
+    Args:
+        query: Consulta já filtrada
+        response: Resposta da rota, para o header do cursor
+        columns: Colunas da chave de ordenação, terminando em uma coluna única
+        limit: Tamanho da página
+        cursor: Cursor recebido do cliente (tem precedência sobre skip)
+        skip: Deslocamento legado, mantido por compatibilidade
+        descending: Se True, ordena do maior para o menor
+
+    Returns:
+        list: Registros da página
+    """
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in columns))
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            key, bound = columns[0], values[0]
+        else:
+            key, bound = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+    elif skip:
+        query = query.offset(skip)
+
+    # Buscar um registro a mais para saber se existe próxima página
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, column.key) for column in columns]
+        )
+
+    return rows
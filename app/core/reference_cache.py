@@ -0,0 +1,336 @@
+"""
+Cache em processo dos dados de referência (categorias, lojas, transportadoras e fornecedores).
+
+Esses cadastros mudam pouco, mas são lidos a cada requisição que precisa deles
+(GET /stores/{id}, validação das lojas de um lote de vendas, resolução de
+categorias na importação de produtos). O cache é read-through: uma leitura que
+não encontra a chave consulta o banco e guarda uma cópia imutável (o schema
+Read do cadastro), nunca a instância ORM, que pertence a uma sessão.
+
+- Cada tabela tem um cache LRU limitado a REFERENCE_CACHE_MAX_ENTRIES entradas,
+  com expiração de REFERENCE_CACHE_TTL segundos (0 desativa o cache).
+- Os handlers de criação/atualização/exclusão invalidam a tabela depois do commit.
+- Com CACHE_INVALIDATION_DIR definido, cada worker abre um socket Unix de
+  datagrama nesse diretório; uma invalidação é publicada para todos os outros
+  workers da máquina, que descartam as mesmas chaves.
+- Acertos, faltas e descartes são publicados em /metrics e /metrics/cache.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, registry
+from app.models import Carrier, Category, Store, Supplier
+from app.schemas.carrier import CarrierRead
+from app.schemas.category import CategoryRead
+from app.schemas.store import StoreRead
+from app.schemas.supplier import SupplierRead
+
+logger = logging.getLogger(__name__)
+
+# Cadastros em cache e o schema usado como cópia imutável
+REFERENCE_SCHEMAS = {
+    Category: CategoryRead,
+    Store: StoreRead,
+    Carrier: CarrierRead,
+    Supplier: SupplierRead,
+}
+# Chave da listagem completa de uma tabela
+ALL_KEY = "*"
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU com expiração por entrada e contadores de uso."""
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        # Incrementada a cada invalidação: uma leitura iniciada antes dela não grava
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key) -> Any:
+        """Valor da chave ou _MISSING (ausente ou expirado)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key, value, generation: int) -> None:
+        """Grava a chave se nenhuma invalidação ocorreu desde generation."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, keys=None) -> None:
+        """Descarta as chaves informadas (ou todas)."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class LocalInvalidationChannel:
+    """
+    Canal publish/subscribe entre os workers de uma máquina.
+
+    Cada assinante é um socket Unix de datagrama em directory; publicar é enviar
+    a mensagem para todos os sockets do diretório, menos o próprio. Sockets de
+    workers que já terminaram são removidos na primeira falha de envio.
+    """
+
+    def __init__(self, directory: str, on_message: Callable[[dict], None]):
+        self.directory = directory
+        self.on_message = on_message
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._socket = None
+        self._thread = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        # recv com timeout para a thread perceber o stop()
+        self._socket.settimeout(0.5)
+        self._thread = threading.Thread(target=self._listen, name="reference-cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._socket is None:
+            return
+        sock, self._socket = self._socket, None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, message: dict) -> None:
+        payload = json.dumps(message).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not name.endswith(".sock") or path == self.path:
+                    continue
+                try:
+                    sender.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except OSError as exc:
+                    logger.warning("Falha ao publicar invalidação de cache para %s: %s", path, exc)
+
+    def _listen(self) -> None:
+        sock = self._socket
+        while self._socket is not None:
+            try:
+                payload = sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not payload:
+                continue
+            try:
+                self.on_message(json.loads(payload))
+            except Exception:  # uma mensagem inválida não pode derrubar o assinante
+                logger.exception("Mensagem de invalidação de cache inválida")
+
+
+class ReferenceDataCache:
+    """Cache read-through dos cadastros de referência, uma TTLCache por tabela."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._caches = {model.__tablename__: TTLCache(max_entries, ttl) for model in REFERENCE_SCHEMAS}
+        self.channel: LocalInvalidationChannel | None = None
+
+    def _cache(self, model) -> TTLCache:
+        return self._caches[model.__tablename__]
+
+    def get(self, db: Session, model, object_id: int):
+        """
+        Obtém um cadastro pelo ID.
+
+        Args:
+            db: Sessão do banco de dados (usada apenas em caso de falta)
+            model: Category, Store, Carrier ou Supplier
+            object_id: ID do registro
+
+        Returns:
+            Schema Read do registro, ou None se não existir (ausências não são guardadas)
+        """
+        cache = self._cache(model)
+        value = cache.get(object_id)
+        if value is not _MISSING:
+            return value
+
+        generation = cache.generation
+        instance = db.get(model, object_id)
+        if instance is None:
+            return None
+        value = REFERENCE_SCHEMAS[model].model_validate(instance)
+        cache.set(object_id, value, generation)
+        return value
+
+    def get_many(self, db: Session, model, object_ids) -> dict:
+        """
+        Obtém vários cadastros, com uma única consulta para os que não estão em cache.
+
+        Returns:
+            dict: ID -> schema Read, apenas para os IDs existentes
+        """
+        cache = self._cache(model)
+        found, missing = {}, []
+        for object_id in set(object_ids):
+            value = cache.get(object_id)
+            if value is _MISSING:
+                missing.append(object_id)
+            else:
+                found[object_id] = value
+
+        if missing:
+            generation = cache.generation
+            schema = REFERENCE_SCHEMAS[model]
+            for instance in db.query(model).filter(model.id.in_(missing)):
+                value = schema.model_validate(instance)
+                cache.set(instance.id, value, generation)
+                found[instance.id] = value
+        return found
+
+    def all(self, db: Session, model) -> list:
+        """Todos os registros da tabela (indicado para tabelas pequenas, como categorias)."""
+        cache = self._cache(model)
+        values = cache.get(ALL_KEY)
+        if values is not _MISSING:
+            return values
+
+        generation = cache.generation
+        schema = REFERENCE_SCHEMAS[model]
+        values = tuple(schema.model_validate(instance) for instance in db.query(model).order_by(model.id))
+        cache.set(ALL_KEY, values, generation)
+        return values
+
+    def invalidate(self, model, object_id: int | None = None, publish: bool = True) -> None:
+        """
+        Descarta um registro (e a listagem completa) ou a tabela inteira.
+
+        Deve ser chamado depois do commit, para que uma leitura concorrente não
+        guarde de novo o valor antigo.
+        """
+        self._invalidate_table(model.__tablename__, object_id)
+        if publish and self.channel is not None:
+            self.channel.publish({"table": model.__tablename__, "id": object_id})
+
+    def _invalidate_table(self, table: str, object_id: int | None) -> None:
+        cache = self._caches.get(table)
+        if cache is not None:
+            cache.invalidate(None if object_id is None else (object_id, ALL_KEY))
+
+    def _on_message(self, message: dict) -> None:
+        self._invalidate_table(message["table"], message.get("id"))
+
+    def start_channel(self, directory: str) -> None:
+        """Assina o canal de invalidação entre workers."""
+        if self.channel is None:
+            self.channel = LocalInvalidationChannel(directory, self._on_message)
+            self.channel.start()
+
+    def stop_channel(self) -> None:
+        if self.channel is not None:
+            self.channel.stop()
+            self.channel = None
+
+    def configure(self, max_entries: int, ttl: float) -> None:
+        """Altera limites e TTL (descarta o conteúdo atual)."""
+        for cache in self._caches.values():
+            cache.max_entries = max_entries
+            cache.ttl = ttl
+            cache.clear()
+
+    def clear(self) -> None:
+        for cache in self._caches.values():
+            cache.clear()
+
+    def stats(self) -> dict:
+        return {table: cache.stats() for table, cache in self._caches.items()}
+
+
+reference_cache = ReferenceDataCache(settings.reference_cache_max_entries, settings.reference_cache_ttl)
+
+cache_requests_total = registry.register(Counter(
+    "systock_reference_cache_requests_total", "Leituras do cache de dados de referência.", ("table", "result"),
+))
+cache_evictions_total = registry.register(Counter(
+    "systock_reference_cache_evictions_total", "Entradas descartadas por LRU.", ("table",),
+))
+cache_entries = registry.register(Gauge(
+    "systock_reference_cache_entries", "Entradas no cache de dados de referência.", ("table",),
+))
+
+
+def _collect() -> None:
+    for table, stats in reference_cache.stats().items():
+        cache_requests_total.set(stats["hits"], table=table, result="hit")
+        cache_requests_total.set(stats["misses"], table=table, result="miss")
+        cache_evictions_total.set(stats["evictions"], table=table)
+        cache_entries.set(stats["entries"], table=table)
+
+
+registry.add_collector(_collect)
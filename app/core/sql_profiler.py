@@ -0,0 +1,272 @@
+"""
+Profiler de SQL por requisição e log de consultas lentas.
+
+Com SQL_PROFILING=true (todas as requisições) ou com o cabeçalho
+X-Profile-SQL: 1 (uma requisição), cada instrução executada durante a
+requisição é registrada com duração, parâmetros e ponto de chamada no código
+da aplicação. Instruções idênticas repetidas (o padrão N+1 de carregamentos
+preguiçosos, como os items de vendas) são agrupadas e sinalizadas.
+
+A resposta recebe um cabeçalho Server-Timing (tempo de banco e da aplicação)
+e X-SQL-Profile-Id; o relatório completo em JSON fica disponível em
+GET /metrics/sql-profiles/{id} (últimos SQL_PROFILE_HISTORY relatórios, por worker).
+
+Independente do profiler, instruções mais lentas que SQL_SLOW_QUERY_MS são
+logadas com o plano de execução (EXPLAIN), obtido na mesma conexão.
+"""
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-SQL"
+PROFILE_ID_HEADER = "X-SQL-Profile-Id"
+# A partir de quantas execuções idênticas uma instrução é sinalizada
+REPEATED_STATEMENT_THRESHOLD = 2
+# Tamanho máximo da representação dos parâmetros no relatório
+MAX_PARAMETERS_LENGTH = 200
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+# Savepoint em volta do EXPLAIN das consultas lentas
+_EXPLAIN_SAVEPOINT = "sql_profiler_explain"
+
+
+def _call_site() -> str:
+    """Primeiro frame do código da aplicação acima do SQLAlchemy."""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} ({frame.f_code.co_name})"
+        if fallback is None and "sqlalchemy" not in filename and filename != _THIS_FILE:
+            fallback = f"{os.path.basename(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return fallback or "<desconhecido>"
+
+
+class SqlProfile:
+    """Instruções SQL coletadas durante uma requisição."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.statements: list[dict] = []
+
+    def add(self, statement: str, parameters, duration: float, call_site: str, slow: bool) -> None:
+        self.statements.append({
+            "sql": statement,
+            "parameters": repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            "duration_ms": round(duration * 1000, 3),
+            "call_site": call_site,
+            "slow": slow,
+        })
+
+    @property
+    def db_ms(self) -> float:
+        return round(sum(s["duration_ms"] for s in self.statements), 3)
+
+    def repeated(self) -> list[dict]:
+        """Instruções idênticas executadas várias vezes (candidatas a N+1)."""
+        groups = OrderedDict()
+        for statement in self.statements:
+            group = groups.setdefault(statement["sql"], {
+                "sql": statement["sql"], "count": 0, "total_ms": 0.0, "call_sites": [],
+            })
+            group["count"] += 1
+            group["total_ms"] = round(group["total_ms"] + statement["duration_ms"], 3)
+            if statement["call_site"] not in group["call_sites"]:
+                group["call_sites"].append(statement["call_site"])
+        return sorted(
+            (g for g in groups.values() if g["count"] >= REPEATED_STATEMENT_THRESHOLD),
+            key=lambda g: g["count"],
+            reverse=True,
+        )
+
+    def server_timing(self, app_ms: float) -> str:
+        return (
+            f'db;dur={self.db_ms};desc="{len(self.statements)} queries", '
+            f"app;dur={round(app_ms, 3)}"
+        )
+
+    def report(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 3),
+            "db_ms": self.db_ms,
+            "statement_count": len(self.statements),
+            "repeated": self.repeated(),
+            "statements": self.statements,
+        }
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 3),
+            "db_ms": self.db_ms,
+            "statement_count": len(self.statements),
+            "repeated_count": len(self.repeated()),
+        }
+
+
+class ProfileStore:
+    """Últimos relatórios de profiling deste worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: OrderedDict[int, SqlProfile] = OrderedDict()
+
+    def add(self, profile: SqlProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > settings.sql_profile_history:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: int) -> SqlProfile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self) -> list[SqlProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_store = ProfileStore()
+
+current_profile: ContextVar[SqlProfile | None] = ContextVar("current_sql_profile", default=None)
+
+
+def explain(conn, statement: str, parameters) -> str | None:
+    """
+    Obtém o plano de execução de uma instrução na mesma conexão DBAPI.
+
+    Usa um cursor cru para não disparar eventos nem entrar no relatório da
+    requisição. O EXPLAIN roda dentro de um SAVEPOINT, desfeito se ele falhar:
+    no PostgreSQL, um erro na transação a aborta, e a requisição perderia o
+    trabalho feito até ali. Retorna None para instruções que não são DML/SELECT.
+    """
+    if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            raise
+        finally:
+            cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        return "\n".join(" ".join(str(column) for column in row) for row in rows)
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # No contexto da execução: uma instrução que falha não chega a after_cursor_execute
+    if context is not None:
+        context.profiler_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "profiler_query_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    profile = current_profile.get()
+    slow = bool(settings.sql_slow_query_ms) and duration * 1000 >= settings.sql_slow_query_ms
+    if profile is None and not slow:
+        return
+
+    call_site = _call_site()
+    if profile is not None:
+        profile.add(statement, parameters, duration, call_site, slow)
+    if slow:
+        plan = None
+        if not executemany:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as exc:  # o log não pode quebrar a requisição
+                plan = f"EXPLAIN falhou: {exc}"
+        logger.warning(
+            "Consulta lenta (%.1f ms) em %s:\n%s\nParâmetros: %s\nPlano:\n%s",
+            duration * 1000, call_site, statement, repr(parameters)[:MAX_PARAMETERS_LENGTH], plan,
+        )
+
+
+def instrument_engines() -> None:
+    """Registra os eventos do profiler em todos os engines."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SqlProfilerMiddleware:
+    """Middleware ASGI que ativa o profiler por configuração ou cabeçalho."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = SqlProfile(scope["method"], scope["path"])
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                app_ms = (time.perf_counter() - profile.started) * 1000
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", profile.server_timing(app_ms).encode()),
+                    (PROFILE_ID_HEADER.lower().encode(), str(profile.id).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            profile.total_ms = (time.perf_counter() - profile.started) * 1000
+            profile_store.add(profile)
+
+    @staticmethod
+    def _enabled(scope) -> bool:
+        if settings.sql_profiling:
+            return True
+        header = PROFILE_HEADER.lower().encode()
+        return any(
+            name == header and value.strip() not in (b"", b"0", b"false")
+            for name, value in scope.get("headers", [])
+        )
@@ -0,0 +1,223 @@
+"""
+Eventos de alteração de estoque em tempo real (GET /stock/stream, server-sent events).
+
+StockService.register_movements anota na sessão um evento compacto por
+movimentação; os eventos só são publicados, e contados nas métricas de
+throughput (/metrics), depois do commit (evento after_commit da sessão) e são
+descartados se a transação, ou o savepoint em que foram gerados, for desfeita.
+
+O StockEventBroker distribui cada evento para os assinantes do processo. Cada
+assinante tem uma fila limitada (STOCK_STREAM_QUEUE_SIZE): um consumidor lento
+que enche a fila é desconectado (recebe um evento "dropped" e deve recarregar
+/stock antes de assinar de novo), em vez de atrasar a publicação para os demais.
+A publicação nunca bloqueia quem faz o commit.
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import AsyncIterator
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, record_stock_movements, registry
+
+# Chave em Session.info com os eventos ainda não confirmados
+PENDING_EVENTS_KEY = "pending_stock_events"
+# Marca colocada na fila de um assinante desconectado por lentidão
+DROPPED = object()
+
+stock_stream_subscribers = registry.register(Gauge(
+    "systock_stock_stream_subscribers", "Assinantes conectados em /stock/stream.",
+))
+stock_stream_events_total = registry.register(Counter(
+    "systock_stock_stream_events_total", "Eventos de estoque publicados após commit.",
+))
+stock_stream_dropped_total = registry.register(Counter(
+    "systock_stock_stream_dropped_total", "Assinantes desconectados por fila cheia.",
+))
+
+
+class StockSubscription:
+    """Assinatura de um cliente, com filtros opcionais por loja e produto."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int,
+                 store_id: int | None = None, product_id: int | None = None):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.store_id = store_id
+        self.product_id = product_id
+        self.dropped = False
+
+    def accepts(self, stock_event: dict) -> bool:
+        return (
+            (self.store_id is None or stock_event["store_id"] == self.store_id)
+            and (self.product_id is None or stock_event["product_id"] == self.product_id)
+        )
+
+
+class StockEventBroker:
+    """Fan-out em processo dos eventos de estoque para as assinaturas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: set[StockSubscription] = set()
+
+    def subscribe(self, store_id: int | None = None, product_id: int | None = None,
+                  queue_size: int | None = None) -> StockSubscription:
+        """Cria uma assinatura no event loop atual."""
+        subscription = StockSubscription(
+            asyncio.get_running_loop(),
+            queue_size or settings.stock_stream_queue_size,
+            store_id,
+            product_id,
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        stock_stream_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: StockSubscription) -> None:
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+        stock_stream_subscribers.dec()
+
+    def publish(self, stock_events: list[dict]) -> None:
+        """
+        Publica eventos já confirmados.
+
+        Pode ser chamado de qualquer thread: a entrega acontece no event loop de
+        cada assinatura, sem bloquear quem publica.
+        """
+        if not stock_events:
+            return
+        stock_stream_events_total.inc(len(stock_events))
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            matching = [e for e in stock_events if subscription.accepts(e)]
+            if not matching:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, matching)
+            except RuntimeError:
+                # Event loop já encerrado
+                self.unsubscribe(subscription)
+
+    def _deliver(self, subscription: StockSubscription, stock_events: list[dict]) -> None:
+        if subscription.dropped:
+            return
+        for stock_event in stock_events:
+            try:
+                subscription.queue.put_nowait(stock_event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+                return
+
+    def _drop(self, subscription: StockSubscription) -> None:
+        """Desconecta um consumidor lento, liberando a fila para a marca DROPPED."""
+        subscription.dropped = True
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(DROPPED)
+        stock_stream_dropped_total.inc()
+        self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+
+stock_event_broker = StockEventBroker()
+
+
+def stock_event(movement) -> dict:
+    """Evento compacto de uma movimentação gravada."""
+    return {
+        "id": movement.id,
+        "store_id": movement.store_id,
+        "product_id": movement.product_id,
+        "type": movement.movement_type,
+        "quantity": movement.quantity,
+        "balance": movement.stock_after,
+        "at": movement.movement_date.isoformat() if isinstance(movement.movement_date, datetime) else None,
+    }
+
+
+def queue_stock_events(db: Session, movements) -> None:
+    """
+    Anota na sessão os eventos de um lote de movimentações, para publicação (e
+    contagem nas métricas de throughput) após o commit.
+    """
+    if not movements:
+        return
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault(PENDING_EVENTS_KEY, []).append(
+        (transaction, [stock_event(movement) for movement in movements])
+    )
+
+
+def _belongs_to(transaction: SessionTransaction | None, ended: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ended:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if pending:
+        stock_event_broker.publish([stock_event for _, batch in pending for stock_event in batch])
+        for _, batch in pending:
+            record_stock_movements(batch)
+
+
+def _after_soft_rollback(session: Session, previous_transaction: SessionTransaction) -> None:
+    pending = session.info.get(PENDING_EVENTS_KEY)
+    if pending:
+        session.info[PENDING_EVENTS_KEY] = [
+            item for item in pending if not _belongs_to(item[0], previous_transaction)
+        ]
+
+
+def track_stock_events() -> None:
+    """Registra a publicação pós-commit em todas as sessões."""
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_soft_rollback", _after_soft_rollback)
+
+
+def format_sse(data: dict, event_name: str | None = None) -> str:
+    """Serializa um evento no formato text/event-stream."""
+    lines = [f"event: {event_name}"] if event_name else []
+    if "id" in data:
+        lines.append(f"id: {data['id']}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_stock_events(subscription: StockSubscription, heartbeat: float) -> AsyncIterator[str]:
+    """
+    Corpo da resposta SSE de uma assinatura.
+
+    Envia um comentário a cada heartbeat segundos sem eventos (mantém proxies e
+    balanceadores com a conexão aberta). Encerra com "dropped" se o consumidor
+    for desconectado por lentidão.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                stock_event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if stock_event is DROPPED:
+                yield format_sse({"reason": "slow_consumer"}, "dropped")
+                return
+            yield format_sse(stock_event, "stock")
+    finally:
+        stock_event_broker.unsubscribe(subscription)
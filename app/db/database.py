@@ -2,16 +2,65 @@
 Configuração do banco de dados com SQLAlchemy.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core import sql_profiler
+from app.core.metrics import instrument_engines, register_pool
+from app.db.pool_metrics import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    PoolMetrics,
+    instrument_pool,
+)
+
+
+def engine_options(url: str, async_driver: bool = False) -> dict:
+    """
+    Opções do engine a partir das configurações de pool e timeout.
+
+    O SQLite mantém o pool padrão do dialeto (sem tamanho/overflow). No Postgres
+    o statement_timeout é definido na abertura de cada conexão.
+
+    Args:
+        url: URL do banco
+        async_driver: Se True, opções para create_async_engine
+
+    Returns:
+        dict: Argumentos nomeados para create_engine/create_async_engine
+    """
+    options = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    if backend == "postgresql" and settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        options["connect_args"] = (
+            {"server_settings": {"statement_timeout": timeout}}
+            if async_driver
+            else {"options": f"-c statement_timeout={timeout}"}
+        )
+    return options
+
 
 # Criar engine do banco de dados
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+pool_metrics = PoolMetrics()
+instrument_pool(engine.pool, pool_metrics)
+register_pool("sync", lambda: engine.pool, pool_metrics)
+instrument_engines()
+sql_profiler.instrument_engines()
 
 # Criar factory de sessões
 SessionLocal = sessionmaker(
@@ -31,3 +80,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Engine assíncrono (asyncpg), criado apenas quando ASYNC_DB está habilitado
+async_engine = None
+AsyncSessionLocal = None
+async_pool_metrics = None
+
+if settings.async_db:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        **engine_options(settings.async_database_url, async_driver=True),
+    )
+    async_pool_metrics = PoolMetrics()
+    instrument_pool(async_engine.sync_engine.pool, async_pool_metrics)
+    register_pool("async", lambda: async_engine.sync_engine.pool, async_pool_metrics)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+    )
+
+
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco de dados."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,132 @@
+"""
+Métricas do pool de conexões.
+
+Os pools instrumentados medem quanto tempo cada checkout espera por uma conexão
+livre e contam timeouts. Eventos do pool contam checkouts, checkins e conexões
+abertas. Os valores são por processo (cada worker uvicorn tem o seu pool) e
+servem para dimensionar pool_size/max_overflow por worker.
+"""
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Contadores acumulados de um pool de conexões."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.overflow_max = 0
+
+    def record_wait(self, seconds: float, overflow: int) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.overflow_max = max(self.overflow_max, overflow)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        """
+        Estado atual do pool mais os contadores acumulados.
+
+        Args:
+            pool: Pool do engine
+
+        Returns:
+            dict: Gauges (tamanho, em uso, overflow) e contadores
+        """
+        with self._lock:
+            counters = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "overflow_max": self.overflow_max,
+            }
+
+        gauges = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            gauges.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        return {"pid": os.getpid(), **gauges, **counters}
+
+
+class _TimedCheckoutMixin:
+    """Mede a espera por uma conexão livre em _do_get (inclui o bloqueio na fila)."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started, max(self.overflow(), 0))
+
+    def recreate(self):
+        # dispose()/invalidação recriam o pool; os contadores continuam os mesmos
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool com medição de espera no checkout."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool com medição de espera no checkout."""
+
+
+def instrument_pool(pool: Pool, metrics: PoolMetrics) -> None:
+    """
+    Registra os eventos de checkout/checkin/connect de um pool nas métricas.
+
+    Args:
+        pool: Pool do engine (engine.pool ou async_engine.sync_engine.pool)
+        metrics: Contadores que recebem os eventos
+    """
+    pool.metrics = metrics
+    event.listen(pool, "connect", lambda *args: metrics.record_connect())
+    event.listen(pool, "checkout", lambda *args: metrics.record_checkout())
+    event.listen(pool, "checkin", lambda *args: metrics.record_checkin())
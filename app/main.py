@@ -5,10 +5,19 @@ Esta aplicação implementa uma API completa para gerenciamento de estoque multi
 com controle de entradas, distribuições internas, vendas e rastreamento automático
 de movimentações.
 """
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.async_router import make_async_router
 from app.core.config import settings
-from app.db.database import Base, engine
+from app.core.etag import ETAG_HEADER, track_table_versions
+from app.core.metrics import MetricsMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.reference_cache import reference_cache
+from app.core.sql_profiler import PROFILE_ID_HEADER, SqlProfilerMiddleware
+from app.core.stock_events import track_stock_events
+from app.db.database import Base, SessionLocal, engine
 from app.routers import (
     clients,
     categories,
@@ -21,16 +30,62 @@ from app.routers import (
     entries,
     internal_distributions,
     sales,
+    sync,
+    metrics,
 )
+from app.services.movement_archive_service import MovementArchiveService
 
-# Criar tabelas
+logger = logging.getLogger(__name__)
+
+# Criar tabelas que faltarem. No PostgreSQL, create_all cria stock_movements sem
+# particionamento; o particionamento vem da migração 0010 (ver README, "Partições
+# e arquivamento de stock_movements")
 Base.metadata.create_all(bind=engine)
 
+
+def ensure_movement_partitions() -> None:
+    """Cria as partições mensais de stock_movements que faltarem (PostgreSQL particionado)."""
+    if engine.dialect.name != "postgresql":
+        return
+    db = SessionLocal()
+    try:
+        if not MovementArchiveService.is_partitioned(db):
+            logger.warning(
+                "stock_movements não está particionada; aplique a migração 0010 "
+                "(alembic stamp 0009_movement_product_index && alembic upgrade head "
+                "em bancos criados pela aplicação)"
+            )
+            return
+        created = MovementArchiveService.ensure_partitions(db)
+        db.commit()
+        if created:
+            logger.info("Partições de stock_movements criadas: %s", ", ".join(created))
+    except Exception:
+        db.rollback()
+        logger.warning("Falha ao criar partições de stock_movements", exc_info=True)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Cria as partições de stock_movements dos próximos meses e assina o canal de
+    invalidação do cache de referência entre workers (CACHE_INVALIDATION_DIR).
+    """
+    ensure_movement_partitions()
+    if settings.cache_invalidation_dir:
+        reference_cache.start_channel(settings.cache_invalidation_dir)
+    yield
+    reference_cache.stop_channel()
+
+
 # Criar aplicação FastAPI
 app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
     description="API de gerenciamento de estoque multi-loja com rastreamento automático de movimentações",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -40,20 +95,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PROFILE_ID_HEADER, "Server-Timing", ETAG_HEADER],
 )
 
-# Incluir routers
-app.include_router(clients.router)
-app.include_router(categories.router)
-app.include_router(products.router)
-app.include_router(suppliers.router)
-app.include_router(stores.router)
-app.include_router(carriers.router)
-app.include_router(stock.router)
-app.include_router(movements.router)
-app.include_router(entries.router)
-app.include_router(internal_distributions.router)
-app.include_router(sales.router)
+# Versão por tabela (products, stores) para os ETags das leituras condicionais
+track_table_versions()
+
+# Eventos de /stock/stream publicados após o commit das movimentações
+track_stock_events()
+
+# Profiling de SQL opt-in (SQL_PROFILING ou cabeçalho X-Profile-SQL)
+app.add_middleware(SqlProfilerMiddleware)
+
+# Latência por rota, requisições em andamento e SQL por requisição (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Incluir routers (ASYNC_DB=true usa endpoints async com AsyncSession)
+for module in (
+    clients,
+    categories,
+    products,
+    suppliers,
+    stores,
+    carriers,
+    stock,
+    movements,
+    entries,
+    internal_distributions,
+    sales,
+    sync,
+):
+    app.include_router(make_async_router(module.router) if settings.async_db else module.router)
+app.include_router(metrics.router)
 
 
 @app.get("/", tags=["health"])
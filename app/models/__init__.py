@@ -4,6 +4,9 @@ from .category import Category
 from .product import Product
 from .stock_movement import StockMovement
 from .stock_store import StockStore
+from .stock_reservation import StockReservation
+from .stock_summary import StockSummary
+from .stock_snapshot import StockSnapshot, StockSnapshotItem
 from .supplier import Supplier
 from .client import Client
 from .carrier import Carrier
@@ -11,6 +14,12 @@ from .product_entry import ProductEntry, ProductEntryItem
 from .internal_distribution import InternalDistribution, InternalDistributionItem
 from .sale import Sale, SaleItem
 from .store import Store
+from .idempotency_key import IdempotencyKey
+from .table_version import TableVersion
+from .outbox import OutboxEvent, OutboxSequence
+from .movement_archive import (
+    StockMovementArchive, StockMovementArchiveReference, StockMovementArchiveTotal,
+)
 
 __all__ = [
     "Client",
@@ -19,6 +28,10 @@ __all__ = [
     "Supplier",
     "Store",
     "StockStore",
+    "StockReservation",
+    "StockSummary",
+    "StockSnapshot",
+    "StockSnapshotItem",
     "ProductEntry",
     "ProductEntryItem",
     "InternalDistribution",
@@ -27,4 +40,11 @@ __all__ = [
     "Sale",
     "SaleItem",
     "StockMovement",
+    "IdempotencyKey",
+    "TableVersion",
+    "OutboxEvent",
+    "OutboxSequence",
+    "StockMovementArchive",
+    "StockMovementArchiveTotal",
+    "StockMovementArchiveReference",
 ]
@@ -0,0 +1,21 @@
+"""IdempotencyKey model."""
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+
+class IdempotencyKey(Base):
+    """Modelo de chave de idempotência com a resposta original da requisição."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Consulta de repetição: uma busca pelo índice único (scope, key)
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)  # ex.: sales, entries, internal_distributions
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
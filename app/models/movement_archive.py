@@ -0,0 +1,53 @@
+"""StockMovementArchive, StockMovementArchiveTotal and StockMovementArchiveReference models."""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.database import Base
+
+
+class StockMovementArchive(Base):
+    """Mês de movimentações arquivado em arquivo NDJSON compactado (fora de stock_movements)."""
+    __tablename__ = "stock_movement_archives"
+
+    id = Column(Integer, primary_key=True)
+    # Intervalo [period_start, period_end) de movement_date
+    period_start = Column(DateTime, nullable=False, unique=True)
+    period_end = Column(DateTime, nullable=False)
+    path = Column(String(500), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    min_movement_id = Column(Integer, nullable=True)
+    max_movement_id = Column(Integer, nullable=True)
+    sha256 = Column(String(64), nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    totals = relationship("StockMovementArchiveTotal", back_populates="archive")
+    references = relationship("StockMovementArchiveReference", back_populates="archive")
+
+
+class StockMovementArchiveTotal(Base):
+    """Efeito líquido das movimentações arquivadas de um mês por loja/produto (reconciliação)."""
+    __tablename__ = "stock_movement_archive_totals"
+
+    archive_id = Column(Integer, ForeignKey("stock_movement_archives.id"), primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    net_quantity = Column(Integer, nullable=False)
+
+    # Relationships
+    archive = relationship("StockMovementArchive", back_populates="totals")
+
+
+class StockMovementArchiveReference(Base):
+    """Documento (reference_type, reference_id) com movimentações em um mês arquivado (estornos)."""
+    __tablename__ = "stock_movement_archive_references"
+    __table_args__ = (
+        Index("ix_stock_movement_archive_references_reference", "reference_type", "reference_id"),
+    )
+
+    archive_id = Column(Integer, ForeignKey("stock_movement_archives.id"), primary_key=True)
+    reference_type = Column(String(50), primary_key=True)
+    reference_id = Column(Integer, primary_key=True)
+
+    # Relationships
+    archive = relationship("StockMovementArchive", back_populates="references")
@@ -0,0 +1,33 @@
+"""Outbox models."""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+
+class OutboxEvent(Base):
+    """Movimentação de estoque pendente de entrega aos sistemas externos (transactional outbox)."""
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Sequência por loja, sem lacunas: consumidores detectam eventos faltantes
+        UniqueConstraint("store_id", "sequence", name="uq_outbox_events_store_sequence"),
+        # Busca dos pendentes pelo dispatcher, em ordem de gravação
+        Index("ix_outbox_events_pending", "dispatched_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, nullable=False)
+    sequence = Column(BigInteger, nullable=False)
+    # Sem chave estrangeira: stock_movements pode ser particionada/arquivada
+    movement_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    dispatched_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500), nullable=True)
+
+
+class OutboxSequence(Base):
+    """Último número de sequência do outbox por loja."""
+    __tablename__ = "outbox_sequences"
+
+    store_id = Column(Integer, primary_key=True)
+    last_sequence = Column(BigInteger, nullable=False, default=0)
@@ -1,5 +1,5 @@
 """Product model."""
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -7,6 +7,10 @@ from app.db.database import Base
 class Product(Base):
     """Modelo de produto."""
     __tablename__ = "products"
+    __table_args__ = (
+        # Sincronização incremental (/sync): produtos por (revision, id)
+        Index("ix_products_revision_id", "revision", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), unique=True, nullable=False)
@@ -16,6 +20,8 @@ class Product(Base):
     date_added = Column(Date, nullable=True)
     active = Column(Boolean, default=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    # Versão da tabela products (table_versions) em que o produto mudou pela última vez
+    revision = Column(BigInteger, nullable=False, default=0)
 
     # Relationships
     category = relationship("Category")
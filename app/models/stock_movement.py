@@ -1,13 +1,29 @@
 """StockMovement model."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
 
 
 class StockMovement(Base):
-    """Modelo de movimentação de estoque (auditoria)."""
+    """
+    Modelo de movimentação de estoque (auditoria).
+
+    No PostgreSQL, a migração 0010 particiona a tabela por mês de movement_date
+    (chave primária (id, movement_date)); o ORM continua identificando as linhas
+    só pelo id, que vem de uma sequência única. Nenhuma tabela tem chave
+    estrangeira para stock_movements, para que meses antigos possam ser
+    arquivados (MovementArchiveService).
+    """
     __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_reference", "reference_type", "reference_id"),
+        Index("ix_stock_movements_store_product_date", "store_id", "product_id", "movement_date"),
+        # Reconciliação por faixas de produtos (ReconciliationService)
+        Index("ix_stock_movements_product_store", "product_id", "store_id"),
+        # Paginação por chave de /movements sem filtros: ORDER BY movement_date DESC, id DESC
+        Index("ix_stock_movements_date_id", "movement_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -0,0 +1,27 @@
+"""StockReservation model."""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class StockReservation(Base):
+    """Reserva temporária de estoque (ex.: venda pendente de um carrinho de e-commerce)."""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Varredura das reservas ativas vencidas, em lotes
+        Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+        # Confirmação/liberação das reservas de um documento
+        Index("ix_stock_reservations_reference", "reference_type", "reference_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # active, confirmed, released ou expired
+    status = Column(String(20), nullable=False, default="active")
+    reference_type = Column(String(50), nullable=True)
+    reference_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    resolved_at = Column(DateTime, nullable=True)
@@ -0,0 +1,34 @@
+"""StockSnapshot and StockSnapshotItem models."""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.database import Base
+
+
+class StockSnapshot(Base):
+    """Modelo de fotografia periódica dos saldos de estoque."""
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    taken_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_movement_id = Column(Integer, nullable=False, default=0)  # maior StockMovement.id incluído
+
+    # Relationships
+    items = relationship("StockSnapshotItem", back_populates="snapshot")
+
+
+class StockSnapshotItem(Base):
+    """Modelo de saldo de uma loja/produto em uma fotografia."""
+    __tablename__ = "stock_snapshot_items"
+    __table_args__ = (
+        Index("ix_stock_snapshot_items_snapshot_store", "snapshot_id", "store_id", "product_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+    # Relationships
+    snapshot = relationship("StockSnapshot", back_populates="items")
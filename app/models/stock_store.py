@@ -1,5 +1,5 @@
 """StockStore model."""
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -8,11 +8,18 @@ from app.db.database import Base
 class StockStore(Base):
     """Modelo de estoque por loja."""
     __tablename__ = "stock_store"
+    __table_args__ = (
+        # Um único saldo por loja/produto; o índice da constraint atende às
+        # consultas por (store_id, product_id)
+        UniqueConstraint("store_id", "product_id", name="uq_stock_store_store_product"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False, default=0)
+    # Soma das reservas ativas (stock_reservations); disponível = quantity - reserved
+    reserved = Column(Integer, nullable=False, default=0)
     updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
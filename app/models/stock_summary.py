@@ -0,0 +1,20 @@
+"""StockSummary model."""
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+
+class StockSummary(Base):
+    """Modelo de resumo materializado do estoque por loja e categoria."""
+    __tablename__ = "stock_summary"
+    __table_args__ = (
+        UniqueConstraint("store_id", "category_id", name="uq_stock_summary_store_category"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    category_id = Column(Integer, nullable=False, default=0)  # 0 = produtos sem categoria
+    total_units = Column(Integer, nullable=False, default=0)
+    cost_value = Column(Float, nullable=False, default=0.0)
+    sale_value = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,11 @@
+"""TableVersion model."""
+from sqlalchemy import Column, BigInteger, String
+from app.db.database import Base
+
+
+class TableVersion(Base):
+    """Contador de versão por tabela, incrementado na mesma transação de cada escrita (ETags)."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
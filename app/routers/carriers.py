@@ -1,6 +1,9 @@
 """Router para gerenciar transportadoras."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
+from app.core.reference_cache import reference_cache
 from app.db.database import get_db
 from app.models import Carrier
 from app.schemas.carrier import CarrierCreate, CarrierUpdate, CarrierRead
@@ -10,9 +13,11 @@ router = APIRouter(prefix="/carriers", tags=["carriers"])
 
 @router.get("", response_model=list[CarrierRead])
 def list_carriers(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
 ):
     """Lista todas as transportadoras com filtros opcionais."""
@@ -21,27 +26,29 @@ def list_carriers(
     if name:
         query = query.filter(Carrier.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Carrier.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[CarrierRead])
 def list_carriers_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     name: str | None = None,
 ):
-    """Lista todas as transportadoras sem limite com filtros opcionais."""
+    """Lista todas as transportadoras sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(Carrier)
     
     if name:
         query = query.filter(Carrier.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).all()
+    query = query.order_by(Carrier.id)
+    return stream_export(query.offset(skip), CarrierRead, export_format, "carriers")
 
 
 @router.get("/{carrier_id}", response_model=CarrierRead)
 def get_carrier(carrier_id: int, db: Session = Depends(get_db)):
     """Obtém uma transportadora pelo ID."""
-    carrier = db.query(Carrier).filter(Carrier.id == carrier_id).first()
+    carrier = reference_cache.get(db, Carrier, carrier_id)
     if not carrier:
         raise HTTPException(status_code=404, detail="Transportadora não encontrada")
     return carrier
@@ -59,6 +66,7 @@ def create_carrier(carrier: CarrierCreate, db: Session = Depends(get_db)):
     db.add(db_carrier)
     db.commit()
     db.refresh(db_carrier)
+    reference_cache.invalidate(Carrier, db_carrier.id)
     return db_carrier
 
 
@@ -79,6 +87,7 @@ def update_carrier(
     
     db.commit()
     db.refresh(db_carrier)
+    reference_cache.invalidate(Carrier, db_carrier.id)
     return db_carrier
 
 
@@ -91,3 +100,4 @@ def delete_carrier(carrier_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_carrier)
     db.commit()
+    reference_cache.invalidate(Carrier, carrier_id)
@@ -1,6 +1,9 @@
 """Router para gerenciar categorias."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
+from app.core.reference_cache import reference_cache
 from app.db.database import get_db
 from app.models import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryRead
@@ -10,9 +13,11 @@ router = APIRouter(prefix="/categories", tags=["categories"])
 
 @router.get("", response_model=list[CategoryRead])
 def list_categories(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
 ):
     """Lista todas as categorias com filtros opcionais."""
@@ -21,27 +26,29 @@ def list_categories(
     if name:
         query = query.filter(Category.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Category.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[CategoryRead])
 def list_categories_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     name: str | None = None,
 ):
-    """Lista todas as categorias sem limite com filtros opcionais."""
+    """Lista todas as categorias sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(Category)
     
     if name:
         query = query.filter(Category.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).all()
+    query = query.order_by(Category.id)
+    return stream_export(query.offset(skip), CategoryRead, export_format, "categories")
 
 
 @router.get("/{category_id}", response_model=CategoryRead)
 def get_category(category_id: int, db: Session = Depends(get_db)):
     """Obtém uma categoria pelo ID."""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = reference_cache.get(db, Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
     return category
@@ -59,6 +66,7 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    reference_cache.invalidate(Category, db_category.id)
     return db_category
 
 
@@ -79,6 +87,7 @@ def update_category(
     
     db.commit()
     db.refresh(db_category)
+    reference_cache.invalidate(Category, db_category.id)
     return db_category
 
 
@@ -91,3 +100,4 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_category)
     db.commit()
+    reference_cache.invalidate(Category, category_id)
@@ -1,6 +1,8 @@
 """Router para gerenciar clientes."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
 from app.db.database import get_db
 from app.models import Client
 from app.schemas.client import ClientCreate, ClientUpdate, ClientRead
@@ -10,9 +12,11 @@ router = APIRouter(prefix="/clients", tags=["clients"])
 
 @router.get("", response_model=list[ClientRead])
 def list_clients(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
 ):
     """Lista todos os clientes com filtros opcionais."""
@@ -21,21 +25,23 @@ def list_clients(
     if name:
         query = query.filter(Client.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Client.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[ClientRead])
 def list_clients_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     name: str | None = None,
 ):
-    """Lista todos os clientes sem limite com filtros opcionais."""
+    """Lista todos os clientes sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(Client)
     
     if name:
         query = query.filter(Client.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).all()
+    query = query.order_by(Client.id)
+    return stream_export(query.offset(skip), ClientRead, export_format, "clients")
 
 
 @router.get("/{client_id}", response_model=ClientRead)
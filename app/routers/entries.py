@@ -1,24 +1,31 @@
 """Router para gerenciar entradas de produtos."""
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session, selectinload
+from app.core.export import ExportFormat, stream_export
+from app.core.idempotency import IDEMPOTENCY_KEY_HEADER, replay_response
+from app.core.pagination import paginate
 from app.db.database import get_db
 from app.models import ProductEntry, ProductEntryItem
 from app.schemas.product_entry import ProductEntryCreate, ProductEntryRead
 from app.services.entries_service import EntriesService
+from app.services.stock_service import ArchivedMovementsError, CANCELLED_STATUS, InsufficientStockError
+from app.services.idempotency_service import IdempotencyKeyConflictError, IdempotencyService
 
 router = APIRouter(prefix="/entries", tags=["entries"])
 
 
 @router.get("", response_model=list[ProductEntryRead])
 def list_entries(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     supplier_id: int | None = None,
     status: str | None = None,
 ):
     """Lista entradas de produtos com filtros opcionais."""
-    query = db.query(ProductEntry)
+    query = db.query(ProductEntry).options(selectinload(ProductEntry.items))
     
     if supplier_id:
         query = query.filter(ProductEntry.supplier_id == supplier_id)
@@ -26,17 +33,18 @@ def list_entries(
     if status:
         query = query.filter(ProductEntry.status == status)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [ProductEntry.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[ProductEntryRead])
 def list_entries_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     supplier_id: int | None = None,
     status: str | None = None,
 ):
-    """Lista entradas de produtos sem limite com filtros opcionais."""
-    query = db.query(ProductEntry)
+    """Lista entradas de produtos sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
+    query = db.query(ProductEntry).options(selectinload(ProductEntry.items))
     
     if supplier_id:
         query = query.filter(ProductEntry.supplier_id == supplier_id)
@@ -44,13 +52,16 @@ def list_entries_all(
     if status:
         query = query.filter(ProductEntry.status == status)
     
-    return query.offset(skip).all()
+    query = query.order_by(ProductEntry.id)
+    return stream_export(query.offset(skip), ProductEntryRead, export_format, "entries")
 
 
 @router.get("/{entry_id}", response_model=ProductEntryRead)
 def get_entry(entry_id: int, db: Session = Depends(get_db)):
     """Obtém uma entrada de produtos pelo ID."""
-    entry = db.query(ProductEntry).filter(ProductEntry.id == entry_id).first()
+    entry = db.query(ProductEntry).options(
+        selectinload(ProductEntry.items)
+    ).filter(ProductEntry.id == entry_id).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Entrada não encontrada")
     return entry
@@ -60,7 +71,8 @@ def get_entry(entry_id: int, db: Session = Depends(get_db)):
 def create_entry(
     entry: ProductEntryCreate,
     store_id: int = Query(1, description="ID da loja para registrar o estoque"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
 ):
     """
     Cria uma nova entrada de produtos com registro automático de movimentação de estoque.
@@ -72,7 +84,18 @@ def create_entry(
     
     Se qualquer erro ocorrer após a criação dos itens, a transação é revertida
     e nenhuma movimentação é registrada, garantindo a integridade dos dados.
+    
+    Com o cabeçalho Idempotency-Key, a resposta é gravada na mesma transação; uma
+    repetição com a mesma chave devolve a resposta original sem movimentar o estoque
+    (422 se a chave já foi usada com outro corpo).
     """
+    request_hash = None
+    if idempotency_key:
+        request_hash = IdempotencyService.request_hash({"store_id": store_id, **entry.model_dump(mode="json")})
+        replay = replay_response(IdempotencyService.find(db, "entries", idempotency_key), request_hash)
+        if replay:
+            return replay
+
     try:
         # Criar entrada
         db_entry = ProductEntry(
@@ -103,11 +126,22 @@ def create_entry(
         # Registrar movimentações de estoque
         EntriesService.register_entry_movements(db, db_entry.id, store_id)
 
+        # Gravar a resposta para repetições, na mesma transação do estoque
+        if idempotency_key:
+            IdempotencyService.save(
+                db, "entries", idempotency_key, request_hash, 201,
+                ProductEntryRead.model_validate(db_entry).model_dump(mode="json"),
+            )
+
         # Commit da transação
         db.commit()
         db.refresh(db_entry)
         return db_entry
 
+    except IdempotencyKeyConflictError:
+        # Requisição concorrente com a mesma chave concluiu primeiro
+        db.rollback()
+        return replay_response(IdempotencyService.find(db, "entries", idempotency_key), request_hash)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Erro ao criar entrada: {str(e)}")
@@ -119,11 +153,29 @@ def update_entry(
     status: str = Query(..., description="Novo status da entrada"),
     db: Session = Depends(get_db)
 ):
-    """Atualiza o status de uma entrada de produtos."""
-    db_entry = db.query(ProductEntry).filter(ProductEntry.id == entry_id).first()
+    """
+    Atualiza o status de uma entrada de produtos.
+    
+    COMENTÁRIO DE AUDITORIA: A mudança para 'cancelled' estorna no razão as
+    movimentações da entrada (EntriesService.cancel_entry), na mesma transação;
+    retorna 409 se as unidades recebidas já saíram da loja ou se as
+    movimentações estão em um mês arquivado. Uma entrada cancelada não muda
+    mais de status (409).
+    """
+    db_entry = db.query(ProductEntry).filter(ProductEntry.id == entry_id).with_for_update().first()
     if not db_entry:
         raise HTTPException(status_code=404, detail="Entrada não encontrada")
     
+    if db_entry.status == CANCELLED_STATUS and status != CANCELLED_STATUS:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Entrada cancelada não pode mudar de status")
+    if status == CANCELLED_STATUS and db_entry.status != CANCELLED_STATUS:
+        try:
+            EntriesService.cancel_entry(db, db_entry)
+        except (InsufficientStockError, ArchivedMovementsError) as e:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=str(e))
+    
     db_entry.status = status
     db.commit()
     db.refresh(db_entry)
@@ -132,11 +184,23 @@ def update_entry(
 
 @router.delete("/{entry_id}", status_code=204)
 def delete_entry(entry_id: int, db: Session = Depends(get_db)):
-    """Deleta uma entrada de produtos."""
-    db_entry = db.query(ProductEntry).filter(ProductEntry.id == entry_id).first()
+    """
+    Deleta uma entrada de produtos.
+    
+    As movimentações da entrada são estornadas no razão antes da exclusão (409
+    se as unidades recebidas já saíram da loja ou se as movimentações estão em
+    um mês arquivado).
+    """
+    db_entry = db.query(ProductEntry).filter(ProductEntry.id == entry_id).with_for_update().first()
     if not db_entry:
         raise HTTPException(status_code=404, detail="Entrada não encontrada")
     
+    try:
+        EntriesService.cancel_entry(db, db_entry)
+    except (InsufficientStockError, ArchivedMovementsError) as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    
     # Deletar itens associados
     db.query(ProductEntryItem).filter(
         ProductEntryItem.product_entry_id == entry_id
@@ -1,25 +1,32 @@
 """Router para gerenciar distribuições internas entre lojas."""
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session, selectinload
+from app.core.export import ExportFormat, stream_export
+from app.core.idempotency import IDEMPOTENCY_KEY_HEADER, replay_response
+from app.core.pagination import paginate
 from app.db.database import get_db
 from app.models import InternalDistribution, InternalDistributionItem
 from app.schemas.internal_distribution import InternalDistributionCreate, InternalDistributionRead
 from app.services.distributions_service import DistributionsService
+from app.services.stock_service import ArchivedMovementsError, CANCELLED_STATUS, InsufficientStockError
+from app.services.idempotency_service import IdempotencyKeyConflictError, IdempotencyService
 
 router = APIRouter(prefix="/internal-distributions", tags=["internal-distributions"])
 
 
 @router.get("", response_model=list[InternalDistributionRead])
 def list_distributions(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     from_store_id: int | None = None,
     to_store_id: int | None = None,
     status: str | None = None,
 ):
     """Lista distribuições internas com filtros opcionais."""
-    query = db.query(InternalDistribution)
+    query = db.query(InternalDistribution).options(selectinload(InternalDistribution.items))
     
     if from_store_id:
         query = query.filter(InternalDistribution.from_store_id == from_store_id)
@@ -30,18 +37,19 @@ def list_distributions(
     if status:
         query = query.filter(InternalDistribution.status == status)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [InternalDistribution.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[InternalDistributionRead])
 def list_distributions_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     from_store_id: int | None = None,
     to_store_id: int | None = None,
     status: str | None = None,
 ):
-    """Lista distribuições internas sem limite com filtros opcionais."""
-    query = db.query(InternalDistribution)
+    """Lista distribuições internas sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
+    query = db.query(InternalDistribution).options(selectinload(InternalDistribution.items))
     
     if from_store_id:
         query = query.filter(InternalDistribution.from_store_id == from_store_id)
@@ -52,13 +60,18 @@ def list_distributions_all(
     if status:
         query = query.filter(InternalDistribution.status == status)
     
-    return query.offset(skip).all()
+    query = query.order_by(InternalDistribution.id)
+    return stream_export(
+        query.offset(skip), InternalDistributionRead, export_format, "internal_distributions",
+    )
 
 
 @router.get("/{distribution_id}", response_model=InternalDistributionRead)
 def get_distribution(distribution_id: int, db: Session = Depends(get_db)):
     """Obtém uma distribuição interna pelo ID."""
-    distribution = db.query(InternalDistribution).filter(
+    distribution = db.query(InternalDistribution).options(
+        selectinload(InternalDistribution.items)
+    ).filter(
         InternalDistribution.id == distribution_id
     ).first()
     if not distribution:
@@ -69,29 +82,32 @@ def get_distribution(distribution_id: int, db: Session = Depends(get_db)):
 @router.post("", response_model=InternalDistributionRead, status_code=201)
 def create_distribution(
     distribution: InternalDistributionCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
 ):
     """
     Cria uma nova distribuição interna com registro automático de movimentação de estoque.
     
     COMENTÁRIO DE AUDITORIA: Esta rota implementa a lógica transacional completa:
-    1. Valida se há estoque suficiente na loja de origem
-    2. Cria o cabeçalho da distribuição (InternalDistribution)
-    3. Cria todos os itens (InternalDistributionItem)
-    4. Registra as movimentações de estoque (transfer_out e transfer_in) e atualiza StockStore
+    1. Cria o cabeçalho da distribuição (InternalDistribution)
+    2. Cria todos os itens (InternalDistributionItem)
+    3. Bloqueia os saldos, valida o estoque na loja de origem e registra as
+       movimentações (transfer_out e transfer_in) em um único passo
     
     Se qualquer erro ocorrer, a transação é revertida e nenhuma movimentação é registrada.
+    
+    Com o cabeçalho Idempotency-Key, a resposta é gravada na mesma transação; uma
+    repetição com a mesma chave devolve a resposta original sem movimentar o estoque
+    (422 se a chave já foi usada com outro corpo).
     """
-    try:
-        # Validar estoque na loja de origem
-        items_list = [item.dict() for item in distribution.items]
-        is_valid, error_msg = DistributionsService.validate_distribution_items_stock(
-            db, distribution.from_store_id, items_list
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=error_msg)
+    request_hash = None
+    if idempotency_key:
+        request_hash = IdempotencyService.request_hash(distribution.model_dump(mode="json"))
+        replay = replay_response(IdempotencyService.find(db, "internal_distributions", idempotency_key), request_hash)
+        if replay:
+            return replay
 
+    try:
         # Criar distribuição
         db_distribution = InternalDistribution(
             from_store_id=distribution.from_store_id,
@@ -113,14 +129,28 @@ def create_distribution(
             db.add(db_item)
         db.flush()
 
-        # Registrar movimentações de estoque
+        # Validar estoque e registrar movimentações (linhas bloqueadas)
         DistributionsService.register_transfer_movements(db, db_distribution.id)
 
+        # Gravar a resposta para repetições, na mesma transação do estoque
+        if idempotency_key:
+            IdempotencyService.save(
+                db, "internal_distributions", idempotency_key, request_hash, 201,
+                InternalDistributionRead.model_validate(db_distribution).model_dump(mode="json"),
+            )
+
         # Commit da transação
         db.commit()
         db.refresh(db_distribution)
         return db_distribution
 
+    except IdempotencyKeyConflictError:
+        # Requisição concorrente com a mesma chave concluiu primeiro
+        db.rollback()
+        return replay_response(IdempotencyService.find(db, "internal_distributions", idempotency_key), request_hash)
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         db.rollback()
         raise
@@ -135,13 +165,31 @@ def update_distribution(
     status: str = Query(..., description="Novo status da distribuição"),
     db: Session = Depends(get_db)
 ):
-    """Atualiza o status de uma distribuição interna."""
+    """
+    Atualiza o status de uma distribuição interna.
+    
+    COMENTÁRIO DE AUDITORIA: A mudança para 'cancelled' devolve as unidades à
+    loja de origem no razão (DistributionsService.cancel_distribution), na mesma
+    transação; retorna 409 se as unidades já saíram da loja de destino ou se
+    as movimentações estão em um mês arquivado. Uma distribuição cancelada não
+    muda mais de status (409).
+    """
     db_distribution = db.query(InternalDistribution).filter(
         InternalDistribution.id == distribution_id
-    ).first()
+    ).with_for_update().first()
     if not db_distribution:
         raise HTTPException(status_code=404, detail="Distribuição não encontrada")
     
+    if db_distribution.status == CANCELLED_STATUS and status != CANCELLED_STATUS:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Distribuição cancelada não pode mudar de status")
+    if status == CANCELLED_STATUS and db_distribution.status != CANCELLED_STATUS:
+        try:
+            DistributionsService.cancel_distribution(db, db_distribution)
+        except (InsufficientStockError, ArchivedMovementsError) as e:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=str(e))
+    
     db_distribution.status = status
     db.commit()
     db.refresh(db_distribution)
@@ -150,13 +198,25 @@ def update_distribution(
 
 @router.delete("/{distribution_id}", status_code=204)
 def delete_distribution(distribution_id: int, db: Session = Depends(get_db)):
-    """Deleta uma distribuição interna."""
+    """
+    Deleta uma distribuição interna.
+    
+    As transferências são estornadas no razão antes da exclusão (409 se as
+    unidades já saíram da loja de destino ou se as movimentações estão em um
+    mês arquivado).
+    """
     db_distribution = db.query(InternalDistribution).filter(
         InternalDistribution.id == distribution_id
-    ).first()
+    ).with_for_update().first()
     if not db_distribution:
         raise HTTPException(status_code=404, detail="Distribuição não encontrada")
     
+    try:
+        DistributionsService.cancel_distribution(db, db_distribution)
+    except (InsufficientStockError, ArchivedMovementsError) as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    
     # Deletar itens associados
     db.query(InternalDistributionItem).filter(
         InternalDistributionItem.internal_distribution_id == distribution_id
@@ -0,0 +1,57 @@
+"""Router para métricas operacionais."""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import registry
+from app.core.reference_cache import reference_cache
+from app.core.sql_profiler import profile_store
+from app.db import database
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """Métricas deste worker no formato texto do Prometheus."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    """
+    Métricas do pool de conexões deste worker.
+
+    Gauges (tamanho, conexões em uso, overflow) e contadores acumulados de
+    checkouts, tempo de espera por conexão e timeouts.
+    """
+    metrics = {"sync": database.pool_metrics.snapshot(database.engine.pool)}
+    if database.async_engine is not None:
+        metrics["async"] = database.async_pool_metrics.snapshot(database.async_engine.sync_engine.pool)
+    return metrics
+
+
+@router.get("/cache")
+def get_cache_metrics():
+    """Acertos, faltas, descartes e entradas do cache de dados de referência deste worker, por tabela."""
+    return reference_cache.stats()
+
+
+@router.get("/sql-profiles")
+def list_sql_profiles():
+    """Resumo dos últimos relatórios de profiling de SQL deste worker."""
+    return [profile.summary() for profile in profile_store.recent()]
+
+
+@router.get("/sql-profiles/{profile_id}")
+def get_sql_profile(profile_id: int):
+    """
+    Relatório de profiling de SQL de uma requisição.
+
+    Lista cada instrução com duração e ponto de chamada, e agrupa em repeated as
+    instruções idênticas executadas várias vezes (padrão N+1).
+    """
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Relatório de profiling não encontrado")
+    return profile.report()
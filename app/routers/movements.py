@@ -1,18 +1,25 @@
 """Router para gerenciar movimentações de estoque."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
 from app.db.database import get_db
 from app.models import StockMovement
 from app.schemas.stock_movement import StockMovementRead
+from app.services.movement_archive_service import MovementArchiveService
 
 router = APIRouter(prefix="/movements", tags=["movements"])
 
 
 @router.get("", response_model=list[StockMovementRead])
 def list_movements(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     product_id: int | None = None,
     store_id: int | None = None,
     movement_type: str | None = None,
@@ -33,18 +40,22 @@ def list_movements(
     if reference_type:
         query = query.filter(StockMovement.reference_type == reference_type)
     
-    return query.order_by(StockMovement.movement_date.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        query, response, [StockMovement.movement_date, StockMovement.id],
+        limit, cursor, skip, descending=True,
+    )
 
 @router.get("/all", response_model=list[StockMovementRead])
 def list_movements_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     product_id: int | None = None,
     store_id: int | None = None,
     movement_type: str | None = None,
     reference_type: str | None = None,
 ):
-    """Lista movimentações de estoque sem limite com filtros opcionais."""
+    """Lista movimentações de estoque sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(StockMovement)
     
     if product_id:
@@ -59,7 +70,40 @@ def list_movements_all(
     if reference_type:
         query = query.filter(StockMovement.reference_type == reference_type)
     
-    return query.order_by(StockMovement.movement_date.desc()).offset(skip).all()
+    query = query.order_by(StockMovement.movement_date.desc(), StockMovement.id.desc())
+    return stream_export(query.offset(skip), StockMovementRead, export_format, "movements")
+
+
+@router.get("/archived", response_model=list[StockMovementRead])
+def list_movements_archived(
+    db: Session = Depends(get_db),
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
+    product_id: int | None = None,
+    store_id: int | None = None,
+    movement_type: str | None = None,
+    reference_type: str | None = None,
+):
+    """
+    Lista movimentações de meses arquivados (fora de stock_movements), em streaming.
+
+    Só os arquivos dos meses que se sobrepõem a [date_from, date_to] são lidos;
+    as movimentações saem em ordem de mês e id.
+    """
+    archives = MovementArchiveService.archives_in_range(db, date_from, date_to)
+    missing = [archive.path for archive in archives if not os.path.exists(archive.path)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Arquivo de movimentações não encontrado: {missing[0]}")
+
+    records = MovementArchiveService.read_archived(
+        archives, date_from, date_to,
+        product_id=product_id,
+        store_id=store_id,
+        movement_type=movement_type,
+        reference_type=reference_type,
+    )
+    return stream_export(records, StockMovementRead, export_format, "movements_archived")
 
 
 @router.get("/{movement_id}", response_model=StockMovementRead)
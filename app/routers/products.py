@@ -1,23 +1,50 @@
 """Router para gerenciar produtos."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+import tempfile
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from app.core.etag import ETAG_HEADER, etag_matches, make_etag, not_modified, table_version
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
+from app.core.reference_cache import reference_cache
 from app.db.database import get_db
-from app.models import Product
-from app.schemas.product import ProductCreate, ProductUpdate, ProductRead
+from app.models import Product, Store
+from app.schemas.product import ProductCreate, ProductImportReport, ProductUpdate, ProductRead
+from app.services.product_import_service import ImportFormat, ProductImportService
+from app.services.stock_summary_service import StockSummaryService
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Corpo da importação mantido em memória até este tamanho; acima disso vai para disco
+IMPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
 
 @router.get("", response_model=list[ProductRead])
 def list_products(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
     category_id: int | None = None,
     active: bool | None = None,
+    if_none_match: str | None = Header(None),
 ):
-    """Lista todos os produtos com filtros opcionais."""
+    """
+    Lista todos os produtos com filtros opcionais.
+    
+    Responde 304 se If-None-Match traz o ETag atual (versão da tabela products
+    e parâmetros da consulta), sem executar a listagem.
+    """
+    etag = make_etag(
+        "products", table_version(db, "products"), skip, limit, cursor, name, category_id, active,
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers[ETAG_HEADER] = etag
+    
     query = db.query(Product)
     
     if name:
@@ -29,17 +56,18 @@ def list_products(
     if active is not None:
         query = query.filter(Product.active == active)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Product.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[ProductRead])
 def list_products_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     name: str | None = None,
     category_id: int | None = None,
     active: bool | None = None,
 ):
-    """Lista todos os produtos sem limite com filtros opcionais."""
+    """Lista todos os produtos sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(Product)
     
     if name:
@@ -51,7 +79,8 @@ def list_products_all(
     if active is not None:
         query = query.filter(Product.active == active)
     
-    return query.offset(skip).all()
+    query = query.order_by(Product.id)
+    return stream_export(query.offset(skip), ProductRead, export_format, "products")
 
 
 @router.get("/{product_id}", response_model=ProductRead)
@@ -78,21 +107,68 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     return db_product
 
 
+@router.post("/import", response_model=ProductImportReport)
+async def import_products(
+    request: Request,
+    import_format: ImportFormat = Query(ImportFormat.csv, alias="format"),
+    store_id: int | None = Query(None, description="Loja dos saldos iniciais (coluna opening_quantity)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Importa produtos em massa a partir do corpo da requisição (CSV com cabeçalho ou NDJSON).
+
+    Produtos com nome já cadastrado são atualizados; opening_quantity define o
+    saldo da loja store_id. O corpo é lido em streaming para um arquivo
+    temporário e processado em blocos, com um relatório de erros por linha.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_SIZE)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        source = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+        def run_import():
+            if store_id is not None and not reference_cache.get(db, Store, store_id):
+                raise HTTPException(status_code=404, detail="Loja não encontrada")
+            try:
+                return ProductImportService.import_file(db, source, import_format, store_id)
+            except UnicodeDecodeError:
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Arquivo deve estar em UTF-8")
+
+        return await run_in_threadpool(run_import)
+    finally:
+        spool.close()
+
+
 @router.put("/{product_id}", response_model=ProductRead)
 def update_product(
     product_id: int,
     product: ProductUpdate,
     db: Session = Depends(get_db)
 ):
-    """Atualiza um produto."""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    """
+    Atualiza um produto.
+    
+    A linha é bloqueada antes de ler os preços antigos: duas atualizações
+    concorrentes reavaliam o resumo de estoque uma depois da outra, cada uma a
+    partir dos preços já gravados pela anterior.
+    """
+    db_product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
     if not db_product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
+    previous = (db_product.category_id, db_product.cost_price, db_product.sale_price)
     update_data = product.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_product, field, value)
     
+    # Reavaliar o resumo de estoque se preço ou categoria mudaram
+    current = (db_product.category_id, db_product.cost_price, db_product.sale_price)
+    if current != previous:
+        StockSummaryService.reprice_product(db, db_product.id, *previous, *current)
+    
     db.commit()
     db.refresh(db_product)
     return db_product
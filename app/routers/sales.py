@@ -1,25 +1,35 @@
 """Router para gerenciar vendas."""
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.core.export import ExportFormat, stream_export
+from app.core.idempotency import IDEMPOTENCY_KEY_HEADER, replay_response
+from app.core.pagination import paginate
 from app.db.database import get_db
 from app.models import Sale, SaleItem
-from app.schemas.sale import SaleCreate, SaleRead
+from app.schemas.sale import SaleBatchCreate, SaleBatchRead, SaleCreate, SaleRead
 from app.services.sales_service import SalesService
+from app.services.stock_service import (
+    ArchivedMovementsError, CANCELLED_STATUS, InsufficientStockError, ReservationExpiredError,
+)
+from app.services.idempotency_service import IdempotencyKeyConflictError, IdempotencyService
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
 
 @router.get("", response_model=list[SaleRead])
 def list_sales(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     client_id: int | None = None,
     store_id: int | None = None,
     status: str | None = None,
 ):
     """Lista vendas com filtros opcionais."""
-    query = db.query(Sale)
+    query = db.query(Sale).options(selectinload(Sale.items))
     
     if client_id:
         query = query.filter(Sale.client_id == client_id)
@@ -30,18 +40,19 @@ def list_sales(
     if status:
         query = query.filter(Sale.status == status)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Sale.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[SaleRead])
 def list_sales_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     client_id: int | None = None,
     store_id: int | None = None,
     status: str | None = None,
 ):
-    """Lista vendas sem limite com filtros opcionais."""
-    query = db.query(Sale)
+    """Lista vendas sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
+    query = db.query(Sale).options(selectinload(Sale.items))
     
     if client_id:
         query = query.filter(Sale.client_id == client_id)
@@ -52,13 +63,16 @@ def list_sales_all(
     if status:
         query = query.filter(Sale.status == status)
     
-    return query.offset(skip).all()
+    query = query.order_by(Sale.id)
+    return stream_export(query.offset(skip), SaleRead, export_format, "sales")
 
 
 @router.get("/{sale_id}", response_model=SaleRead)
 def get_sale(sale_id: int, db: Session = Depends(get_db)):
     """Obtém uma venda pelo ID."""
-    sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    sale = db.query(Sale).options(
+        selectinload(Sale.items)
+    ).filter(Sale.id == sale_id).first()
     if not sale:
         raise HTTPException(status_code=404, detail="Venda não encontrada")
     return sale
@@ -67,30 +81,44 @@ def get_sale(sale_id: int, db: Session = Depends(get_db)):
 @router.post("", response_model=SaleRead, status_code=201)
 def create_sale(
     sale: SaleCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+    reserve: bool = Query(False, description="Reserva o estoque em vez de baixá-lo (confirmar com POST /sales/{id}/confirm)"),
 ):
     """
     Cria uma nova venda com validação de estoque e registro automático de movimentação.
     
     COMENTÁRIO DE AUDITORIA: Esta rota implementa a lógica transacional completa:
-    1. Valida se há estoque suficiente na loja para todos os itens
-    2. Cria o cabeçalho da venda (Sale)
-    3. Cria todos os itens (SaleItem)
-    4. Registra as movimentações de estoque (movement_type='sale') e atualiza StockStore
+    1. Cria o cabeçalho da venda (Sale)
+    2. Cria todos os itens (SaleItem)
+    3. Bloqueia os saldos (SELECT ... FOR UPDATE), valida o estoque e registra as
+       movimentações (movement_type='sale') em um único passo
     
+    A validação acontece sobre as linhas bloqueadas, de modo que vendas concorrentes
+    do mesmo produto não conseguem deixar o estoque negativo.
     Se houver estoque insuficiente, retorna 400 com mensagem clara.
     Se qualquer erro ocorrer após a criação dos itens, a transação é revertida.
+    
+    Com o cabeçalho Idempotency-Key, a resposta é gravada na mesma transação; uma
+    repetição com a mesma chave devolve a resposta original sem movimentar o estoque
+    (422 se a chave já foi usada com outro corpo).
+    
+    Com reserve=true (ex.: carrinhos de e-commerce), o passo 3 reserva o estoque
+    por RESERVATION_TTL_SECONDS em vez de registrar as movimentações: as unidades
+    ficam indisponíveis para outras vendas, mas o saldo só é baixado em
+    POST /sales/{id}/confirm. Reservas vencidas são liberadas pelo varredor.
     """
-    try:
-        # Validar estoque
-        items_list = [item.dict() for item in sale.items]
-        is_valid, error_msg = SalesService.validate_sale_items_stock(
-            db, sale.store_id, items_list
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=error_msg)
+    request_hash = None
+    if idempotency_key:
+        body = sale.model_dump(mode="json")
+        if reserve:
+            body["reserve"] = True
+        request_hash = IdempotencyService.request_hash(body)
+        replay = replay_response(IdempotencyService.find(db, "sales", idempotency_key), request_hash)
+        if replay:
+            return replay
 
+    try:
         # Criar venda
         db_sale = Sale(
             client_id=sale.client_id,
@@ -119,14 +147,31 @@ def create_sale(
             db.add(db_item)
         db.flush()
 
-        # Registrar movimentações de estoque
-        SalesService.register_sale_movements(db, db_sale.id)
+        # Validar estoque e registrar movimentações (ou reservas) com as linhas bloqueadas
+        if reserve:
+            SalesService.reserve_sale_items(db, db_sale.id)
+        else:
+            SalesService.register_sale_movements(db, db_sale.id)
+
+        # Gravar a resposta para repetições, na mesma transação do estoque
+        if idempotency_key:
+            IdempotencyService.save(
+                db, "sales", idempotency_key, request_hash, 201,
+                SaleRead.model_validate(db_sale).model_dump(mode="json"),
+            )
 
         # Commit da transação
         db.commit()
         db.refresh(db_sale)
         return db_sale
 
+    except IdempotencyKeyConflictError:
+        # Requisição concorrente com a mesma chave concluiu primeiro
+        db.rollback()
+        return replay_response(IdempotencyService.find(db, "sales", idempotency_key), request_hash)
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         db.rollback()
         raise
@@ -135,30 +180,150 @@ def create_sale(
         raise HTTPException(status_code=400, detail=f"Erro ao criar venda: {str(e)}")
 
 
+@router.post("/batch", response_model=SaleBatchRead)
+def create_sales_batch(
+    batch: SaleBatchCreate,
+    chunk_size: int | None = Query(None, ge=1, le=5000, description="Vendas por transação (padrão: SALES_BATCH_CHUNK_SIZE)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Cria vendas em lote (ex.: fechamento de caixa de lojas offline).
+    
+    COMENTÁRIO DE AUDITORIA: As vendas são processadas em blocos de chunk_size,
+    com um commit por bloco para manter as transações limitadas. Dentro de um
+    bloco, o estoque é validado contra um único mapa de saldos bloqueados e as
+    vendas aceitas são gravadas com inserts em massa (ver
+    SalesService.create_sales_chunk). Cada venda é reportada individualmente;
+    uma venda rejeitada não impede as demais. Se a gravação de um bloco falhar,
+    apenas aquele bloco é revertido e todas as suas vendas são reportadas com erro.
+    """
+    size = chunk_size or settings.sales_batch_chunk_size
+    results = []
+    for start in range(0, len(batch.sales), size):
+        chunk = batch.sales[start:start + size]
+        try:
+            results.extend(SalesService.create_sales_chunk(db, chunk, start))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            results.extend(
+                {
+                    'index': start + offset,
+                    'success': False,
+                    'sale_id': None,
+                    'error': f"Erro ao gravar o bloco: {str(e)}",
+                }
+                for offset in range(len(chunk))
+            )
+
+    succeeded = sum(1 for result in results if result['success'])
+    return {
+        'total': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    }
+
+
 @router.put("/{sale_id}", response_model=SaleRead)
 def update_sale(
     sale_id: int,
     status: str = Query(..., description="Novo status da venda"),
     db: Session = Depends(get_db)
 ):
-    """Atualiza o status de uma venda."""
-    db_sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    """
+    Atualiza o status de uma venda.
+    
+    COMENTÁRIO DE AUDITORIA: A mudança para 'cancelled' libera as reservas e
+    estorna no razão as movimentações da venda (SalesService.cancel_sale), na
+    mesma transação. Uma venda cancelada não muda mais de status, e uma venda
+    com movimentações em um mês arquivado não pode ser cancelada (409).
+    """
+    db_sale = db.query(Sale).filter(Sale.id == sale_id).with_for_update().first()
     if not db_sale:
         raise HTTPException(status_code=404, detail="Venda não encontrada")
     
+    if db_sale.status == CANCELLED_STATUS and status != CANCELLED_STATUS:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Venda cancelada não pode mudar de status")
+    if status == CANCELLED_STATUS and db_sale.status != CANCELLED_STATUS:
+        try:
+            SalesService.cancel_sale(db, db_sale)
+        except (InsufficientStockError, ArchivedMovementsError) as e:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=str(e))
+    
     db_sale.status = status
     db.commit()
     db.refresh(db_sale)
     return db_sale
 
 
+@router.post("/{sale_id}/confirm", response_model=SaleRead)
+def confirm_sale(sale_id: int, db: Session = Depends(get_db)):
+    """
+    Confirma uma venda criada com reserve=true.
+    
+    Converte as reservas ativas em movimentações de venda (baixa do saldo) e muda
+    o status para 'confirmed'. Retorna 409 se a venda não tem reserva ativa ou se
+    a reserva já venceu.
+    """
+    db_sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    if not db_sale:
+        raise HTTPException(status_code=404, detail="Venda não encontrada")
+
+    try:
+        if not SalesService.confirm_sale(db, db_sale):
+            raise HTTPException(status_code=409, detail="Venda sem reserva ativa")
+        db.commit()
+    except ReservationExpiredError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        db.rollback()
+        raise
+    db.refresh(db_sale)
+    return db_sale
+
+
+@router.post("/{sale_id}/release", response_model=SaleRead)
+def release_sale(sale_id: int, db: Session = Depends(get_db)):
+    """
+    Libera a reserva de uma venda criada com reserve=true e muda o status para
+    'cancelled'. Retorna 409 se a venda não tem reserva ativa.
+    """
+    db_sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    if not db_sale:
+        raise HTTPException(status_code=404, detail="Venda não encontrada")
+
+    if not SalesService.release_sale(db, db_sale):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Venda sem reserva ativa")
+    db.commit()
+    db.refresh(db_sale)
+    return db_sale
+
+
 @router.delete("/{sale_id}", status_code=204)
 def delete_sale(sale_id: int, db: Session = Depends(get_db)):
-    """Deleta uma venda."""
-    db_sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    """
+    Deleta uma venda.
+    
+    As reservas ativas são liberadas e as movimentações da venda estornadas no
+    razão antes da exclusão; as movimentações originais e as compensatórias
+    permanecem em stock_movements para auditoria. Retorna 409 se as
+    movimentações da venda estão em um mês arquivado.
+    """
+    db_sale = db.query(Sale).filter(Sale.id == sale_id).with_for_update().first()
     if not db_sale:
         raise HTTPException(status_code=404, detail="Venda não encontrada")
     
+    try:
+        SalesService.cancel_sale(db, db_sale)
+    except (InsufficientStockError, ArchivedMovementsError) as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    
     # Deletar itens associados
     db.query(SaleItem).filter(SaleItem.sale_id == sale_id).delete()
     
@@ -1,6 +1,10 @@
 """Router para gerenciar lojas."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.etag import ETAG_HEADER, etag_matches, make_etag, not_modified, table_version
+from app.core.export import ExportFormat, stream_export
+from app.core.pagination import paginate
+from app.core.reference_cache import reference_cache
 from app.db.database import get_db
 from app.models import Store
 from app.schemas.store import StoreCreate, StoreUpdate, StoreRead
@@ -10,9 +14,11 @@ router = APIRouter(prefix="/stores", tags=["stores"])
 
 @router.get("", response_model=list[StoreRead])
 def list_stores(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
 ):
     """Lista todas as lojas com filtros opcionais."""
@@ -21,29 +27,41 @@ def list_stores(
     if name:
         query = query.filter(Store.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Store.id], limit, cursor, skip)
 
 @router.get("/all", response_model=list[StoreRead])
 def list_stores_all(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
+    export_format: ExportFormat = Query(ExportFormat.json, alias="format"),
     name: str | None = None,
 ):
-    """Lista todas as lojas sem limite com filtros opcionais."""
+    """Lista todas as lojas sem limite com filtros opcionais, em streaming (json, ndjson ou csv)."""
     query = db.query(Store)
     
     if name:
         query = query.filter(Store.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).all()
+    query = query.order_by(Store.id)
+    return stream_export(query.offset(skip), StoreRead, export_format, "stores")
 
 
 @router.get("/{store_id}", response_model=StoreRead)
-def get_store(store_id: int, db: Session = Depends(get_db)):
-    """Obtém uma loja pelo ID."""
-    store = db.query(Store).filter(Store.id == store_id).first()
+def get_store(
+    store_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    if_none_match: str | None = Header(None),
+):
+    """Obtém uma loja pelo ID (304 se If-None-Match traz o ETag atual)."""
+    etag = make_etag("stores", table_version(db, "stores"), store_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    store = reference_cache.get(db, Store, store_id)
     if not store:
         raise HTTPException(status_code=404, detail="Loja não encontrada")
+    response.headers[ETAG_HEADER] = etag
     return store
 
 
@@ -59,6 +77,7 @@ def create_store(store: StoreCreate, db: Session = Depends(get_db)):
     db.add(db_store)
     db.commit()
     db.refresh(db_store)
+    reference_cache.invalidate(Store, db_store.id)
     return db_store
 
 
@@ -79,6 +98,7 @@ def update_store(
     
     db.commit()
     db.refresh(db_store)
+    reference_cache.invalidate(Store, db_store.id)
     return db_store
 
 
@@ -91,3 +111,4 @@ def delete_store(store_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_store)
     db.commit()
+    reference_cache.invalidate(Store, store_id)
@@ -1,6 +1,8 @@
 """Router para gerenciar fornecedores."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.pagination import paginate
+from app.core.reference_cache import reference_cache
 from app.db.database import get_db
 from app.models import Supplier
 from app.schemas.supplier import SupplierCreate, SupplierUpdate, SupplierRead
@@ -10,9 +12,11 @@ router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 
 @router.get("", response_model=list[SupplierRead])
 def list_suppliers(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
     name: str | None = None,
 ):
     """Lista todos os fornecedores com filtros opcionais."""
@@ -21,13 +25,13 @@ def list_suppliers(
     if name:
         query = query.filter(Supplier.name.ilike(f"%{name}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, response, [Supplier.id], limit, cursor, skip)
 
 
 @router.get("/{supplier_id}", response_model=SupplierRead)
 def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
     """Obtém um fornecedor pelo ID."""
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = reference_cache.get(db, Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
     return supplier
@@ -45,6 +49,7 @@ def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db)):
     db.add(db_supplier)
     db.commit()
     db.refresh(db_supplier)
+    reference_cache.invalidate(Supplier, db_supplier.id)
     return db_supplier
 
 
@@ -65,6 +70,7 @@ def update_supplier(
     
     db.commit()
     db.refresh(db_supplier)
+    reference_cache.invalidate(Supplier, db_supplier.id)
     return db_supplier
 
 
@@ -77,3 +83,4 @@ def delete_supplier(supplier_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_supplier)
     db.commit()
+    reference_cache.invalidate(Supplier, supplier_id)
@@ -0,0 +1,32 @@
+"""Router para a sincronização incremental dos terminais de loja."""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.reference_cache import reference_cache
+from app.db.database import get_db
+from app.models import Store
+from app.schemas.sync import SyncRead
+from app.services.sync_service import SyncService, SyncTokenError
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncRead)
+def sync(
+    store_id: int,
+    since: str | None = Query(None, description="Token devolvido pela sincronização anterior"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """
+    Produtos (com preços) e saldos da loja alterados desde o token.
+    
+    Sem since, devolve o catálogo e os saldos completos. Enquanto has_more for
+    true, repita a chamada com o token recebido; ao final, guarde o token para
+    a próxima sincronização.
+    """
+    if not reference_cache.get(db, Store, store_id):
+        raise HTTPException(status_code=404, detail="Loja não encontrada")
+    try:
+        return SyncService.changes(db, store_id, since, limit)
+    except SyncTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,5 +1,5 @@
 """Product schemas."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 
 
@@ -37,3 +37,26 @@ class ProductRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProductImportRow(ProductCreate):
+    """Linha de importação de produtos (CSV/NDJSON)."""
+    category: str | None = None  # nome da categoria, alternativa a category_id
+    opening_quantity: int | None = Field(None, ge=0)  # saldo inicial na loja da importação
+
+
+class ProductImportError(BaseModel):
+    """Erro de uma linha da importação."""
+    line: int
+    name: str | None = None
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    """Relatório de uma importação de produtos."""
+    total_rows: int
+    created: int
+    updated: int
+    failed: int
+    opening_balances: int
+    errors: list[ProductImportError]
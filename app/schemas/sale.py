@@ -56,3 +56,24 @@ class SaleRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SaleBatchCreate(BaseModel):
+    """Schema para criar vendas em lote (fechamento de caixa)."""
+    sales: list[SaleCreate]
+
+
+class SaleBatchResult(BaseModel):
+    """Resultado de uma venda do lote."""
+    index: int
+    success: bool
+    sale_id: int | None = None
+    error: str | None = None
+
+
+class SaleBatchRead(BaseModel):
+    """Schema para ler o resultado de um lote de vendas."""
+    total: int
+    succeeded: int
+    failed: int
+    results: list[SaleBatchResult]
@@ -0,0 +1,20 @@
+"""StockSnapshot schemas."""
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class StockSnapshotRead(BaseModel):
+    """Schema para ler fotografia de estoque."""
+    id: int
+    taken_at: datetime
+    last_movement_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class StockAsOfRead(BaseModel):
+    """Schema para ler o saldo reconstruído em uma data."""
+    store_id: int
+    product_id: int
+    quantity: int
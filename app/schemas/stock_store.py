@@ -1,6 +1,10 @@
 """StockStore schemas."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from app.schemas.stock_movement import StockMovementRead
+
+# Itens por contagem em POST /stock/adjustments (uma transação)
+STOCK_ADJUSTMENT_MAX_ITEMS = 10000
 
 
 class StockStoreCreate(BaseModel):
@@ -11,8 +15,9 @@ class StockStoreCreate(BaseModel):
 
 
 class StockStoreUpdate(BaseModel):
-    """Schema para atualizar estoque por loja."""
-    quantity: int | None = None
+    """Schema para atualizar estoque por loja (quantidade contada, lançada como ajuste)."""
+    quantity: int | None = Field(None, ge=0)
+    notes: str | None = None
 
 
 class StockStoreRead(BaseModel):
@@ -21,7 +26,28 @@ class StockStoreRead(BaseModel):
     store_id: int
     product_id: int
     quantity: int
+    reserved: int = 0
     updated_at: datetime | None = None
 
     class Config:
         from_attributes = True
+
+
+class StockCountItem(BaseModel):
+    """Quantidade contada de um produto em uma loja."""
+    store_id: int
+    product_id: int
+    quantity: int = Field(..., ge=0)
+
+
+class StockAdjustmentBatch(BaseModel):
+    """Schema para lançar uma contagem de inventário (POST /stock/adjustments)."""
+    items: list[StockCountItem] = Field(..., min_length=1, max_length=STOCK_ADJUSTMENT_MAX_ITEMS)
+    notes: str | None = None
+
+
+class StockAdjustmentRead(BaseModel):
+    """Resultado de uma contagem: itens contados, ajustados e movimentações geradas."""
+    counted: int
+    adjusted: int
+    movements: list[StockMovementRead]
@@ -0,0 +1,14 @@
+"""StockSummary schemas."""
+from pydantic import BaseModel
+
+
+class StockSummaryRead(BaseModel):
+    """Schema para ler o resumo de estoque por loja (e categoria)."""
+    store_id: int
+    category_id: int | None = None
+    total_units: int
+    cost_value: float
+    sale_value: float
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,17 @@
+"""Sync schemas."""
+from pydantic import BaseModel
+from app.schemas.product import ProductRead
+from app.schemas.stock_store import StockStoreRead
+
+
+class ProductSyncRead(ProductRead):
+    """Produto alterado, com a revisão em que mudou."""
+    revision: int
+
+
+class SyncRead(BaseModel):
+    """Página de alterações para a sincronização incremental de um terminal."""
+    products: list[ProductSyncRead]
+    stock: list[StockStoreRead]
+    token: str
+    has_more: bool
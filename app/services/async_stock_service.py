@@ -0,0 +1,100 @@
+"""
+Versão assíncrona do serviço de estoque.
+
+Usada pela pilha assíncrona (ASYNC_DB=true). As consultas simples são feitas
+diretamente com AsyncSession; o motor de movimentações reaproveita o
+StockService síncrono via AsyncSession.run_sync, que executa o mesmo código ORM
+sobre a conexão asyncpg sem ocupar uma thread do pool enquanto aguarda o banco.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import StockStore, StockMovement
+from app.services.stock_service import StockService
+
+
+class AsyncStockService:
+    """Serviço assíncrono para gerenciar movimentações de estoque."""
+
+    @staticmethod
+    async def register_movements(
+        db: AsyncSession,
+        movements: list[dict],
+        check_stock: bool = False,
+    ) -> list[StockMovement]:
+        """
+        Registra um lote de movimentações de estoque (ver StockService.register_movements).
+
+        Args:
+            db: Sessão assíncrona do banco de dados
+            movements: Lista de movimentações
+            check_stock: Se True, rejeita saídas que deixariam o estoque negativo
+
+        Returns:
+            list: Movimentações criadas, na mesma ordem do lote
+        """
+        return await db.run_sync(StockService.register_movements, movements, check_stock)
+
+    @staticmethod
+    async def register_movement(
+        db: AsyncSession,
+        product_id: int,
+        store_id: int,
+        movement_type: str,
+        quantity: int,
+        reference_id: int | None = None,
+        reference_type: str | None = None,
+        notes: str | None = None,
+    ) -> StockMovement:
+        """
+        Registra uma movimentação de estoque (ver StockService.register_movement).
+
+        Returns:
+            StockMovement: Registro de movimentação criado
+        """
+        movements = await AsyncStockService.register_movements(db, [{
+            'product_id': product_id,
+            'store_id': store_id,
+            'movement_type': movement_type,
+            'quantity': quantity,
+            'reference_id': reference_id,
+            'reference_type': reference_type,
+            'notes': notes,
+        }])
+        return movements[0]
+
+    @staticmethod
+    async def get_stock_by_store_and_product(
+        db: AsyncSession,
+        store_id: int,
+        product_id: int,
+    ) -> int:
+        """
+        Obtém a quantidade de estoque para uma loja e produto.
+
+        Returns:
+            int: Quantidade de estoque (0 se não existir)
+        """
+        quantity = await db.scalar(select(StockStore.quantity).where(
+            StockStore.store_id == store_id,
+            StockStore.product_id == product_id,
+        ))
+        return quantity or 0
+
+    @staticmethod
+    async def validate_stock_availability(
+        db: AsyncSession,
+        store_id: int,
+        product_id: int,
+        required_quantity: int,
+    ) -> bool:
+        """
+        Valida se há estoque disponível (quantity - reserved) suficiente para uma operação.
+
+        Returns:
+            bool: True se há estoque suficiente, False caso contrário
+        """
+        available = await db.scalar(select(StockStore.quantity - StockStore.reserved).where(
+            StockStore.store_id == store_id,
+            StockStore.product_id == product_id,
+        ))
+        return available is not None and available >= required_quantity
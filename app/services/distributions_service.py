@@ -6,46 +6,12 @@ com registro automático de movimentações de estoque.
 """
 from sqlalchemy.orm import Session
 from app.models import InternalDistribution, InternalDistributionItem
-from app.services.stock_service import StockService
+from app.services.stock_service import CANCELLED_STATUS, StockService
 
 
 class DistributionsService:
     """Serviço para gerenciar distribuições internas."""
 
-    @staticmethod
-    def validate_distribution_items_stock(
-        db: Session,
-        from_store_id: int,
-        items: list[dict],
-    ) -> tuple[bool, str]:
-        """
-        Valida se há estoque suficiente na loja de origem para todos os itens.
-        
-        Args:
-            db: Sessão do banco de dados
-            from_store_id: ID da loja de origem
-            items: Lista de itens com 'product_id' e 'quantity'
-            
-        Returns:
-            tuple: (bool, str) - (sucesso, mensagem de erro se houver)
-        """
-        for item in items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity')
-
-            if not StockService.validate_stock_availability(
-                db, from_store_id, product_id, quantity
-            ):
-                current_stock = StockService.get_stock_by_store_and_product(
-                    db, from_store_id, product_id
-                )
-                return False, (
-                    f"Estoque insuficiente na loja de origem para o produto {product_id}. "
-                    f"Disponível: {current_stock}, Solicitado: {quantity}"
-                )
-
-        return True, ""
-
     @staticmethod
     def register_transfer_movements(
         db: Session,
@@ -55,8 +21,9 @@ class DistributionsService:
         Registra as movimentações de estoque para uma distribuição interna.
         
         COMENTÁRIO DE AUDITORIA: Esta função é chamada após a criação de uma
-        InternalDistribution e seus InternalDistributionItems. Para cada item, ela:
-        1. Decrementa o estoque na loja de origem (transfer_out)
+        InternalDistribution e seus InternalDistributionItems. Para cada item, em
+        um único lote (StockService.register_movements), ela:
+        1. Bloqueia, valida e decrementa o estoque na loja de origem (transfer_out)
         2. Incrementa o estoque na loja de destino (transfer_in)
         3. Cria dois registros de auditoria em StockMovement:
            - Um com movement_type='transfer_out' na loja de origem
@@ -72,6 +39,9 @@ class DistributionsService:
             
         Returns:
             list: Lista de movimentações criadas
+            
+        Raises:
+            InsufficientStockError: Se não houver estoque suficiente na origem
         """
         # Buscar distribuição
         distribution = db.query(InternalDistribution).filter(
@@ -88,30 +58,52 @@ class DistributionsService:
 
         movements = []
         for item in items:
-            # Registrar saída na loja de origem
-            out_movement = StockService.register_movement(
-                db=db,
-                product_id=item.product_id,
-                store_id=distribution.from_store_id,
-                movement_type='transfer_out',
-                quantity=item.quantity,
-                reference_id=distribution_id,
-                reference_type='distribution',
-                notes=f"Transferência para loja {distribution.to_store_id}",
-            )
-            movements.append(out_movement)
+            # Saída na loja de origem
+            movements.append({
+                'product_id': item.product_id,
+                'store_id': distribution.from_store_id,
+                'movement_type': 'transfer_out',
+                'quantity': item.quantity,
+                'reference_id': distribution_id,
+                'reference_type': 'distribution',
+                'notes': f"Transferência para loja {distribution.to_store_id}",
+            })
+
+            # Entrada na loja de destino
+            movements.append({
+                'product_id': item.product_id,
+                'store_id': distribution.to_store_id,
+                'movement_type': 'transfer_in',
+                'quantity': item.quantity,
+                'reference_id': distribution_id,
+                'reference_type': 'distribution',
+                'notes': f"Transferência da loja {distribution.from_store_id}",
+            })
 
-            # Registrar entrada na loja de destino
-            in_movement = StockService.register_movement(
-                db=db,
-                product_id=item.product_id,
-                store_id=distribution.to_store_id,
-                movement_type='transfer_in',
-                quantity=item.quantity,
-                reference_id=distribution_id,
-                reference_type='distribution',
-                notes=f"Transferência da loja {distribution.from_store_id}",
-            )
-            movements.append(in_movement)
+        # Registrar todas as movimentações da distribuição em um único lote
+        return StockService.register_movements(db, movements, check_stock=True)
 
+    @staticmethod
+    def cancel_distribution(db: Session, distribution: InternalDistribution) -> list:
+        """
+        Cancela uma distribuição: devolve as unidades à loja de origem
+        (transfer_out no destino, transfer_in na origem) e muda o status para
+        'cancelled'.
+        
+        Args:
+            db: Sessão do banco de dados
+            distribution: Distribuição, já bloqueada (SELECT ... FOR UPDATE)
+            
+        Returns:
+            list: Movimentações compensatórias criadas
+            
+        Raises:
+            InsufficientStockError: Se as unidades já saíram da loja de destino
+            ArchivedMovementsError: Se a distribuição tem movimentações arquivadas
+        """
+        movements = StockService.reverse_reference(
+            db, 'distribution', distribution.id,
+            notes=f"Estorno da distribuição #{distribution.id}",
+        )
+        distribution.status = CANCELLED_STATUS
         return movements
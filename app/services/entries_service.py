@@ -5,9 +5,8 @@ Este módulo implementa a lógica de criação de entradas de produtos com
 registro automático de movimentações de estoque.
 """
 from sqlalchemy.orm import Session
-from datetime import datetime
 from app.models import ProductEntry, ProductEntryItem
-from app.services.stock_service import StockService
+from app.services.stock_service import CANCELLED_STATUS, StockService
 
 
 class EntriesService:
@@ -23,7 +22,8 @@ class EntriesService:
         Registra as movimentações de estoque para uma entrada de produtos.
         
         COMENTÁRIO DE AUDITORIA: Esta função é chamada após a criação de uma
-        ProductEntry e seus ProductEntryItems. Para cada item, ela:
+        ProductEntry e seus ProductEntryItems. Para cada item, em um único lote
+        (StockService.register_movements), ela:
         1. Incrementa o estoque na loja (StockStore.quantity += item.quantity)
         2. Cria um registro de auditoria em StockMovement com:
            - movement_type='entry'
@@ -44,19 +44,39 @@ class EntriesService:
             ProductEntryItem.product_entry_id == product_entry_id
         ).all()
 
-        movements = []
-        for item in items:
-            # Registrar movimentação de entrada
-            movement = StockService.register_movement(
-                db=db,
-                product_id=item.product_id,
-                store_id=store_id,
-                movement_type='entry',
-                quantity=item.quantity,
-                reference_id=product_entry_id,
-                reference_type='entry',
-                notes=f"Entrada de produto - Fornecedor: {item.product_entry_id}",
-            )
-            movements.append(movement)
+        # Registrar todas as movimentações de entrada em um único lote
+        return StockService.register_movements(db, [
+            {
+                'product_id': item.product_id,
+                'store_id': store_id,
+                'movement_type': 'entry',
+                'quantity': item.quantity,
+                'reference_id': product_entry_id,
+                'reference_type': 'entry',
+                'notes': f"Entrada de produto - Fornecedor: {item.product_entry_id}",
+            }
+            for item in items
+        ])
 
+    @staticmethod
+    def cancel_entry(db: Session, entry: ProductEntry) -> list:
+        """
+        Cancela uma entrada: estorna as movimentações de entrada com saídas
+        compensatórias (adjustment_out) e muda o status para 'cancelled'.
+        
+        Args:
+            db: Sessão do banco de dados
+            entry: Entrada, já bloqueada (SELECT ... FOR UPDATE)
+            
+        Returns:
+            list: Movimentações compensatórias criadas
+            
+        Raises:
+            InsufficientStockError: Se as unidades recebidas já saíram da loja
+            ArchivedMovementsError: Se a entrada tem movimentações arquivadas
+        """
+        movements = StockService.reverse_reference(
+            db, 'entry', entry.id, notes=f"Estorno da entrada #{entry.id}",
+        )
+        entry.status = CANCELLED_STATUS
         return movements
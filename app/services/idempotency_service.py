@@ -0,0 +1,92 @@
+"""
+Serviço de chaves de idempotência.
+
+POST /sales, /entries e /internal-distributions aceitam o cabeçalho
+Idempotency-Key. A resposta da primeira execução é gravada na mesma transação que
+movimenta o estoque; uma repetição com a mesma chave e o mesmo corpo recebe a
+resposta gravada, com uma única consulta indexada e sem tocar no estoque.
+"""
+import hashlib
+import json
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import IdempotencyKey
+
+
+class IdempotencyKeyConflictError(ValueError):
+    """A chave foi gravada por outra transação concorrente."""
+
+    def __init__(self, scope: str, key: str):
+        self.scope = scope
+        self.key = key
+        super().__init__(f"Idempotency-Key {key} já registrada em {scope}")
+
+
+class IdempotencyService:
+    """Serviço para gravar e consultar respostas por chave de idempotência."""
+
+    @staticmethod
+    def request_hash(payload: dict) -> str:
+        """
+        Calcula o hash canônico do corpo (e parâmetros) de uma requisição.
+
+        Args:
+            payload: Dados da requisição serializáveis em JSON
+
+        Returns:
+            str: SHA-256 hexadecimal
+        """
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def find(db: Session, scope: str, key: str) -> IdempotencyKey | None:
+        """
+        Busca uma chave já utilizada.
+
+        Args:
+            db: Sessão do banco de dados
+            scope: Rota protegida (ex.: 'sales')
+            key: Valor do cabeçalho Idempotency-Key
+
+        Returns:
+            IdempotencyKey | None: Registro com a resposta original
+        """
+        return db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+        ).first()
+
+    @staticmethod
+    def save(
+        db: Session,
+        scope: str,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        body: dict,
+    ) -> IdempotencyKey:
+        """
+        Grava a resposta de uma requisição na transação corrente.
+
+        COMENTÁRIO DE AUDITORIA: Deve ser chamado antes do commit que movimenta
+        o estoque. Se outra requisição com a mesma chave terminar primeiro, o
+        índice único rejeita esta gravação e a transação inteira (documento e
+        movimentações) deve ser revertida pelo chamador.
+
+        Raises:
+            IdempotencyKeyConflictError: Se a chave já foi gravada
+        """
+        record = IdempotencyKey(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            status_code=status_code,
+            response_body=json.dumps(body, ensure_ascii=False),
+        )
+        db.add(record)
+        try:
+            db.flush()
+        except IntegrityError as e:
+            raise IdempotencyKeyConflictError(scope, key) from e
+        return record
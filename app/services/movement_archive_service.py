@@ -0,0 +1,293 @@
+"""
+Serviço de partições e arquivamento do razão de movimentações (stock_movements).
+
+No PostgreSQL, stock_movements é particionada por mês de movement_date (migração
+0010): consultas por período leem só as partições do intervalo, e um mês
+inteiro sai da tabela com DETACH/DROP, sem DELETE linha a linha. As partições
+dos próximos MOVEMENT_PARTITIONS_AHEAD meses são criadas na subida da aplicação
+e por scripts/manage_movement_partitions.py (cron); a partição DEFAULT só recebe
+linhas se essa criação atrasar.
+
+O arquivamento grava um mês frio em NDJSON compactado (gzip) em
+MOVEMENT_ARCHIVE_DIR, registra o arquivo em stock_movement_archives e guarda em
+stock_movement_archive_totals o efeito líquido do mês por loja/produto, que a
+reconciliação soma ao razão vivo. Em outros bancos (ex.: SQLite), o mesmo
+fluxo remove o mês com DELETE por intervalo de movement_date.
+
+Os demais leitores do razão não enxergam o mês arquivado, então:
+- só se arquiva um mês já coberto por uma fotografia de estoque
+  (last_movement_id >= maior id do mês): /stock/as-of a partir dessa
+  fotografia não precisa das linhas arquivadas, e datas anteriores a ela são
+  recusadas (StockSnapshotService.get_stock_as_of);
+- os documentos com movimentações no mês ficam em
+  stock_movement_archive_references, e seu estorno é recusado
+  (StockService.reverse_reference).
+
+As movimentações arquivadas continuam consultáveis por GET /movements/archived,
+que lê os arquivos do período pedido em streaming.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import (
+    StockMovement, StockMovementArchive, StockMovementArchiveReference, StockMovementArchiveTotal,
+    StockSnapshot,
+)
+from app.services.stock_service import StockService
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do banco por bloco ao gravar o arquivo
+ARCHIVE_CHUNK_SIZE = 5000
+# Colunas gravadas em cada linha do arquivo, na ordem do modelo
+ARCHIVE_COLUMNS = [column.name for column in StockMovement.__table__.columns]
+
+
+def month_start(moment: datetime) -> datetime:
+    """Primeiro instante do mês de moment."""
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """Primeiro instante do mês months meses depois (ou antes) de month."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """Nome da partição mensal (ex.: stock_movements_y2026m01)."""
+    return f"stock_movements_y{month.year:04d}m{month.month:02d}"
+
+
+class MovementArchiveService:
+    """Serviço para manter as partições e arquivar meses de stock_movements."""
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        """Se stock_movements é uma tabela particionada do PostgreSQL."""
+        if db.get_bind().dialect.name != 'postgresql':
+            return False
+        return db.execute(text(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('stock_movements')"
+        )).scalar() or False
+
+    @staticmethod
+    def ensure_partitions(
+        db: Session,
+        months_ahead: int | None = None,
+        now: datetime | None = None,
+    ) -> list[str]:
+        """
+        Cria as partições mensais do mês atual e dos próximos meses, se faltarem.
+
+        Args:
+            db: Sessão do banco de dados
+            months_ahead: Meses à frente (padrão: MOVEMENT_PARTITIONS_AHEAD)
+            now: Referência do mês atual (padrão: agora, UTC)
+
+        Returns:
+            list: Nomes das partições criadas (vazia fora do PostgreSQL particionado)
+        """
+        if not MovementArchiveService.is_partitioned(db):
+            return []
+
+        ahead = settings.movement_partitions_ahead if months_ahead is None else months_ahead
+        current = month_start(now or datetime.utcnow())
+        created = []
+        for offset in range(ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(month)
+            if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                continue
+            db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF stock_movements "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            created.append(name)
+        return created
+
+    @staticmethod
+    def archive_month(
+        db: Session,
+        month: datetime,
+        directory: str | None = None,
+    ) -> StockMovementArchive:
+        """
+        Arquiva um mês de movimentações e o remove de stock_movements.
+
+        COMENTÁRIO DE AUDITORIA: Na transação do chamador:
+        1. Exige uma fotografia de estoque que inclua todas as movimentações
+           do mês (last_movement_id >= maior id do mês)
+        2. As linhas do mês são lidas em blocos (yield_per), em ordem de id, e
+           gravadas em um arquivo .ndjson.gz temporário, renomeado só depois do
+           fsync; o SHA-256 do arquivo fica registrado
+        3. O efeito líquido do mês por (store_id, product_id) e os documentos
+           (reference_type, reference_id) do mês são gravados em
+           stock_movement_archive_totals e stock_movement_archive_references,
+           cada um com um INSERT ... SELECT no banco
+        4. O mês sai da tabela: DETACH PARTITION + DROP no PostgreSQL
+           particionado (mais um DELETE para linhas que caíram na partição
+           DEFAULT), DELETE por intervalo nos demais bancos
+
+        Se o commit falhar, o banco fica como antes e o arquivo é regravado na
+        próxima execução.
+
+        Args:
+            db: Sessão do banco de dados
+            month: Qualquer instante do mês a arquivar
+            directory: Diretório dos arquivos (padrão: MOVEMENT_ARCHIVE_DIR)
+
+        Returns:
+            StockMovementArchive: Registro do arquivamento
+
+        Raises:
+            ValueError: Se o mês não terminou, já foi arquivado ou não está
+                coberto por uma fotografia de estoque
+        """
+        start = month_start(month)
+        end = add_months(start, 1)
+        if end > month_start(datetime.utcnow()):
+            raise ValueError(f"O mês {start:%Y-%m} ainda não terminou")
+        if db.query(StockMovementArchive.id).filter(StockMovementArchive.period_start == start).first():
+            raise ValueError(f"O mês {start:%Y-%m} já foi arquivado")
+
+        in_month = (StockMovement.movement_date >= start, StockMovement.movement_date < end)
+        last_id = db.query(func.max(StockMovement.id)).filter(*in_month).scalar()
+        covered = db.query(func.max(StockSnapshot.last_movement_id)).scalar() or 0
+        if last_id is not None and covered < last_id:
+            raise ValueError(
+                f"O mês {start:%Y-%m} não está coberto por uma fotografia de estoque; "
+                "grave uma fotografia (POST /stock/snapshots) antes de arquivá-lo"
+            )
+
+        directory = directory or settings.movement_archive_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"stock_movements_{start:%Y_%m}.ndjson.gz")
+
+        row_count, min_id, max_id = MovementArchiveService._write_file(db, path, in_month)
+        archive = StockMovementArchive(
+            period_start=start,
+            period_end=end,
+            path=path,
+            row_count=row_count,
+            min_movement_id=min_id,
+            max_movement_id=max_id,
+            sha256=MovementArchiveService.file_sha256(path),
+            archived_at=datetime.utcnow(),
+        )
+        db.add(archive)
+        db.flush()
+
+        db.execute(insert(StockMovementArchiveTotal).from_select(
+            ['archive_id', 'store_id', 'product_id', 'net_quantity'],
+            select(
+                literal(archive.id),
+                StockMovement.store_id,
+                StockMovement.product_id,
+                func.sum(StockService.signed_quantity_sql()),
+            ).where(*in_month).group_by(StockMovement.store_id, StockMovement.product_id),
+        ))
+        db.execute(insert(StockMovementArchiveReference).from_select(
+            ['archive_id', 'reference_type', 'reference_id'],
+            select(
+                literal(archive.id),
+                StockMovement.reference_type,
+                StockMovement.reference_id,
+            ).where(
+                *in_month,
+                StockMovement.reference_type.is_not(None),
+                StockMovement.reference_id.is_not(None),
+            ).distinct(),
+        ))
+
+        if MovementArchiveService.is_partitioned(db):
+            name = partition_name(start)
+            if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                db.execute(text(f"ALTER TABLE stock_movements DETACH PARTITION {name}"))
+                db.execute(text(f"DROP TABLE {name}"))
+        db.execute(delete(StockMovement).where(*in_month))
+        logger.info("Mês %s arquivado em %s (%d movimentações)", f"{start:%Y-%m}", path, row_count)
+        return archive
+
+    @staticmethod
+    def _write_file(db: Session, path: str, in_month) -> tuple[int, int | None, int | None]:
+        """Grava as movimentações do mês em path (gzip, uma linha JSON por movimentação)."""
+        table = StockMovement.__table__
+        rows = db.execute(
+            select(table).where(*in_month).order_by(table.c.id).execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+        )
+        count, min_id, max_id = 0, None, None
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as file:
+            for row in rows:
+                record = dict(zip(ARCHIVE_COLUMNS, row))
+                record['movement_date'] = record['movement_date'].isoformat()
+                file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                count += 1
+                min_id = record['id'] if min_id is None else min_id
+                max_id = record['id']
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+        return count, min_id, max_id
+
+    @staticmethod
+    def file_sha256(path: str) -> str:
+        """SHA-256 do arquivo, lido em blocos."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def archives_in_range(
+        db: Session,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+    ) -> list[StockMovementArchive]:
+        """Arquivamentos cujo mês se sobrepõe a [date_from, date_to], em ordem cronológica."""
+        query = db.query(StockMovementArchive)
+        if date_from:
+            query = query.filter(StockMovementArchive.period_end > date_from)
+        if date_to:
+            query = query.filter(StockMovementArchive.period_start <= date_to)
+        return query.order_by(StockMovementArchive.period_start).all()
+
+    @staticmethod
+    def read_archived(
+        archives: list[StockMovementArchive],
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        **filters,
+    ) -> Iterator[dict]:
+        """
+        Lê movimentações arquivadas, em ordem de mês e id.
+
+        Os arquivos são descompactados em streaming; só as linhas dentro de
+        [date_from, date_to] e com os filtros informados (product_id, store_id,
+        movement_type, reference_type; None ignora o filtro) são devolvidas.
+
+        Raises:
+            FileNotFoundError: Se o arquivo de algum arquivamento não existe mais
+        """
+        filters = {name: value for name, value in filters.items() if value is not None}
+        for archive in archives:
+            with gzip.open(archive.path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    record = json.loads(line)
+                    movement_date = datetime.fromisoformat(record['movement_date'])
+                    if date_from and movement_date < date_from:
+                        continue
+                    if date_to and movement_date > date_to:
+                        continue
+                    if all(record.get(name) == value for name, value in filters.items()):
+                        record['movement_date'] = movement_date
+                        yield record
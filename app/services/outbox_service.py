@@ -0,0 +1,263 @@
+"""
+Outbox transacional das movimentações de estoque.
+
+Com OUTBOX_ENABLED=true, StockService.register_movements grava, na mesma
+transação das movimentações, uma linha em outbox_events por movimentação, com um
+número de sequência por loja. A sequência é alocada sob o bloqueio da linha da
+loja em outbox_sequences, mantido até o commit: dentro de uma loja os números são
+contíguos e confirmados na ordem, e uma transação desfeita não deixa lacunas.
+
+Um dispatcher (scripts/dispatch_outbox.py) reivindica lotes de linhas pendentes
+com SELECT ... FOR UPDATE SKIP LOCKED (vários dispatchers não disputam as mesmas
+linhas), entrega a um sink e marca as linhas como entregues no mesmo commit. Se
+o processo cair entre a entrega e o commit, o lote é entregue de novo: a
+entrega é at-least-once, e o consumidor usa (store_id, sequence) para descartar
+repetições e detectar lacunas.
+"""
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+import httpx
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import OutboxEvent, OutboxSequence, StockMovement
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de last_error
+MAX_ERROR_LENGTH = 500
+
+
+class OutboxSink(ABC):
+    """Destino das movimentações entregues pelo dispatcher."""
+
+    @abstractmethod
+    def send(self, events: list[dict]) -> None:
+        """
+        Entrega um lote, na ordem recebida.
+
+        Raises:
+            Exception: Qualquer erro faz o lote ser tentado de novo
+        """
+
+
+class FileSink(OutboxSink):
+    """Acrescenta os eventos, um JSON por linha, a um arquivo local."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, events: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            for event in events:
+                file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class HttpSink(OutboxSink):
+    """Envia cada lote em um POST JSON ({"events": [...]}); qualquer status não 2xx é falha."""
+
+    def __init__(self, url: str, timeout: float = 10.0, client: httpx.Client | None = None):
+        self.url = url
+        self.client = client or httpx.Client(timeout=timeout)
+
+    def send(self, events: list[dict]) -> None:
+        response = self.client.post(self.url, json={"events": events})
+        response.raise_for_status()
+
+
+def sink_from_target(target: str) -> OutboxSink:
+    """
+    Cria o sink a partir de um destino: URL http(s) ou caminho de arquivo.
+
+    Args:
+        target: http://host/caminho, file:///caminho ou um caminho local
+    """
+    if target.startswith(("http://", "https://")):
+        return HttpSink(target)
+    return FileSink(target.removeprefix("file://"))
+
+
+class OutboxService:
+    """Serviço para gravar e entregar o outbox de movimentações."""
+
+    @staticmethod
+    def enqueue(db: Session, movements: list[StockMovement]) -> None:
+        """
+        Grava as movimentações no outbox, na transação atual.
+
+        Args:
+            db: Sessão do banco de dados
+            movements: Movimentações recém-inseridas, na ordem do lote
+        """
+        if not settings.outbox_enabled or not movements:
+            return
+
+        # Alocar as sequências em ordem de loja, como os demais bloqueios
+        counts = Counter(movement.store_id for movement in movements)
+        next_sequence = {
+            store_id: OutboxService._allocate(db, store_id, count) - count + 1
+            for store_id, count in sorted(counts.items())
+        }
+
+        now = datetime.utcnow()
+        rows = []
+        for movement in movements:
+            rows.append({
+                'store_id': movement.store_id,
+                'sequence': next_sequence[movement.store_id],
+                'movement_id': movement.id,
+                'created_at': now,
+                'attempts': 0,
+            })
+            next_sequence[movement.store_id] += 1
+        db.execute(insert(OutboxEvent), rows)
+
+    @staticmethod
+    def _allocate(db: Session, store_id: int, count: int) -> int:
+        """Reserva count números para a loja e retorna o último (bloqueia a linha até o commit)."""
+        table = OutboxSequence.__table__
+        increment = update(table).where(
+            table.c.store_id == store_id,
+        ).values(
+            last_sequence=table.c.last_sequence + count,
+        ).returning(table.c.last_sequence)
+
+        last = db.execute(increment).scalar()
+        if last is not None:
+            return last
+
+        try:
+            # Savepoint: outra transação pode criar a mesma loja antes
+            with db.begin_nested():
+                db.execute(insert(table).values(store_id=store_id, last_sequence=count))
+            return count
+        except IntegrityError:
+            return db.execute(increment).scalar_one()
+
+    @staticmethod
+    def claim_batch(db: Session, limit: int) -> list[OutboxEvent]:
+        """
+        Reivindica até limit linhas pendentes, bloqueadas até o fim da transação.
+
+        SKIP LOCKED faz dispatchers concorrentes pularem as linhas já reivindicadas
+        em vez de esperar por elas.
+        """
+        return db.query(OutboxEvent).filter(
+            OutboxEvent.dispatched_at.is_(None),
+        ).order_by(
+            OutboxEvent.id,
+        ).limit(limit).with_for_update(skip_locked=True).all()
+
+    @staticmethod
+    def payloads(db: Session, events: list[OutboxEvent]) -> list[dict]:
+        """Monta o corpo entregue de cada linha, com uma consulta às movimentações."""
+        movements = {
+            movement.id: movement
+            for movement in db.query(StockMovement).filter(
+                StockMovement.id.in_([event.movement_id for event in events])
+            )
+        }
+        payloads = []
+        for event in events:
+            payload = {
+                'store_id': event.store_id,
+                'sequence': event.sequence,
+                'movement_id': event.movement_id,
+            }
+            movement = movements.get(event.movement_id)
+            if movement is not None:
+                payload.update(
+                    product_id=movement.product_id,
+                    movement_type=movement.movement_type,
+                    quantity=movement.quantity,
+                    stock_before=movement.stock_before,
+                    stock_after=movement.stock_after,
+                    reference_type=movement.reference_type,
+                    reference_id=movement.reference_id,
+                    movement_date=movement.movement_date.isoformat(),
+                )
+            payloads.append(payload)
+        return payloads
+
+    @staticmethod
+    def dispatch_batch(db: Session, sink: OutboxSink, limit: int = 100) -> int:
+        """
+        Entrega um lote pendente e o marca como entregue.
+
+        Args:
+            db: Sessão do banco de dados
+            sink: Destino dos eventos
+            limit: Tamanho máximo do lote
+
+        Returns:
+            int: Quantidade de eventos entregues
+
+        Raises:
+            Exception: Erro do sink, depois de registrar a tentativa nas linhas
+        """
+        events = OutboxService.claim_batch(db, limit)
+        if not events:
+            db.commit()
+            return 0
+
+        try:
+            sink.send(OutboxService.payloads(db, events))
+        except Exception as e:
+            for event in events:
+                event.attempts += 1
+                event.last_error = str(e)[:MAX_ERROR_LENGTH] or type(e).__name__
+            db.commit()
+            raise
+
+        now = datetime.utcnow()
+        for event in events:
+            event.attempts += 1
+            event.dispatched_at = now
+            event.last_error = None
+        db.commit()
+        return len(events)
+
+    @staticmethod
+    def purge_dispatched(db: Session, older_than: datetime) -> int:
+        """Remove linhas já entregues antes de older_than. Retorna quantas foram removidas."""
+        deleted = db.query(OutboxEvent).filter(
+            OutboxEvent.dispatched_at.is_not(None),
+            OutboxEvent.dispatched_at < older_than,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+def run_dispatcher(
+    session_factory,
+    sink: OutboxSink,
+    batch_size: int = 100,
+    interval: float = 1.0,
+    stop: threading.Event | None = None,
+) -> None:
+    """
+    Laço do dispatcher: entrega lotes enquanto houver pendências e espera
+    interval segundos quando o outbox está vazio ou o sink falha.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            delivered = OutboxService.dispatch_batch(db, sink, batch_size)
+        except Exception:
+            logger.exception("Falha ao entregar lote do outbox; nova tentativa em %.1fs", interval)
+            delivered = 0
+        finally:
+            db.close()
+        if delivered:
+            logger.info("Outbox: %d eventos entregues", delivered)
+        if delivered < batch_size:
+            stop.wait(interval)
@@ -0,0 +1,326 @@
+"""
+Serviço de importação em massa do catálogo de produtos e saldos iniciais.
+
+O arquivo (CSV ou NDJSON) é lido linha a linha e processado em blocos de
+IMPORT_CHUNK_SIZE linhas, de modo que o consumo de memória não depende do tamanho
+do arquivo. Por bloco:
+1. As linhas são validadas com o schema ProductImportRow e as categorias são
+   resolvidas por um mapa nome -> id carregado uma única vez
+2. Os produtos são gravados com INSERT ... ON CONFLICT (name) DO UPDATE, um por
+   conjunto de colunas presentes nas linhas: um produto existente só tem
+   atualizados os campos informados no arquivo
+3. Os saldos iniciais viram movimentações adjustment_in/adjustment_out em lote
+   (StockService.register_movements), levando o saldo da loja ao valor informado;
+   reimportar o mesmo arquivo não duplica estoque
+
+Erros de validação são reportados por linha e não interrompem a importação.
+"""
+import csv
+import json
+from collections import defaultdict
+from enum import Enum
+from typing import Iterator, TextIO
+from pydantic import ValidationError
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.core.etag import bump_table_versions
+from app.core.reference_cache import reference_cache
+from app.models import Category, Product, StockStore
+from app.schemas.product import ProductImportRow
+from app.services.stock_service import StockService
+from app.services.stock_summary_service import StockSummaryService
+
+# Linhas validadas e gravadas por transação
+IMPORT_CHUNK_SIZE = 1000
+
+# Colunas gravadas na criação do produto
+INSERT_COLUMNS = ['description', 'cost_price', 'sale_price', 'date_added', 'active', 'category_id']
+# Colunas atualizadas quando o produto (pelo nome) já existe, se presentes na
+# linha; date_added é a data de cadastro e não muda na reimportação
+UPSERT_COLUMNS = ['description', 'cost_price', 'sale_price', 'active', 'category_id']
+
+
+class ImportFormat(str, Enum):
+    """Formatos aceitos pela importação de produtos."""
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+class ProductImportService:
+    """Serviço para importar produtos e saldos iniciais em massa."""
+
+    @staticmethod
+    def iter_rows(source: TextIO, import_format: ImportFormat) -> Iterator[tuple[int, dict | None, str | None]]:
+        """
+        Lê o arquivo incrementalmente.
+
+        Args:
+            source: Arquivo texto posicionado no início
+            import_format: csv (com cabeçalho) ou ndjson
+
+        Yields:
+            tuple: (número da linha, dados da linha ou None, erro de leitura ou None)
+        """
+        if import_format == ImportFormat.csv:
+            reader = csv.DictReader(source)
+            for row in reader:
+                # Células vazias equivalem a campos ausentes
+                yield reader.line_num, {k: v for k, v in row.items() if k and v not in ('', None)}, None
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None, "Cada linha deve ser um objeto JSON"
+                continue
+            yield line_number, data, None
+
+    @staticmethod
+    def load_categories(db: Session) -> dict[str, int]:
+        """
+        Carrega o mapa de categorias para resolver as linhas sem consultas extras.
+
+        Returns:
+            dict: Nome da categoria (minúsculo) -> id
+        """
+        return {category.name.strip().lower(): category.id for category in reference_cache.all(db, Category)}
+
+    @staticmethod
+    def parse_row(data: dict, categories: dict[str, int]) -> ProductImportRow:
+        """
+        Valida uma linha e resolve a categoria pelo nome ou pelo id.
+
+        Args:
+            data: Campos da linha
+            categories: Mapa retornado por load_categories
+
+        Returns:
+            ProductImportRow: Linha validada, com category_id resolvido
+
+        Raises:
+            ValueError: Se a linha for inválida ou a categoria não existir
+        """
+        try:
+            row = ProductImportRow.model_validate(data)
+        except ValidationError as e:
+            raise ValueError("; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ))
+
+        if row.category_id is not None:
+            if row.category_id not in categories.values():
+                raise ValueError(f"Categoria {row.category_id} não encontrada")
+        elif row.category:
+            category_id = categories.get(row.category.strip().lower())
+            if category_id is None:
+                raise ValueError(f"Categoria '{row.category}' não encontrada")
+            row.category_id = category_id
+        return row
+
+    @staticmethod
+    def import_chunk(
+        db: Session,
+        rows: list[tuple[int, ProductImportRow]],
+        store_id: int | None = None,
+    ) -> dict:
+        """
+        Grava um bloco de linhas já validadas.
+
+        COMENTÁRIO DE AUDITORIA: Produtos que já existem e mudam de preço ou
+        categoria têm o resumo de estoque reavaliado (reprice_product), como em
+        PUT /products/{id}; os preços antigos são lidos com as linhas dos
+        produtos bloqueadas (SELECT ... FOR UPDATE). O saldo inicial é aplicado como diferença em relação
+        ao saldo atual, lido com as linhas já bloqueadas.
+
+        Args:
+            db: Sessão do banco de dados
+            rows: Pares (número da linha, linha validada)
+            store_id: Loja dos saldos iniciais (obrigatória se houver opening_quantity)
+
+        Returns:
+            dict: 'created', 'updated', 'opening_balances' e 'errors' do bloco
+        """
+        errors = []
+        unique_rows = {}
+        for line, row in rows:
+            if row.name in unique_rows:
+                errors.append({
+                    'line': line,
+                    'name': row.name,
+                    'error': f"Produto repetido no arquivo (linha {unique_rows[row.name][0]})",
+                })
+            elif row.opening_quantity is not None and store_id is None:
+                errors.append({'line': line, 'name': row.name, 'error': "store_id obrigatório para saldo inicial"})
+            else:
+                unique_rows[row.name] = (line, row)
+
+        result = {'created': 0, 'updated': 0, 'opening_balances': 0, 'errors': errors}
+        if not unique_rows:
+            return result
+
+        names = list(unique_rows)
+        # Bloqueados (em ordem de id) antes de ler os preços que reprice_product usa
+        existing = {
+            product.name: product
+            for product in db.query(
+                Product.id, Product.name, Product.category_id, Product.cost_price, Product.sale_price,
+            ).filter(Product.name.in_(names)).order_by(Product.id).with_for_update()
+        }
+
+        # O upsert é Core: a versão da tabela (ETag de GET /products e revision
+        # usada por /sync) é incrementada aqui, e não pelo evento da sessão
+        revision = bump_table_versions(db, ['products'])['products']
+        # Um upsert por conjunto de colunas presentes: campo ausente na linha
+        # (célula vazia, chave fora do JSON) mantém o valor do produto existente
+        groups = defaultdict(list)
+        for name, (_, row) in unique_rows.items():
+            groups[ProductImportService._present_columns(row)].append({
+                'name': name,
+                **{column: getattr(row, column) for column in INSERT_COLUMNS},
+                'revision': revision,
+            })
+        for columns, values in groups.items():
+            db.execute(ProductImportService._upsert_statement(db, values, columns))
+
+        product_ids = {name: product.id for name, product in existing.items()}
+        new_names = [name for name in names if name not in existing]
+        if new_names:
+            product_ids.update(
+                (name, product_id)
+                for product_id, name in db.query(Product.id, Product.name).filter(Product.name.in_(new_names))
+            )
+        result['created'] = len(new_names)
+        result['updated'] = len(existing)
+
+        # Produtos existentes com novo preço/categoria: reavaliar o resumo de estoque
+        for name, product in existing.items():
+            row = unique_rows[name][1]
+            previous = (product.category_id, product.cost_price, product.sale_price)
+            # Sem categoria na linha, o produto mantém a atual
+            present = ProductImportService._present_columns(row)
+            category_id = row.category_id if 'category_id' in present else product.category_id
+            current = (category_id, row.cost_price, row.sale_price)
+            if current != previous:
+                StockSummaryService.reprice_product(db, product.id, *previous, *current)
+
+        # Saldos iniciais: diferença entre o valor informado e o saldo atual
+        targets = {
+            product_ids[name]: row.opening_quantity
+            for name, (_, row) in unique_rows.items()
+            if row.opening_quantity is not None
+        }
+        if targets:
+            current_balances = dict(db.query(StockStore.product_id, StockStore.quantity).filter(
+                tuple_(StockStore.store_id, StockStore.product_id).in_(
+                    [(store_id, product_id) for product_id in targets]
+                )
+            ).order_by(StockStore.product_id).with_for_update())
+            movements = []
+            for product_id, target in targets.items():
+                delta = target - current_balances.get(product_id, 0)
+                if delta:
+                    movements.append({
+                        'product_id': product_id,
+                        'store_id': store_id,
+                        'movement_type': 'adjustment_in' if delta > 0 else 'adjustment_out',
+                        'quantity': abs(delta),
+                        'reference_type': 'import',
+                        'notes': "Saldo inicial (importação de produtos)",
+                    })
+            StockService.register_movements(db, movements)
+            result['opening_balances'] = len(movements)
+
+        return result
+
+    @staticmethod
+    def import_file(db: Session, source: TextIO, import_format: ImportFormat, store_id: int | None = None) -> dict:
+        """
+        Importa o arquivo inteiro, com commit a cada bloco de IMPORT_CHUNK_SIZE linhas.
+
+        Um bloco que falha ao gravar é desfeito e suas linhas são reportadas como
+        erro; os blocos anteriores permanecem gravados.
+
+        Args:
+            db: Sessão do banco de dados
+            source: Arquivo texto posicionado no início
+            import_format: csv ou ndjson
+            store_id: Loja dos saldos iniciais
+
+        Returns:
+            dict: Relatório no formato de ProductImportReport
+        """
+        report = {'total_rows': 0, 'created': 0, 'updated': 0, 'opening_balances': 0, 'errors': []}
+        categories = ProductImportService.load_categories(db)
+
+        def flush(chunk: list[tuple[int, ProductImportRow]]) -> None:
+            try:
+                result = ProductImportService.import_chunk(db, chunk, store_id)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                report['errors'].extend(
+                    {'line': line, 'name': row.name, 'error': f"Erro ao gravar o bloco: {e}"}
+                    for line, row in chunk
+                )
+                return
+            for key in ('created', 'updated', 'opening_balances'):
+                report[key] += result[key]
+            report['errors'].extend(result['errors'])
+
+        chunk = []
+        for line, data, error in ProductImportService.iter_rows(source, import_format):
+            report['total_rows'] += 1
+            if error is None:
+                try:
+                    chunk.append((line, ProductImportService.parse_row(data, categories)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                name = (data or {}).get('name')
+                report['errors'].append({
+                    'line': line,
+                    'name': name if isinstance(name, str) else None,
+                    'error': error,
+                })
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        report['errors'].sort(key=lambda error: error['line'])
+        report['failed'] = len(report['errors'])
+        return report
+
+    @staticmethod
+    def _present_columns(row: ProductImportRow) -> tuple[str, ...]:
+        """Colunas de UPSERT_COLUMNS informadas na linha (category conta como category_id)."""
+        present = row.model_fields_set
+        return tuple(
+            column for column in UPSERT_COLUMNS
+            if column in present or (column == 'category_id' and 'category' in present)
+        )
+
+    @staticmethod
+    def _upsert_statement(db: Session, values: list[dict], columns: tuple[str, ...]):
+        """INSERT ... ON CONFLICT (name) DO UPDATE das colunas informadas, no dialeto do banco."""
+        dialect = db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"Importação com upsert não suportada no banco {dialect}")
+
+        statement = insert(Product).values(values)
+        return statement.on_conflict_do_update(
+            index_elements=[Product.name],
+            set_={column: statement.excluded[column] for column in (*columns, 'revision')},
+        )
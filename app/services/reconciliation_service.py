@@ -0,0 +1,238 @@
+"""
+Serviço de reconciliação entre o razão (stock_movements) e os saldos (stock_store).
+
+Os saldos podem divergir do razão quando são alterados sem movimentação (cargas
+manuais no banco, dados gravados antes de PUT/DELETE /stock passarem pelo
+razão). A reconciliação calcula o saldo esperado de cada (store_id, product_id)
+com um GROUP BY sobre stock_movements e o compara com stock_store, por faixas de
+produtos; a soma e a comparação acontecem no banco, e só as divergências chegam
+ao Python.
+
+Com repair, cada divergência recebe um lançamento adjustment_in/adjustment_out
+que leva o razão até o saldo atual (stock_before = saldo esperado, stock_after =
+saldo atual). O stock_store não é alterado: o saldo é o que a API vinha
+servindo e validando nas vendas.
+
+Meses arquivados (MovementArchiveService) já não estão em stock_movements; o
+efeito líquido de cada um, guardado em stock_movement_archive_totals, entra na
+soma do saldo esperado.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import and_, func, literal, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from app.models import Product, StockMovement, StockMovementArchiveTotal, StockStore
+from app.services.stock_service import StockService
+
+logger = logging.getLogger(__name__)
+
+# Produtos por faixa: cada faixa é uma agregação e uma transação
+RECONCILIATION_CHUNK_SIZE = 1000
+RECONCILIATION_REFERENCE_TYPE = 'reconciliation'
+
+
+class ReconciliationService:
+    """Serviço para comparar e corrigir razão e saldos de estoque."""
+
+    @staticmethod
+    def product_ranges(db: Session, chunk_size: int = RECONCILIATION_CHUNK_SIZE):
+        """
+        Percorre os produtos em faixas (primeiro_id, último_id) de até chunk_size
+        produtos, por paginação por chave.
+        """
+        last_id = 0
+        while True:
+            ids = db.scalars(
+                select(Product.id).where(Product.id > last_id).order_by(Product.id).limit(chunk_size)
+            ).all()
+            if not ids:
+                return
+            yield ids[0], ids[-1]
+            last_id = ids[-1]
+
+    @staticmethod
+    def _ledger_entries(movement_filter, archive_filter):
+        """
+        Parcelas do saldo esperado: movimentações vivas (quantidade com sinal)
+        mais os totais dos meses arquivados, cada conjunto com o seu filtro.
+        """
+        return union_all(
+            select(
+                StockMovement.store_id,
+                StockMovement.product_id,
+                StockService.signed_quantity_sql().label('quantity'),
+            ).where(movement_filter),
+            select(
+                StockMovementArchiveTotal.store_id,
+                StockMovementArchiveTotal.product_id,
+                StockMovementArchiveTotal.net_quantity.label('quantity'),
+            ).where(archive_filter),
+        )
+
+    @staticmethod
+    def find_drift(db: Session, first_product_id: int, last_product_id: int) -> list[dict]:
+        """
+        Divergências entre razão e saldo em uma faixa de produtos.
+
+        COMENTÁRIO DE AUDITORIA: Uma única instrução: o GROUP BY sobre
+        stock_movements da faixa (índice ix_stock_movements_product_store),
+        somado aos totais dos meses arquivados, é comparado com stock_store nos
+        dois sentidos. Saldos sem nenhuma
+        movimentação esperam 0, e razão sem linha de saldo compara com 0.
+
+        Args:
+            db: Sessão do banco de dados
+            first_product_id: Primeiro produto da faixa
+            last_product_id: Último produto da faixa (inclusive)
+
+        Returns:
+            list: Dicts com store_id, product_id, expected (razão) e actual (saldo)
+        """
+        entries = ReconciliationService._ledger_entries(
+            StockMovement.product_id.between(first_product_id, last_product_id),
+            StockMovementArchiveTotal.product_id.between(first_product_id, last_product_id),
+        ).subquery()
+        ledger = select(
+            entries.c.store_id,
+            entries.c.product_id,
+            func.sum(entries.c.quantity).label('expected'),
+        ).group_by(
+            entries.c.store_id, entries.c.product_id,
+        ).cte('ledger')
+        same_key = and_(
+            StockStore.store_id == ledger.c.store_id,
+            StockStore.product_id == ledger.c.product_id,
+        )
+
+        # Razão x saldo (inclui razão sem linha de saldo)
+        ledger_side = select(
+            ledger.c.store_id,
+            ledger.c.product_id,
+            ledger.c.expected,
+            func.coalesce(StockStore.quantity, 0).label('actual'),
+        ).select_from(
+            ledger.outerjoin(StockStore, same_key)
+        ).where(
+            func.coalesce(StockStore.quantity, 0) != ledger.c.expected,
+        )
+        # Saldos sem nenhuma movimentação
+        stock_side = select(
+            StockStore.store_id,
+            StockStore.product_id,
+            literal(0).label('expected'),
+            StockStore.quantity.label('actual'),
+        ).select_from(
+            StockStore.__table__.outerjoin(ledger, same_key)
+        ).where(
+            StockStore.product_id.between(first_product_id, last_product_id),
+            ledger.c.store_id.is_(None),
+            StockStore.quantity != 0,
+        )
+
+        drift = union_all(ledger_side, stock_side).subquery()
+        rows = db.execute(
+            select(drift).order_by(drift.c.store_id, drift.c.product_id)
+        ).all()
+        return [
+            {
+                'store_id': row.store_id,
+                'product_id': row.product_id,
+                'expected': int(row.expected),
+                'actual': row.actual,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def repair(db: Session, drift: list[dict]) -> list[StockMovement]:
+        """
+        Lança no razão os ajustes que o igualam aos saldos atuais.
+
+        COMENTÁRIO DE AUDITORIA: Os saldos divergentes são bloqueados (na ordem
+        de register_movements) e o saldo esperado é recalculado sob o bloqueio,
+        só para essas chaves, de modo que movimentações concorrentes entre a
+        detecção e a correção não geram ajustes errados. Os ajustes são
+        gravados em uma única instrução, com reference_type='reconciliation'.
+
+        Args:
+            db: Sessão do banco de dados
+            drift: Divergências retornadas por find_drift
+
+        Returns:
+            list: Movimentações de ajuste criadas
+        """
+        keys = [(item['store_id'], item['product_id']) for item in drift]
+        if not keys:
+            return []
+
+        stocks = StockService._lock_stocks(db, keys)
+        entries = ReconciliationService._ledger_entries(
+            tuple_(StockMovement.store_id, StockMovement.product_id).in_(keys),
+            tuple_(StockMovementArchiveTotal.store_id, StockMovementArchiveTotal.product_id).in_(keys),
+        ).subquery()
+        expected = defaultdict(int, {
+            (row.store_id, row.product_id): int(row.expected)
+            for row in db.execute(
+                select(
+                    entries.c.store_id,
+                    entries.c.product_id,
+                    func.sum(entries.c.quantity).label('expected'),
+                ).group_by(entries.c.store_id, entries.c.product_id)
+            )
+        })
+
+        now = datetime.utcnow()
+        rows = []
+        for key in sorted(set(keys)):
+            actual = stocks[key].quantity if key in stocks else 0
+            delta = actual - expected[key]
+            if not delta:
+                continue
+            rows.append({
+                'product_id': key[1],
+                'store_id': key[0],
+                'movement_type': 'adjustment_in' if delta > 0 else 'adjustment_out',
+                'quantity': abs(delta),
+                'movement_date': now,
+                'reference_id': None,
+                'reference_type': RECONCILIATION_REFERENCE_TYPE,
+                'stock_before': expected[key],
+                'stock_after': actual,
+                'notes': 'Reconciliação do razão com o saldo',
+            })
+        if not rows:
+            return []
+        return StockService.insert_movement_rows(db, rows)
+
+    @staticmethod
+    def reconcile(
+        db: Session,
+        chunk_size: int = RECONCILIATION_CHUNK_SIZE,
+        repair: bool = False,
+    ) -> dict:
+        """
+        Reconcilia todo o estoque, faixa por faixa, com um commit por faixa.
+
+        Args:
+            db: Sessão do banco de dados
+            chunk_size: Produtos por faixa
+            repair: Se True, lança os ajustes de cada faixa (ver repair)
+
+        Returns:
+            dict: 'chunks', 'drift' (divergências encontradas) e 'repaired'
+                (ajustes lançados)
+        """
+        result = {'chunks': 0, 'drift': [], 'repaired': 0}
+        for first_id, last_id in ReconciliationService.product_ranges(db, chunk_size):
+            drift = ReconciliationService.find_drift(db, first_id, last_id)
+            if drift and repair:
+                result['repaired'] += len(ReconciliationService.repair(db, drift))
+            db.commit()
+            result['chunks'] += 1
+            result['drift'].extend(drift)
+            if drift:
+                logger.info(
+                    "Produtos %d-%d: %d divergências", first_id, last_id, len(drift),
+                )
+        return result
@@ -4,48 +4,19 @@ Serviço de gerenciamento de vendas.
 Este módulo implementa a lógica de criação de vendas com validação de estoque
 e registro automático de movimentações de estoque.
 """
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.orm import Session
-from app.models import Sale, SaleItem
-from app.services.stock_service import StockService
+from app.core.reference_cache import reference_cache
+from app.models import Client, Product, Sale, SaleItem, StockStore, Store
+from app.schemas.sale import SaleCreate
+from app.services.stock_service import CANCELLED_STATUS, InsufficientStockError, StockService
 
 
 class SalesService:
     """Serviço para gerenciar vendas."""
 
-    @staticmethod
-    def validate_sale_items_stock(
-        db: Session,
-        store_id: int,
-        items: list[dict],
-    ) -> tuple[bool, str]:
-        """
-        Valida se há estoque suficiente para todos os itens de uma venda.
-        
-        Args:
-            db: Sessão do banco de dados
-            store_id: ID da loja
-            items: Lista de itens com 'product_id' e 'quantity'
-            
-        Returns:
-            tuple: (bool, str) - (sucesso, mensagem de erro se houver)
-        """
-        for item in items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity')
-
-            if not StockService.validate_stock_availability(
-                db, store_id, product_id, quantity
-            ):
-                current_stock = StockService.get_stock_by_store_and_product(
-                    db, store_id, product_id
-                )
-                return False, (
-                    f"Estoque insuficiente para o produto {product_id}. "
-                    f"Disponível: {current_stock}, Solicitado: {quantity}"
-                )
-
-        return True, ""
-
     @staticmethod
     def register_sale_movements(
         db: Session,
@@ -55,8 +26,10 @@ class SalesService:
         Registra as movimentações de estoque para uma venda.
         
         COMENTÁRIO DE AUDITORIA: Esta função é chamada após a criação de uma
-        Sale e seus SaleItems. Para cada item, ela:
-        1. Decrementa o estoque na loja (StockStore.quantity -= item.quantity)
+        Sale e seus SaleItems. Para cada item, em um único lote
+        (StockService.register_movements), ela:
+        1. Bloqueia o saldo, valida o estoque e o decrementa em um só passo
+           (StockStore.quantity -= item.quantity)
         2. Cria um registro de auditoria em StockMovement com:
            - movement_type='sale'
            - reference_type='sale'
@@ -69,6 +42,9 @@ class SalesService:
             
         Returns:
             list: Lista de movimentações criadas
+            
+        Raises:
+            InsufficientStockError: Se não houver estoque suficiente
         """
         # Buscar venda para obter store_id
         sale = db.query(Sale).filter(Sale.id == sale_id).first()
@@ -78,19 +54,263 @@ class SalesService:
         # Buscar itens da venda
         items = db.query(SaleItem).filter(SaleItem.sale_id == sale_id).all()
 
-        movements = []
-        for item in items:
-            # Registrar movimentação de venda
-            movement = StockService.register_movement(
-                db=db,
-                product_id=item.product_id,
-                store_id=sale.store_id,
-                movement_type='sale',
-                quantity=item.quantity,
-                reference_id=sale_id,
-                reference_type='sale',
-                notes=f"Venda #{sale_id} - Cliente: {sale.client_id}",
-            )
-            movements.append(movement)
+        # Registrar todas as movimentações de venda em um único lote
+        return StockService.register_movements(db, [
+            {
+                'product_id': item.product_id,
+                'store_id': sale.store_id,
+                'movement_type': 'sale',
+                'quantity': item.quantity,
+                'reference_id': sale_id,
+                'reference_type': 'sale',
+                'notes': f"Venda #{sale_id} - Cliente: {sale.client_id}",
+            }
+            for item in items
+        ], check_stock=True)
+
+    @staticmethod
+    def reserve_sale_items(
+        db: Session,
+        sale_id: int,
+        ttl_seconds: int | None = None,
+    ) -> list:
+        """
+        Reserva o estoque dos itens de uma venda pendente, sem movimentá-lo.
+        
+        COMENTÁRIO DE AUDITORIA: Alternativa a register_sale_movements para
+        vendas que podem ser abandonadas (ex.: carrinhos de e-commerce). As
+        unidades ficam indisponíveis para outras vendas até a confirmação
+        (confirm_sale), a liberação (release_sale) ou o vencimento da reserva,
+        quando o varredor (scripts/expire_reservations.py) as devolve e marca a
+        venda como 'expired'.
+        
+        Args:
+            db: Sessão do banco de dados
+            sale_id: ID da venda
+            ttl_seconds: Validade da reserva (padrão: RESERVATION_TTL_SECONDS)
+            
+        Returns:
+            list: Reservas criadas
+            
+        Raises:
+            InsufficientStockError: Se não houver estoque disponível suficiente
+        """
+        sale = db.query(Sale).filter(Sale.id == sale_id).first()
+        if not sale:
+            return []
+
+        items = db.query(SaleItem).filter(SaleItem.sale_id == sale_id).all()
+        return StockService.reserve(db, [
+            {
+                'store_id': sale.store_id,
+                'product_id': item.product_id,
+                'quantity': item.quantity,
+                'reference_type': 'sale',
+                'reference_id': sale_id,
+            }
+            for item in items
+        ], ttl_seconds)
 
+    @staticmethod
+    def confirm_sale(db: Session, sale: Sale) -> list:
+        """
+        Confirma a reserva de uma venda: registra as movimentações de venda e
+        muda o status para 'confirmed'.
+        
+        Returns:
+            list: Movimentações criadas (vazia se a venda não tem reservas ativas)
+            
+        Raises:
+            ReservationExpiredError: Se a reserva já venceu
+        """
+        movements = StockService.confirm_reservations(
+            db, 'sale', sale.id,
+            notes=f"Venda #{sale.id} - Cliente: {sale.client_id}",
+        )
+        if movements:
+            sale.status = 'confirmed'
         return movements
+
+    @staticmethod
+    def release_sale(db: Session, sale: Sale) -> int:
+        """
+        Libera a reserva de uma venda e muda o status para 'cancelled'.
+        
+        Returns:
+            int: Quantidade de reservas liberadas
+        """
+        released = StockService.release_reservations(db, 'sale', sale.id)
+        if released:
+            sale.status = CANCELLED_STATUS
+        return released
+
+    @staticmethod
+    def cancel_sale(db: Session, sale: Sale) -> list:
+        """
+        Cancela uma venda: libera as reservas ativas e estorna as movimentações
+        de venda já registradas (StockService.reverse_reference), com o status
+        'cancelled'. Usado pelo cancelamento e pela exclusão da venda.
+        
+        Args:
+            db: Sessão do banco de dados
+            sale: Venda, já bloqueada (SELECT ... FOR UPDATE)
+            
+        Returns:
+            list: Movimentações compensatórias criadas
+            
+        Raises:
+            ArchivedMovementsError: Se a venda tem movimentações arquivadas
+        """
+        StockService.release_reservations(db, 'sale', sale.id)
+        movements = StockService.reverse_reference(
+            db, 'sale', sale.id, notes=f"Estorno da venda #{sale.id}",
+        )
+        sale.status = CANCELLED_STATUS
+        return movements
+
+    @staticmethod
+    def create_sales_chunk(
+        db: Session,
+        sales: list[SaleCreate],
+        start_index: int = 0,
+    ) -> list[dict]:
+        """
+        Cria um bloco de vendas com validação e escrita em massa.
+        
+        COMENTÁRIO DE AUDITORIA: Usado por POST /sales/batch, que chama este
+        método uma vez por bloco e faz commit ao final de cada um. Por bloco:
+        1. Clientes, lojas e produtos referenciados são carregados em uma
+           consulta cada, e os saldos afetados são carregados e bloqueados
+           (SELECT ... FOR UPDATE) em uma única consulta
+        2. Cada venda é validada em memória contra esse mapa de saldos
+           disponíveis (quantity - reserved), na ordem
+           do lote; uma venda aceita desconta o mapa, de modo que as seguintes
+           enxergam o saldo já reduzido. Vendas inválidas são rejeitadas
+           individualmente, sem afetar as demais
+        3. Sale, SaleItem e as movimentações (StockService.register_movements)
+           das vendas aceitas são gravados com inserts em massa
+        
+        Args:
+            db: Sessão do banco de dados
+            sales: Vendas do bloco
+            start_index: Posição do primeiro item do bloco no lote completo
+            
+        Returns:
+            list: Um resultado por venda, com 'index', 'success', 'sale_id' e 'error'
+        """
+        client_ids = {sale.client_id for sale in sales}
+        store_ids = {sale.store_id for sale in sales}
+        product_ids = {item.product_id for sale in sales for item in sale.items}
+        keys = {(sale.store_id, item.product_id) for sale in sales for item in sale.items}
+
+        existing_clients = set(db.scalars(select(Client.id).where(Client.id.in_(client_ids))))
+        existing_stores = set(reference_cache.get_many(db, Store, store_ids))
+        existing_products = set(db.scalars(select(Product.id).where(Product.id.in_(product_ids))))
+        balances = {
+            (row.store_id, row.product_id): row.quantity - row.reserved
+            for row in db.query(
+                StockStore.store_id, StockStore.product_id, StockStore.quantity, StockStore.reserved,
+            ).filter(
+                tuple_(StockStore.store_id, StockStore.product_id).in_(list(keys))
+            ).order_by(
+                StockStore.store_id, StockStore.product_id,
+            ).with_for_update()
+        } if keys else {}
+
+        results = []
+        accepted = []
+        for offset, sale in enumerate(sales):
+            error = SalesService._validate_batch_sale(
+                sale, existing_clients, existing_stores, existing_products, balances,
+            )
+            results.append({
+                'index': start_index + offset,
+                'success': error is None,
+                'sale_id': None,
+                'error': error,
+            })
+            if error is None:
+                for item in sale.items:
+                    balances[(sale.store_id, item.product_id)] -= item.quantity
+                accepted.append((results[-1], sale))
+
+        if not accepted:
+            return results
+
+        # Cabeçalhos em uma única instrução, com os IDs na ordem do lote
+        now = datetime.utcnow()
+        sale_ids = db.scalars(
+            insert(Sale).returning(Sale.id, sort_by_parameter_order=True),
+            [
+                {
+                    'client_id': sale.client_id,
+                    'store_id': sale.store_id,
+                    'sale_date': sale.sale_date or now,
+                    'delivery_type': sale.delivery_type,
+                    'tracking_code': sale.tracking_code,
+                    'status': sale.status,
+                    'predicted_delivery': sale.predicted_delivery,
+                    'delivered_at': sale.delivered_at,
+                    'total_value': sale.total_value,
+                }
+                for _, sale in accepted
+            ],
+        ).all()
+
+        item_rows = []
+        movements = []
+        for (result, sale), sale_id in zip(accepted, sale_ids):
+            result['sale_id'] = sale_id
+            for item in sale.items:
+                item_rows.append({
+                    'sale_id': sale_id,
+                    'product_id': item.product_id,
+                    'quantity': item.quantity,
+                    'unit_price': item.unit_price,
+                    'total_price': item.total_price,
+                    'removed_at': item.removed_at,
+                })
+                movements.append({
+                    'product_id': item.product_id,
+                    'store_id': sale.store_id,
+                    'movement_type': 'sale',
+                    'quantity': item.quantity,
+                    'reference_id': sale_id,
+                    'reference_type': 'sale',
+                    'notes': f"Venda #{sale_id} - Cliente: {sale.client_id}",
+                })
+
+        db.execute(insert(SaleItem), item_rows)
+        # Linhas já bloqueadas nesta transação: a revalidação não pode falhar
+        StockService.register_movements(db, movements, check_stock=True)
+        return results
+
+    @staticmethod
+    def _validate_batch_sale(
+        sale: SaleCreate,
+        existing_clients: set[int],
+        existing_stores: set[int],
+        existing_products: set[int],
+        balances: dict[tuple[int, int], int],
+    ) -> str | None:
+        """Valida uma venda do lote em memória; retorna a mensagem de erro ou None."""
+        if not sale.items:
+            return "Venda sem itens"
+        if sale.client_id not in existing_clients:
+            return f"Cliente {sale.client_id} não encontrado"
+        if sale.store_id not in existing_stores:
+            return f"Loja {sale.store_id} não encontrada"
+
+        requested = Counter()
+        for item in sale.items:
+            if item.product_id not in existing_products:
+                return f"Produto {item.product_id} não encontrado"
+            if item.quantity <= 0:
+                return f"Quantidade inválida para o produto {item.product_id}: {item.quantity}"
+            requested[item.product_id] += item.quantity
+
+        for product_id, quantity in requested.items():
+            available = balances.get((sale.store_id, product_id), 0)
+            if quantity > available:
+                return str(InsufficientStockError(sale.store_id, product_id, available, quantity))
+        return None
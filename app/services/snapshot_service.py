@@ -0,0 +1,172 @@
+"""
+Serviço de fotografias de estoque e reconstrução de saldos em uma data.
+
+Este módulo implementa a consulta "quanto a loja X tinha na data D" sem reprocessar
+todo o livro-razão: fotografias periódicas gravam os saldos de stock_store e a
+reconstrução parte da fotografia mais próxima anterior a D, aplicando apenas as
+movimentações posteriores a ela. Tanto a fotografia quanto a reconstrução são
+instruções SQL em conjunto (INSERT ... SELECT e UNION ALL + GROUP BY).
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import StockMovement, StockMovementArchive, StockSnapshot, StockSnapshotItem, StockStore
+from app.services.stock_service import StockService
+
+
+class SnapshotRequiredError(ValueError):
+    """Erro levantado quando a reconstrução exigiria reprocessar todo o livro-razão."""
+
+
+class StockSnapshotService:
+    """Serviço para gerenciar fotografias de estoque."""
+
+    @staticmethod
+    def take_snapshot(db: Session) -> StockSnapshot:
+        """
+        Grava uma fotografia de todos os saldos de stock_store.
+
+        COMENTÁRIO DE AUDITORIA: A fotografia representa exatamente as
+        movimentações com id <= last_movement_id, que a reconstrução não aplica
+        de novo:
+        1. last_movement_id é o maior id com mais de SNAPSHOT_SETTLE_SECONDS
+           segundos: ids são alocados antes do commit, e um id menor que o maior
+           já visível pode ainda estar em uma transação aberta; passada a
+           janela, nenhuma transação que o gravou pode estar em aberto
+        2. Os saldos são copiados de stock_store menos o efeito das
+           movimentações com id > last_movement_id, em uma única instrução
+           (INSERT ... SELECT com UNION ALL + GROUP BY): saldos e movimentações
+           são lidos no mesmo snapshot do banco, e uma movimentação confirmada
+           durante a fotografia não é contada duas vezes
+
+        Args:
+            db: Sessão do banco de dados
+
+        Returns:
+            StockSnapshot: Fotografia criada
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.snapshot_settle_seconds)
+        last_movement_id = db.query(func.coalesce(func.max(StockMovement.id), 0)).filter(
+            StockMovement.movement_date < cutoff,
+        ).scalar()
+        snapshot = StockSnapshot(taken_at=now, last_movement_id=last_movement_id)
+        db.add(snapshot)
+        db.flush()
+
+        balances = union_all(
+            select(StockStore.store_id, StockStore.product_id, StockStore.quantity),
+            select(
+                StockMovement.store_id,
+                StockMovement.product_id,
+                (-StockService.signed_quantity_sql()).label('quantity'),
+            ).where(StockMovement.id > last_movement_id),
+        ).subquery()
+        db.execute(insert(StockSnapshotItem).from_select(
+            ['snapshot_id', 'store_id', 'product_id', 'quantity'],
+            select(
+                literal(snapshot.id),
+                balances.c.store_id,
+                balances.c.product_id,
+                func.sum(balances.c.quantity),
+            ).group_by(balances.c.store_id, balances.c.product_id),
+        ))
+
+        return snapshot
+
+    @staticmethod
+    def get_stock_as_of(
+        db: Session,
+        as_of: datetime,
+        store_id: int | None = None,
+        product_id: int | None = None,
+    ) -> list[dict]:
+        """
+        Reconstrói os saldos de estoque em uma data.
+
+        Parte da fotografia mais recente com taken_at <= as_of e soma as
+        movimentações com id maior que a última incluída na fotografia e
+        movement_date <= as_of. O trabalho é limitado ao volume de
+        movimentações desde a fotografia, não ao tamanho do livro-razão.
+
+        Sem fotografia anterior à data, só uma loja/produto pode ser
+        reconstruído (histórico de uma chave, pelo índice
+        ix_stock_movements_store_product_date); sem esses filtros, a consulta
+        seria um reprocessamento de todo o livro-razão e é recusada. Também é
+        recusada a reconstrução que precisaria de movimentações já arquivadas
+        (meses anteriores à data com ids acima da fotografia usada): essas
+        linhas não estão mais em stock_movements.
+
+        Args:
+            db: Sessão do banco de dados
+            as_of: Data de referência
+            store_id: Filtra uma loja
+            product_id: Filtra um produto
+
+        Returns:
+            list: Saldos com store_id, product_id e quantity
+
+        Raises:
+            SnapshotRequiredError: Se não há fotografia anterior à data e a
+                consulta não é de uma única loja/produto, ou se a reconstrução
+                depende de um mês arquivado
+        """
+        snapshot = db.query(StockSnapshot).filter(
+            StockSnapshot.taken_at <= as_of,
+        ).order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc()).first()
+        if snapshot is None and not (store_id and product_id):
+            raise SnapshotRequiredError(
+                "Não há fotografia de estoque anterior à data; informe store_id e product_id "
+                "ou consulte uma data posterior à primeira fotografia"
+            )
+        replayed_from = snapshot.last_movement_id if snapshot else 0
+        archived = db.query(StockMovementArchive.period_start).filter(
+            StockMovementArchive.period_start <= as_of,
+            StockMovementArchive.max_movement_id > replayed_from,
+        ).order_by(StockMovementArchive.period_start).first()
+        if archived:
+            raise SnapshotRequiredError(
+                f"A reconstrução depende das movimentações arquivadas de {archived.period_start:%Y-%m}; "
+                "consulte uma data posterior à fotografia que cobre o mês ou GET /movements/archived"
+            )
+
+        movements = select(
+            StockMovement.store_id,
+            StockMovement.product_id,
+            StockService.signed_quantity_sql().label('quantity'),
+        ).where(StockMovement.movement_date <= as_of)
+        if store_id:
+            movements = movements.where(StockMovement.store_id == store_id)
+        if product_id:
+            movements = movements.where(StockMovement.product_id == product_id)
+
+        parts = [movements]
+        if snapshot:
+            movements = movements.where(StockMovement.id > snapshot.last_movement_id)
+            base = select(
+                StockSnapshotItem.store_id,
+                StockSnapshotItem.product_id,
+                StockSnapshotItem.quantity,
+            ).where(StockSnapshotItem.snapshot_id == snapshot.id)
+            if store_id:
+                base = base.where(StockSnapshotItem.store_id == store_id)
+            if product_id:
+                base = base.where(StockSnapshotItem.product_id == product_id)
+            parts = [base, movements]
+
+        ledger = union_all(*parts).subquery()
+        rows = db.execute(
+            select(
+                ledger.c.store_id,
+                ledger.c.product_id,
+                func.sum(ledger.c.quantity).label('quantity'),
+            ).group_by(ledger.c.store_id, ledger.c.product_id).order_by(
+                ledger.c.store_id, ledger.c.product_id,
+            )
+        )
+
+        return [
+            {'store_id': row.store_id, 'product_id': row.product_id, 'quantity': row.quantity}
+            for row in rows
+        ]
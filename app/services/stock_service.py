@@ -5,47 +5,67 @@ Este módulo implementa a lógica de movimentação de estoque com atomicidade g
 Todas as operações que afetam o estoque (entrada, distribuição, venda) devem passar
 por este serviço para garantir a integridade dos dados.
 """
+import logging
+import threading
+from collections import defaultdict
+from sqlalchemy import case, func, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
-from app.models import StockStore, StockMovement, Product, Store
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.etag import mark_tables_changed
+from app.core.metrics import stock_reservations_total
+from app.core.stock_events import queue_stock_events
+from app.models import (
+    Sale, StockMovementArchiveReference, StockReservation, StockStore, StockMovement, Product, Store,
+)
+from app.services.outbox_service import OutboxService
+from app.services.stock_summary_service import StockSummaryService
 
+# Tipos de movimento que incrementam e decrementam o estoque
+INBOUND_MOVEMENT_TYPES = {'entry', 'transfer_in', 'adjustment_in'}
+OUTBOUND_MOVEMENT_TYPES = {'sale', 'transfer_out', 'adjustment_out'}
+VALID_MOVEMENT_TYPES = INBOUND_MOVEMENT_TYPES | OUTBOUND_MOVEMENT_TYPES
 
-class StockService:
-    """Serviço para gerenciar movimentações de estoque."""
+# Tipos (entrada, saída) dos estornos por reference_type; os demais usam ajustes
+REVERSAL_MOVEMENT_TYPES = {'distribution': ('transfer_in', 'transfer_out')}
+# Status de documento (venda, entrada, distribuição) cujo estoque foi estornado
+CANCELLED_STATUS = 'cancelled'
 
-    @staticmethod
-    def get_or_create_stock(
-        db: Session,
-        store_id: int,
-        product_id: int,
-    ) -> StockStore:
-        """
-        Obtém ou cria um registro de estoque para uma loja e produto.
-        
-        Args:
-            db: Sessão do banco de dados
-            store_id: ID da loja
-            product_id: ID do produto
-            
-        Returns:
-            StockStore: Registro de estoque
-        """
-        stock = db.query(StockStore).filter(
-            StockStore.store_id == store_id,
-            StockStore.product_id == product_id,
-        ).first()
+# Situações de uma reserva de estoque
+RESERVATION_ACTIVE = 'active'
+RESERVATION_CONFIRMED = 'confirmed'
+RESERVATION_RELEASED = 'released'
+RESERVATION_EXPIRED = 'expired'
 
-        if not stock:
-            stock = StockStore(
-                store_id=store_id,
-                product_id=product_id,
-                quantity=0,
-                updated_at=datetime.utcnow(),
-            )
-            db.add(stock)
-            db.flush()
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(ValueError):
+    """Erro levantado quando uma saída deixaria o estoque negativo."""
+
+    def __init__(self, store_id: int, product_id: int, available: int, requested: int):
+        self.store_id = store_id
+        self.product_id = product_id
+        self.available = available
+        self.requested = requested
+        super().__init__(
+            f"Estoque insuficiente para o produto {product_id} na loja {store_id}. "
+            f"Disponível: {available}, Solicitado: {requested}"
+        )
 
-        return stock
+
+class ReservationExpiredError(ValueError):
+    """Erro levantado ao confirmar reservas já vencidas."""
+
+
+class ArchivedMovementsError(ValueError):
+    """Erro levantado ao estornar um documento com movimentações em um mês arquivado."""
+
+
+class StockService:
+    """Serviço para gerenciar movimentações de estoque."""
 
     @staticmethod
     def register_movement(
@@ -62,7 +82,7 @@ class StockService:
         Registra uma movimentação de estoque com atualização automática do StockStore.
         
         COMENTÁRIO DE AUDITORIA: Esta função é o ponto central para qualquer movimentação
-        de estoque. Ela garante que:
+        de estoque individual. Ela delega para register_movements, garantindo que:
         1. O estoque atual (stock_before) é capturado antes da alteração
         2. O estoque é atualizado de acordo com o tipo de movimento
         3. O novo estoque (stock_after) é registrado
@@ -92,73 +112,629 @@ class StockService:
         Raises:
             ValueError: Se o tipo de movimento for inválido
         """
-        # Validar tipo de movimento
-        valid_types = {'entry', 'sale', 'transfer_out', 'transfer_in', 'adjustment_in', 'adjustment_out'}
-        if movement_type not in valid_types:
-            raise ValueError(f"Tipo de movimento inválido: {movement_type}")
-
-        # Obter ou criar registro de estoque
-        stock = StockService.get_or_create_stock(db, store_id, product_id)
-        stock_before = stock.quantity
-
-        # Calcular novo estoque com base no tipo de movimento
-        if movement_type in ['entry', 'transfer_in', 'adjustment_in']:
-            stock_after = stock_before + quantity
-        elif movement_type in ['sale', 'transfer_out', 'adjustment_out']:
-            stock_after = stock_before - quantity
-        else:
-            stock_after = stock_before
-
-        # Atualizar estoque
-        stock.quantity = stock_after
-        stock.updated_at = datetime.utcnow()
-
-        # Criar registro de movimentação (auditoria)
-        movement = StockMovement(
-            product_id=product_id,
-            store_id=store_id,
-            movement_type=movement_type,
-            quantity=quantity,
-            movement_date=datetime.utcnow(),
-            reference_id=reference_id,
-            reference_type=reference_type,
-            stock_before=stock_before,
-            stock_after=stock_after,
-            notes=notes,
-        )
-        db.add(movement)
-        db.flush()
+        movements = StockService.register_movements(db, [{
+            'product_id': product_id,
+            'store_id': store_id,
+            'movement_type': movement_type,
+            'quantity': quantity,
+            'reference_id': reference_id,
+            'reference_type': reference_type,
+            'notes': notes,
+        }])
+        return movements[0]
+
+    @staticmethod
+    def register_movements(
+        db: Session,
+        movements: list[dict],
+        check_stock: bool = False,
+    ) -> list[StockMovement]:
+        """
+        Registra um lote de movimentações de estoque com escrita em massa.
+        
+        COMENTÁRIO DE AUDITORIA: Em vez de uma ida ao banco por item, o lote é
+        processado em poucas instruções:
+        1. Todos os StockStore afetados (store_id, product_id) são carregados e
+           bloqueados (SELECT ... FOR UPDATE) em uma única consulta, sempre na
+           ordem (store_id, product_id) para evitar deadlocks entre transações;
+           saldos inexistentes são criados zerados (_create_stocks, que tolera
+           a criação concorrente da mesma chave) e bloqueados em seguida
+        2. stock_before e stock_after são calculados em memória, na ordem do lote,
+           de modo que produtos repetidos encadeiam corretamente os saldos; com
+           check_stock, a validação de estoque das saídas acontece aqui, sobre
+           as linhas já bloqueadas, e não em uma consulta anterior sujeita a
+           concorrência; unidades reservadas (StockStore.reserved) não podem
+           ser consumidas
+        3. Os saldos são atualizados em massa; a versão de stock_store (ETag de
+           GET /stock) é incrementada no commit
+        4. O resumo materializado (stock_summary) recebe as variações por
+           loja/categoria
+        5. Os registros de StockMovement são inseridos em uma única instrução
+        6. Com OUTBOX_ENABLED, as movimentações entram no outbox (OutboxService)
+        7. Os eventos de /stock/stream ficam pendentes na sessão até o commit
+        
+        Args:
+            db: Sessão do banco de dados
+            movements: Lista de movimentações com 'product_id', 'store_id',
+                'movement_type', 'quantity' e, opcionalmente, 'reference_id',
+                'reference_type' e 'notes'
+            check_stock: Se True, rejeita saídas que deixariam o estoque abaixo
+                da quantidade reservada
+            
+        Returns:
+            list: Movimentações criadas, na mesma ordem do lote
+            
+        Raises:
+            ValueError: Se algum tipo de movimento for inválido
+            InsufficientStockError: Se check_stock e o estoque for insuficiente
+        """
+        if not movements:
+            return []
+
+        # Validar tipos de movimento antes de qualquer escrita
+        for movement in movements:
+            if movement['movement_type'] not in VALID_MOVEMENT_TYPES:
+                raise ValueError(f"Tipo de movimento inválido: {movement['movement_type']}")
+
+        # Carregar e bloquear todos os saldos afetados em uma única consulta
+        keys = {(m['store_id'], m['product_id']) for m in movements}
+        stocks = StockService._lock_stocks(db, keys)
+        missing = keys - stocks.keys()
+        if missing:
+            StockService._create_stocks(db, missing)
+            stocks.update(StockService._lock_stocks(db, missing))
+        initial = {key: stock.quantity for key, stock in stocks.items()}
+        balances = dict(initial)
 
-        return movement
+        # Calcular stock_before/stock_after em memória
+        now = datetime.utcnow()
+        movement_rows = []
+        for movement in movements:
+            key = (movement['store_id'], movement['product_id'])
+            stock_before = balances.get(key, 0)
+            signed = StockService.signed_quantity(movement['movement_type'], movement['quantity'])
+            stock_after = stock_before + signed
+            reserved = stocks[key].reserved if key in stocks else 0
+            # Só saídas são validadas: uma entrada (ex.: estorno, transfer_in)
+            # nunca piora um saldo que já está abaixo do reservado
+            if check_stock and signed < 0 and stock_after < reserved:
+                raise InsufficientStockError(
+                    movement['store_id'], movement['product_id'],
+                    stock_before - reserved, movement['quantity'],
+                )
+            balances[key] = stock_after
+
+            movement_rows.append({
+                'product_id': movement['product_id'],
+                'store_id': movement['store_id'],
+                'movement_type': movement['movement_type'],
+                'quantity': movement['quantity'],
+                'movement_date': now,
+                'reference_id': movement.get('reference_id'),
+                'reference_type': movement.get('reference_type'),
+                'stock_before': stock_before,
+                'stock_after': stock_after,
+                'notes': movement.get('notes'),
+            })
+
+        # Atualizar os saldos em massa (UPDATE por chave primária)
+        db.execute(update(StockStore), [
+            {'id': stock.id, 'quantity': balances[key], 'updated_at': now}
+            for key, stock in stocks.items()
+        ])
+        # Manter os objetos já carregados na sessão coerentes com o banco
+        for key, stock in stocks.items():
+            set_committed_value(stock, 'quantity', balances[key])
+            set_committed_value(stock, 'updated_at', now)
+        # Versão de stock_store (ETag de GET /stock), incrementada no commit
+        mark_tables_changed(db, ['stock_store'])
+
+        # Manter o resumo materializado por loja/categoria na mesma transação
+        StockSummaryService.apply_deltas(db, {
+            key: balance - initial.get(key, 0) for key, balance in balances.items()
+        })
+
+        # Criar registros de movimentação (auditoria) em uma única instrução
+        return StockService.insert_movement_rows(db, movement_rows)
+
+    @staticmethod
+    def insert_movement_rows(db: Session, movement_rows: list[dict]) -> list[StockMovement]:
+        """
+        Grava linhas de StockMovement já calculadas, sem alterar StockStore.
+        
+        Usado por register_movements e pela reconciliação (lançamentos que só
+        corrigem o razão). As linhas entram em uma única instrução, seguidas do
+        outbox (OUTBOX_ENABLED) e dos eventos de /stock/stream, publicados
+        somente após o commit.
+        
+        Args:
+            db: Sessão do banco de dados
+            movement_rows: Linhas completas, com stock_before e stock_after
+            
+        Returns:
+            list: Movimentações criadas, na mesma ordem
+        """
+        created = db.scalars(
+            insert(StockMovement).returning(StockMovement, sort_by_parameter_order=True),
+            movement_rows,
+        ).all()
+        OutboxService.enqueue(db, created)
+        queue_stock_events(db, created)
+        return created
 
     @staticmethod
-    def validate_stock_availability(
+    def adjust_to_counts(
         db: Session,
-        store_id: int,
-        product_id: int,
-        required_quantity: int,
-    ) -> bool:
+        counts: list[dict],
+        notes: str | None = None,
+    ) -> list[StockMovement]:
         """
-        Valida se há estoque suficiente para uma operação.
+        Ajusta saldos para quantidades contadas (inventário), via razão.
+        
+        COMENTÁRIO DE AUDITORIA: Em vez de sobrescrever StockStore.quantity, a
+        diferença entre o contado e o saldo atual vira uma movimentação
+        adjustment_in/adjustment_out, mantendo a cadeia stock_before/stock_after:
+        1. Os saldos das chaves são bloqueados em uma única consulta, na ordem
+           (store_id, product_id), e as diferenças calculadas em memória; uma
+           contagem abaixo das unidades reservadas é recusada, pois a
+           confirmação da reserva deixaria o saldo negativo
+        2. As diferenças não nulas são gravadas em um único lote por
+           register_movements (saldos, resumo, razão, outbox e eventos), na
+           mesma transação e com as linhas já bloqueadas
+        
+        Contar de novo a mesma quantidade não gera movimentação.
         
         Args:
             db: Sessão do banco de dados
-            store_id: ID da loja
-            product_id: ID do produto
-            required_quantity: Quantidade necessária
+            counts: Lista com 'store_id', 'product_id' e 'quantity' (contada)
+            notes: Notas das movimentações
             
         Returns:
-            bool: True se há estoque suficiente, False caso contrário
+            list: Movimentações de ajuste criadas, na ordem (store_id, product_id)
+            
+        Raises:
+            ValueError: Se uma quantidade for negativa ou abaixo da reservada,
+                ou se uma chave se repetir
         """
-        stock = db.query(StockStore).filter(
-            StockStore.store_id == store_id,
-            StockStore.product_id == product_id,
+        counted = {}
+        for count in counts:
+            key = (count['store_id'], count['product_id'])
+            if count['quantity'] < 0:
+                raise ValueError(f"Quantidade contada negativa para o produto {key[1]} na loja {key[0]}")
+            if key in counted:
+                raise ValueError(f"Produto {key[1]} repetido na contagem da loja {key[0]}")
+            counted[key] = count['quantity']
+        if not counted:
+            return []
+
+        stocks = StockService._lock_stocks(db, counted)
+        movements = []
+        for key in sorted(counted):
+            reserved = stocks[key].reserved if key in stocks else 0
+            if counted[key] < reserved:
+                raise ValueError(
+                    f"Quantidade contada ({counted[key]}) abaixo da reservada ({reserved}) "
+                    f"para o produto {key[1]} na loja {key[0]}"
+                )
+            delta = counted[key] - (stocks[key].quantity if key in stocks else 0)
+            if not delta:
+                continue
+            movements.append({
+                'product_id': key[1],
+                'store_id': key[0],
+                'movement_type': 'adjustment_in' if delta > 0 else 'adjustment_out',
+                'quantity': abs(delta),
+                'reference_type': 'adjustment',
+                'notes': notes,
+            })
+        return StockService.register_movements(db, movements)
+
+    @staticmethod
+    def reverse_reference(
+        db: Session,
+        reference_type: str,
+        reference_id: int,
+        notes: str | None = None,
+        check_stock: bool = True,
+    ) -> list[StockMovement]:
+        """
+        Estorna no razão o efeito de um documento (venda, entrada, distribuição).
+        
+        COMENTÁRIO DE AUDITORIA: As movimentações originais não são apagadas nem
+        alteradas; o estorno grava movimentações compensatórias com o mesmo
+        reference_type/reference_id:
+        1. Um único GROUP BY (índice ix_stock_movements_reference) calcula o
+           efeito líquido ainda vigente do documento por (store_id, product_id)
+        2. Cada efeito diferente de zero gera a movimentação inversa
+           (transfer_in/transfer_out para distribuições, adjustment_in/
+           adjustment_out para os demais)
+        3. Todas são gravadas em um único lote por register_movements, que
+           bloqueia cada saldo uma única vez
+        
+        Como o efeito líquido do documento passa a zero, estornar de novo não
+        gera movimentações. O chamador deve bloquear o documento (SELECT ...
+        FOR UPDATE) antes, para que estornos concorrentes não dupliquem o efeito.
+        
+        Documentos com movimentações em meses arquivados
+        (stock_movement_archive_references) são recusados: o efeito líquido
+        calculado só pelo razão vivo estaria incompleto.
+        
+        Args:
+            db: Sessão do banco de dados
+            reference_type: Tipo do documento ('sale', 'entry', 'distribution')
+            reference_id: ID do documento
+            notes: Notas das movimentações compensatórias
+            check_stock: Se True, rejeita estornos que deixariam o estoque
+                abaixo da quantidade reservada (ex.: entrada já vendida)
+            
+        Returns:
+            list: Movimentações compensatórias criadas
+            
+        Raises:
+            InsufficientStockError: Se check_stock e o estoque for insuficiente
+            ArchivedMovementsError: Se o documento tem movimentações arquivadas
+        """
+        archived = db.query(StockMovementArchiveReference.archive_id).filter(
+            StockMovementArchiveReference.reference_type == reference_type,
+            StockMovementArchiveReference.reference_id == reference_id,
         ).first()
+        if archived:
+            raise ArchivedMovementsError(
+                f"As movimentações de {reference_type} {reference_id} estão em um mês arquivado "
+                "e não podem ser estornadas"
+            )
+
+        effects = db.query(
+            StockMovement.store_id,
+            StockMovement.product_id,
+            func.sum(StockService.signed_quantity_sql()),
+        ).filter(
+            StockMovement.reference_type == reference_type,
+            StockMovement.reference_id == reference_id,
+        ).group_by(
+            StockMovement.store_id, StockMovement.product_id,
+        ).order_by(
+            StockMovement.store_id, StockMovement.product_id,
+        ).all()
+
+        inbound, outbound = REVERSAL_MOVEMENT_TYPES.get(reference_type, ('adjustment_in', 'adjustment_out'))
+        return StockService.register_movements(db, [
+            {
+                'product_id': product_id,
+                'store_id': store_id,
+                'movement_type': inbound if effect < 0 else outbound,
+                'quantity': abs(effect),
+                'reference_id': reference_id,
+                'reference_type': reference_type,
+                'notes': notes,
+            }
+            for store_id, product_id, effect in effects
+            if effect
+        ], check_stock=check_stock)
+
+    @staticmethod
+    def _lock_stocks(db: Session, keys) -> dict[tuple[int, int], StockStore]:
+        """
+        Carrega e bloqueia (SELECT ... FOR UPDATE) os saldos das chaves
+        (store_id, product_id), na ordem (store_id, product_id).
+
+        Returns:
+            dict: (store_id, product_id) -> StockStore, só das chaves existentes
+        """
+        return {
+            (stock.store_id, stock.product_id): stock
+            for stock in db.query(StockStore).filter(
+                tuple_(StockStore.store_id, StockStore.product_id).in_(list(keys))
+            ).order_by(
+                StockStore.store_id, StockStore.product_id,
+            ).with_for_update().populate_existing().all()
+        }
+
+    @staticmethod
+    def _create_stocks(db: Session, keys) -> None:
+        """
+        Cria saldos zerados para as chaves (store_id, product_id), em ordem.
+
+        _lock_stocks não bloqueia linhas que ainda não existem: duas
+        transações podem tentar criar o mesmo saldo. A constraint
+        uq_stock_store_store_product decide; com INSERT ... ON CONFLICT DO
+        NOTHING (PostgreSQL, SQLite) a perdedora espera o commit da outra e
+        segue sem erro; nos demais bancos, cada chave é inserida em um
+        savepoint e a violação é ignorada. Depois, o chamador bloqueia as
+        linhas com _lock_stocks.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {'store_id': store_id, 'product_id': product_id, 'quantity': 0, 'reserved': 0, 'updated_at': now}
+            for store_id, product_id in sorted(keys)
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            db.execute(
+                dialect_insert(StockStore).on_conflict_do_nothing(
+                    index_elements=[StockStore.store_id, StockStore.product_id],
+                ),
+                rows,
+            )
+            return
+
+        for row in rows:
+            try:
+                # Savepoint: uma criação concorrente viola uq_stock_store_store_product
+                with db.begin_nested():
+                    db.execute(insert(StockStore), [row])
+            except IntegrityError:
+                pass
+
+    @staticmethod
+    def reserve(
+        db: Session,
+        holds: list[dict],
+        ttl_seconds: int | None = None,
+    ) -> list[StockReservation]:
+        """
+        Reserva estoque por um tempo limitado, sem movimentar o saldo.
+        
+        COMENTÁRIO DE AUDITORIA: A reserva não gera StockMovement: o saldo
+        (quantity) só muda quando a reserva é confirmada. Em um único lote:
+        1. Os saldos afetados são bloqueados na ordem (store_id, product_id),
+           como em register_movements
+        2. A disponibilidade (quantity - reserved) é validada em memória, na
+           ordem do lote
+        3. StockStore.reserved é incrementado em massa e as reservas são
+           inseridas em uma única instrução
+        
+        O contador reserved permite validar a disponibilidade lendo uma única
+        linha, sem somar as reservas ativas a cada consulta.
+        
+        Args:
+            db: Sessão do banco de dados
+            holds: Lista com 'store_id', 'product_id', 'quantity' e,
+                opcionalmente, 'reference_type' e 'reference_id'
+            ttl_seconds: Validade da reserva (padrão: RESERVATION_TTL_SECONDS)
+            
+        Returns:
+            list: Reservas criadas, na mesma ordem do lote
+            
+        Raises:
+            ValueError: Se alguma quantidade não for positiva
+            InsufficientStockError: Se a quantidade disponível for insuficiente
+        """
+        if not holds:
+            return []
+
+        for hold in holds:
+            if hold['quantity'] <= 0:
+                raise ValueError(f"Quantidade inválida para reserva: {hold['quantity']}")
+
+        stocks = StockService._lock_stocks(db, {(h['store_id'], h['product_id']) for h in holds})
+        reserved = {key: stock.reserved for key, stock in stocks.items()}
+        for hold in holds:
+            key = (hold['store_id'], hold['product_id'])
+            stock = stocks.get(key)
+            available = stock.quantity - reserved[key] if stock else 0
+            if hold['quantity'] > available:
+                raise InsufficientStockError(key[0], key[1], available, hold['quantity'])
+            reserved[key] += hold['quantity']
+
+        now = datetime.utcnow()
+        StockService._set_reserved(db, stocks, reserved, now)
+
+        expires_at = now + timedelta(seconds=settings.reservation_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        created = db.scalars(
+            insert(StockReservation).returning(StockReservation, sort_by_parameter_order=True),
+            [
+                {
+                    'store_id': hold['store_id'],
+                    'product_id': hold['product_id'],
+                    'quantity': hold['quantity'],
+                    'status': RESERVATION_ACTIVE,
+                    'reference_type': hold.get('reference_type'),
+                    'reference_id': hold.get('reference_id'),
+                    'created_at': now,
+                    'expires_at': expires_at,
+                }
+                for hold in holds
+            ],
+        ).all()
+        stock_reservations_total.inc(len(created), outcome='reserved')
+        return created
+
+    @staticmethod
+    def confirm_reservations(
+        db: Session,
+        reference_type: str,
+        reference_id: int,
+        movement_type: str = 'sale',
+        notes: str | None = None,
+    ) -> list[StockMovement]:
+        """
+        Confirma as reservas ativas de um documento, convertendo-as em movimentações.
+        
+        COMENTÁRIO DE AUDITORIA: As reservas são bloqueadas antes dos saldos (a
+        mesma ordem do varredor de reservas vencidas). O reserved é devolvido e
+        as saídas são registradas por register_movements no mesmo lote, sem nova
+        validação de estoque: as unidades já estavam garantidas pela reserva.
+        
+        Args:
+            db: Sessão do banco de dados
+            reference_type: Tipo do documento (ex.: 'sale')
+            reference_id: ID do documento
+            movement_type: Tipo das movimentações geradas
+            notes: Notas das movimentações
+            
+        Returns:
+            list: Movimentações criadas (vazia se não há reservas ativas)
+            
+        Raises:
+            ReservationExpiredError: Se alguma reserva já venceu
+        """
+        holds = StockService._lock_active_reservations(db, reference_type, reference_id)
+        if not holds:
+            return []
 
-        if not stock:
-            return False
+        now = datetime.utcnow()
+        if any(hold.expires_at <= now for hold in holds):
+            raise ReservationExpiredError(
+                f"Reserva de {reference_type} #{reference_id} vencida"
+            )
 
-        return stock.quantity >= required_quantity
+        StockService._resolve_reservations(db, holds, RESERVATION_CONFIRMED, now)
+        return StockService.register_movements(db, [
+            {
+                'product_id': hold.product_id,
+                'store_id': hold.store_id,
+                'movement_type': movement_type,
+                'quantity': hold.quantity,
+                'reference_id': reference_id,
+                'reference_type': reference_type,
+                'notes': notes,
+            }
+            for hold in holds
+        ])
+
+    @staticmethod
+    def release_reservations(
+        db: Session,
+        reference_type: str,
+        reference_id: int,
+    ) -> int:
+        """
+        Libera as reservas ativas de um documento, devolvendo a disponibilidade.
+        
+        Returns:
+            int: Quantidade de reservas liberadas
+        """
+        holds = StockService._lock_active_reservations(db, reference_type, reference_id)
+        StockService._resolve_reservations(db, holds, RESERVATION_RELEASED, datetime.utcnow())
+        return len(holds)
+
+    @staticmethod
+    def expire_reservations(db: Session, limit: int = 500) -> int:
+        """
+        Expira um lote de reservas ativas vencidas.
+        
+        COMENTÁRIO DE AUDITORIA: O lote é reivindicado com SELECT ... FOR UPDATE
+        SKIP LOCKED, pelo índice (status, expires_at): vários varredores não
+        disputam as mesmas reservas, e uma confirmação em andamento não é
+        bloqueada. As vendas pendentes cujas reservas expiraram passam a
+        'expired'. O commit fica com quem chama.
+        
+        Args:
+            db: Sessão do banco de dados
+            limit: Tamanho máximo do lote
+            
+        Returns:
+            int: Quantidade de reservas expiradas
+        """
+        now = datetime.utcnow()
+        holds = db.query(StockReservation).filter(
+            StockReservation.status == RESERVATION_ACTIVE,
+            StockReservation.expires_at <= now,
+        ).order_by(
+            StockReservation.expires_at, StockReservation.id,
+        ).limit(limit).with_for_update(skip_locked=True).all()
+        if not holds:
+            return 0
+
+        StockService._resolve_reservations(db, holds, RESERVATION_EXPIRED, now)
+        sale_ids = {hold.reference_id for hold in holds if hold.reference_type == 'sale'}
+        if sale_ids:
+            db.execute(
+                update(Sale).where(
+                    Sale.id.in_(sale_ids), Sale.status == 'pending',
+                ).values(status='expired')
+            )
+        return len(holds)
+
+    @staticmethod
+    def _lock_active_reservations(db: Session, reference_type: str, reference_id: int) -> list[StockReservation]:
+        """Carrega e bloqueia as reservas ativas de um documento."""
+        return db.query(StockReservation).filter(
+            StockReservation.reference_type == reference_type,
+            StockReservation.reference_id == reference_id,
+            StockReservation.status == RESERVATION_ACTIVE,
+        ).order_by(StockReservation.id).with_for_update().all()
+
+    @staticmethod
+    def _resolve_reservations(
+        db: Session,
+        holds: list[StockReservation],
+        status: str,
+        now: datetime,
+    ) -> None:
+        """Encerra reservas ativas já bloqueadas, devolvendo StockStore.reserved em massa."""
+        if not holds:
+            return
+
+        released = defaultdict(int)
+        for hold in holds:
+            released[(hold.store_id, hold.product_id)] += hold.quantity
+            hold.status = status
+            hold.resolved_at = now
+
+        stocks = StockService._lock_stocks(db, released)
+        StockService._set_reserved(db, stocks, {
+            # max: reserved alterado por fora não fica negativo
+            key: max(stock.reserved - released[key], 0) for key, stock in stocks.items()
+        }, now)
+        db.flush()
+        stock_reservations_total.inc(len(holds), outcome=status)
+
+    @staticmethod
+    def _set_reserved(
+        db: Session,
+        stocks: dict[tuple[int, int], StockStore],
+        reserved: dict[tuple[int, int], int],
+        now: datetime,
+    ) -> None:
+        """Grava os novos valores de reserved dos saldos bloqueados em um único UPDATE em massa."""
+        if not stocks:
+            return
+        db.execute(update(StockStore), [
+            {'id': stock.id, 'reserved': reserved[key], 'updated_at': now}
+            for key, stock in stocks.items()
+        ])
+        for key, stock in stocks.items():
+            set_committed_value(stock, 'reserved', reserved[key])
+            set_committed_value(stock, 'updated_at', now)
+        mark_tables_changed(db, ['stock_store'])
+
+    @staticmethod
+    def signed_quantity(movement_type: str, quantity: int) -> int:
+        """
+        Converte a quantidade de uma movimentação em variação de saldo.
+        
+        Args:
+            movement_type: Tipo de movimento
+            quantity: Quantidade movimentada
+            
+        Returns:
+            int: Quantidade positiva para entradas e negativa para saídas
+        """
+        if movement_type in INBOUND_MOVEMENT_TYPES:
+            return quantity
+        if movement_type in OUTBOUND_MOVEMENT_TYPES:
+            return -quantity
+        return 0
+
+    @staticmethod
+    def signed_quantity_sql():
+        """
+        Expressão SQL equivalente a signed_quantity, para agregações no banco.
+        
+        Returns:
+            Expressão CASE com a variação de saldo de cada StockMovement
+        """
+        return case(
+            (StockMovement.movement_type.in_(INBOUND_MOVEMENT_TYPES), StockMovement.quantity),
+            (StockMovement.movement_type.in_(OUTBOUND_MOVEMENT_TYPES), -StockMovement.quantity),
+            else_=0,
+        )
 
     @staticmethod
     def get_stock_by_store_and_product(
@@ -183,3 +759,31 @@ class StockService:
         ).first()
 
         return stock.quantity if stock else 0
+
+
+def run_reservation_sweeper(
+    session_factory,
+    batch_size: int = 500,
+    interval: float = 30.0,
+    stop: threading.Event | None = None,
+) -> None:
+    """
+    Laço do varredor de reservas: expira lotes de reservas vencidas, com um
+    commit por lote, e espera interval segundos quando não há mais vencidas.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            expired = StockService.expire_reservations(db, batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Falha ao expirar reservas; nova tentativa em %.1fs", interval)
+            expired = 0
+        finally:
+            db.close()
+        if expired:
+            logger.info("Reservas: %d expiradas", expired)
+        if expired < batch_size:
+            stop.wait(interval)
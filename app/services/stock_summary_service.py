@@ -0,0 +1,221 @@
+"""
+Serviço de resumo materializado de estoque.
+
+Este módulo mantém a tabela stock_summary (unidades e valor de custo/venda por loja
+e categoria) atualizada de forma incremental, para que o resumo de estoque seja
+lido em O(lojas) em vez de agregar todo o stock_store a cada consulta.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, insert, update, delete, select, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import Product, StockStore, StockSummary
+
+
+class StockSummaryService:
+    """Serviço para manter e consultar o resumo de estoque."""
+
+    @staticmethod
+    def apply_deltas(
+        db: Session,
+        deltas: dict[tuple[int, int], int],
+    ) -> None:
+        """
+        Aplica variações de saldo ao resumo de estoque.
+
+        COMENTÁRIO DE AUDITORIA: Chamado dentro da mesma transação que altera o
+        StockStore (StockService.register_movements), garantindo que o resumo
+        nunca diverge dos saldos. Os preços e categorias dos produtos afetados
+        são lidos em uma única consulta e as variações são somadas por
+        (store_id, category_id) antes de qualquer escrita.
+
+        Args:
+            db: Sessão do banco de dados
+            deltas: Variação de quantidade por (store_id, product_id)
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        product_ids = {product_id for _, product_id in deltas}
+        products = {
+            row.id: row
+            for row in db.query(
+                Product.id, Product.category_id, Product.cost_price, Product.sale_price,
+            ).filter(Product.id.in_(product_ids))
+        }
+
+        groups = defaultdict(lambda: [0, 0.0, 0.0])
+        for (store_id, product_id), delta in deltas.items():
+            product = products.get(product_id)
+            if product is None:
+                continue
+            group = groups[(store_id, product.category_id or 0)]
+            group[0] += delta
+            group[1] += delta * product.cost_price
+            group[2] += delta * product.sale_price
+
+        StockSummaryService._apply_groups(db, groups)
+
+    @staticmethod
+    def reprice_product(
+        db: Session,
+        product_id: int,
+        old_category_id: int | None,
+        old_cost_price: float,
+        old_sale_price: float,
+        new_category_id: int | None,
+        new_cost_price: float,
+        new_sale_price: float,
+    ) -> None:
+        """
+        Reavalia o resumo quando o preço ou a categoria de um produto mudam.
+
+        O saldo do produto é retirado do grupo antigo com os preços antigos e
+        somado ao grupo novo com os preços novos, em O(lojas do produto).
+
+        COMENTÁRIO DE AUDITORIA: Os saldos do produto são lidos com SELECT ...
+        FOR UPDATE, na ordem (store_id, product_id) de
+        StockService._lock_stocks: uma movimentação concorrente termina antes
+        (e seu delta, com os preços antigos, é reavaliado aqui) ou espera o
+        commit e já lê os preços novos em apply_deltas.
+
+        Args:
+            db: Sessão do banco de dados
+            product_id: ID do produto
+            old_category_id: Categoria antes da alteração
+            old_cost_price: Preço de custo antes da alteração
+            old_sale_price: Preço de venda antes da alteração
+            new_category_id: Categoria após a alteração
+            new_cost_price: Preço de custo após a alteração
+            new_sale_price: Preço de venda após a alteração
+        """
+        groups = defaultdict(lambda: [0, 0.0, 0.0])
+        balances = db.query(StockStore.store_id, StockStore.quantity).filter(
+            StockStore.product_id == product_id,
+        ).order_by(StockStore.store_id).with_for_update()
+        for store_id, quantity in balances:
+            old_group = groups[(store_id, old_category_id or 0)]
+            old_group[0] -= quantity
+            old_group[1] -= quantity * old_cost_price
+            old_group[2] -= quantity * old_sale_price
+
+            new_group = groups[(store_id, new_category_id or 0)]
+            new_group[0] += quantity
+            new_group[1] += quantity * new_cost_price
+            new_group[2] += quantity * new_sale_price
+
+        StockSummaryService._apply_groups(db, groups)
+
+    @staticmethod
+    def _apply_groups(db: Session, groups: dict) -> None:
+        """Incrementa (ou cria) as linhas do resumo, em ordem determinística."""
+        table = StockSummary.__table__
+        now = datetime.utcnow()
+
+        for (store_id, category_id), (units, cost, sale) in sorted(groups.items()):
+            if not units and not cost and not sale:
+                continue
+
+            # Incremento atômico: não depende de ler o valor atual
+            increment = update(table).where(
+                table.c.store_id == store_id,
+                table.c.category_id == category_id,
+            ).values(
+                total_units=table.c.total_units + units,
+                cost_value=table.c.cost_value + cost,
+                sale_value=table.c.sale_value + sale,
+                updated_at=now,
+            )
+            if db.execute(increment).rowcount:
+                continue
+
+            try:
+                # Savepoint: outra transação pode criar a mesma linha antes
+                with db.begin_nested():
+                    db.execute(insert(table).values(
+                        store_id=store_id,
+                        category_id=category_id,
+                        total_units=units,
+                        cost_value=cost,
+                        sale_value=sale,
+                        updated_at=now,
+                    ))
+            except IntegrityError:
+                db.execute(increment)
+
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """
+        Recalcula todo o resumo a partir do stock_store com SQL em conjunto.
+
+        Usado para carga inicial ou correção após alterações fora do serviço.
+
+        Args:
+            db: Sessão do banco de dados
+        """
+        category = func.coalesce(Product.category_id, 0)
+        aggregate = select(
+            StockStore.store_id,
+            category,
+            func.sum(StockStore.quantity),
+            func.sum(StockStore.quantity * Product.cost_price),
+            func.sum(StockStore.quantity * Product.sale_price),
+            literal(datetime.utcnow()),
+        ).join(Product, Product.id == StockStore.product_id).group_by(
+            StockStore.store_id, category,
+        )
+
+        db.execute(delete(StockSummary))
+        db.execute(insert(StockSummary).from_select(
+            ['store_id', 'category_id', 'total_units', 'cost_value', 'sale_value', 'updated_at'],
+            aggregate,
+        ))
+
+    @staticmethod
+    def get_summary(
+        db: Session,
+        store_id: int | None = None,
+        by_category: bool = False,
+    ) -> list[dict]:
+        """
+        Obtém o resumo de estoque por loja, opcionalmente por categoria.
+
+        Args:
+            db: Sessão do banco de dados
+            store_id: Filtra uma única loja
+            by_category: Se True, detalha por categoria
+
+        Returns:
+            list: Linhas com store_id, category_id, total_units, cost_value e sale_value
+        """
+        if by_category:
+            query = db.query(
+                StockSummary.store_id,
+                StockSummary.category_id,
+                StockSummary.total_units,
+                StockSummary.cost_value,
+                StockSummary.sale_value,
+            ).order_by(StockSummary.store_id, StockSummary.category_id)
+        else:
+            query = db.query(
+                StockSummary.store_id,
+                func.sum(StockSummary.total_units).label('total_units'),
+                func.sum(StockSummary.cost_value).label('cost_value'),
+                func.sum(StockSummary.sale_value).label('sale_value'),
+            ).group_by(StockSummary.store_id).order_by(StockSummary.store_id)
+
+        if store_id:
+            query = query.filter(StockSummary.store_id == store_id)
+
+        return [
+            {
+                'store_id': row.store_id,
+                'category_id': (row.category_id or None) if by_category else None,
+                'total_units': row.total_units,
+                'cost_value': row.cost_value,
+                'sale_value': row.sale_value,
+            }
+            for row in query
+        ]
@@ -0,0 +1,137 @@
+"""
+Sincronização incremental (delta sync) do catálogo e do estoque de uma loja.
+
+Terminais de PDV guardam o token devolvido por GET /sync e, na próxima
+inicialização, recebem apenas o que mudou desde ele:
+
+- produtos com (revision, id) posterior ao token. revision é a versão da tabela
+  products (table_versions) gravada em cada escrita; como a linha do contador
+  fica bloqueada até o commit, as revisões são confirmadas em ordem;
+- saldos (stock_store) da loja cujos produtos tiveram movimentações com id
+  posterior ao token.
+
+Os ids de movimentação não são confirmados em ordem (duas transações
+concorrentes podem fazer commit na ordem inversa dos ids). Por isso o token só
+avança até a última movimentação com mais de SYNC_SETTLE_SECONDS: as mais
+recentes voltam na sincronização seguinte, o que é inofensivo, pois o saldo
+enviado é o valor atual e não um incremento.
+
+Uma sincronização grande (a primeira, com o catálogo inteiro) é dividida em
+páginas: enquanto has_more for true, o cliente repete a chamada com o token da
+página anterior. Produtos excluídos não são sinalizados; a desativação
+(active=false) é propagada normalmente.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import Product, StockMovement, StockStore, Store
+
+# Posições do token: loja, produto (revision, id), movimentação confirmada,
+# saldo (id) da página atual e movimentação alvo da sincronização em andamento
+TOKEN_COLUMNS = [Store.id, Product.revision, Product.id, StockMovement.id, StockStore.id, StockMovement.id]
+# Movimentação alvo ainda não definida (início de uma sincronização)
+NO_TARGET = -1
+
+
+class SyncTokenError(ValueError):
+    """Token de sincronização de outra loja."""
+
+
+class SyncService:
+    """Serviço de sincronização incremental para terminais de loja."""
+
+    @staticmethod
+    def decode_token(token: str | None, store_id: int) -> list[int]:
+        """
+        Decodifica o token (ou o estado inicial, sem token).
+
+        Raises:
+            HTTPException: 400 se o token for inválido
+            SyncTokenError: Se o token pertencer a outra loja
+        """
+        if not token:
+            return [store_id, 0, 0, 0, 0, NO_TARGET]
+        values = decode_cursor(token, TOKEN_COLUMNS)
+        if values[0] != store_id:
+            raise SyncTokenError(f"Token de sincronização pertence à loja {values[0]}")
+        return values
+
+    @staticmethod
+    def settled_movement_id(db: Session, store_id: int) -> int:
+        """Maior id de movimentação da loja que já não pode ter concorrentes em aberto."""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.sync_settle_seconds)
+        return db.query(func.max(StockMovement.id)).filter(
+            StockMovement.store_id == store_id,
+            StockMovement.movement_date < cutoff,
+        ).scalar() or 0
+
+    @staticmethod
+    def changes(db: Session, store_id: int, token: str | None, limit: int) -> dict:
+        """
+        Obtém uma página de alterações da loja desde o token.
+
+        Args:
+            db: Sessão do banco de dados
+            store_id: Loja do terminal
+            token: Token devolvido pela sincronização anterior (None na primeira)
+            limit: Máximo de registros (produtos + saldos) na página
+
+        Returns:
+            dict: 'products', 'stock', 'token' (próxima chamada) e 'has_more'
+        """
+        _, revision, product_id, movement_id, stock_id, target = SyncService.decode_token(token, store_id)
+        if target == NO_TARGET:
+            target = SyncService.settled_movement_id(db, store_id)
+
+        def next_token(*values) -> str:
+            return encode_cursor([store_id, *values])
+
+        # 1. Produtos alterados, em ordem de (revision, id)
+        products = db.query(Product).filter(
+            tuple_(Product.revision, Product.id) > tuple_(revision, product_id),
+        ).order_by(Product.revision, Product.id).limit(limit + 1).all()
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            return {
+                'products': products,
+                'stock': [],
+                'token': next_token(last.revision, last.id, movement_id, stock_id, target),
+                'has_more': True,
+            }
+        if products:
+            revision, product_id = products[-1].revision, products[-1].id
+
+        # 2. Saldos da loja com movimentações posteriores ao token (todos, na primeira)
+        query = db.query(StockStore).filter(
+            StockStore.store_id == store_id,
+            StockStore.id > stock_id,
+        )
+        if movement_id:
+            query = query.filter(StockStore.product_id.in_(
+                select(StockMovement.product_id).where(
+                    StockMovement.store_id == store_id,
+                    StockMovement.id > movement_id,
+                ).distinct()
+            ))
+        remaining = limit - len(products)
+        stock = query.order_by(StockStore.id).limit(remaining + 1).all()
+        if len(stock) > remaining:
+            stock = stock[:remaining]
+            last_stock_id = stock[-1].id if stock else stock_id
+            return {
+                'products': products,
+                'stock': stock,
+                'token': next_token(revision, product_id, movement_id, last_stock_id, target),
+                'has_more': True,
+            }
+
+        # 3. Sincronização completa: o token passa a apontar para a movimentação alvo
+        return {
+            'products': products,
+            'stock': stock,
+            'token': next_token(revision, product_id, max(target, movement_id), 0, NO_TARGET),
+            'has_more': False,
+        }
@@ -0,0 +1,158 @@
+"""
+Benchmark de carga comparando a pilha síncrona e a assíncrona (ASYNC_DB).
+
+Sobe a API duas vezes com uvicorn sobre o mesmo banco (ASYNC_DB=false e
+ASYNC_DB=true), dispara requisições concorrentes com httpx e imprime req/s e
+latências p50/p99 de cada pilha. A carga mistura leituras de saldo, listagem
+paginada de produtos e criação de vendas.
+
+O padrão é um SQLite descartável; para números representativos use Postgres
+(as escritas no SQLite são serializadas de qualquer forma).
+
+Uso:
+    python scripts/benchmark_async_stack.py
+    python scripts/benchmark_async_stack.py --requests 20000 --concurrency 200 \\
+        --url postgresql+psycopg2://...
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+from sqlalchemy import create_engine, insert
+from app.db.database import Base
+from app.models import Client, Product, Store, StockStore
+
+
+def populate(url: str, stores: int, products: int):
+    """Recria o schema com lojas, produtos, um cliente e saldos altos."""
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Client), [{
+            "id": 1, "name": "Cliente Benchmark",
+            "cpf_cnpj": "000.000.000-00", "email": "benchmark@example.com",
+        }])
+        conn.execute(insert(Store), [{"id": i, "name": f"Loja {i}"} for i in range(1, stores + 1)])
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"Produto {i}", "cost_price": 10.0, "sale_price": 20.0}
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(StockStore), [
+            {"store_id": s, "product_id": p, "quantity": 1_000_000}
+            for s in range(1, stores + 1)
+            for p in range(1, products + 1)
+        ])
+    engine.dispose()
+
+
+def start_server(url: str, async_db: bool, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=url, ASYNC_DB=str(async_db).lower(), DEBUG="false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Servidor na porta {port} não respondeu")
+
+
+def build_request(rng: random.Random, stores: int, products: int, write_ratio: float):
+    store_id = rng.randint(1, stores)
+    product_id = rng.randint(1, products)
+    if rng.random() < write_ratio:
+        return "POST", "/sales", {
+            "client_id": 1,
+            "store_id": store_id,
+            "total_value": 20.0,
+            "items": [{"product_id": product_id, "quantity": 1, "unit_price": 20.0}],
+        }
+    if rng.random() < 0.5:
+        return "GET", f"/stock/stores/{store_id}/products/{product_id}", None
+    return "GET", "/products", None
+
+
+async def run_load(port: int, args) -> tuple[float, list[float], int]:
+    """Executa a carga e retorna (duração, latências em ms, erros)."""
+    rng = random.Random(42)
+    plan = [build_request(rng, args.stores, args.products, args.write_ratio) for _ in range(args.requests)]
+    latencies, errors = [], 0
+    queue = iter(plan)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as http:
+        async def worker():
+            nonlocal errors
+            for method, path, body in queue:
+                params = {"limit": 50} if method == "GET" else None
+                started = time.perf_counter()
+                try:
+                    response = await http.request(method, path, json=body, params=params)
+                    failed = response.status_code >= 400
+                except httpx.TransportError:
+                    failed = True
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        return time.perf_counter() - started, latencies, errors
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="DATABASE_URL síncrona (padrão: SQLite temporário)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fração de POST /sales")
+    parser.add_argument("--workers", type=int, default=1, help="Processos uvicorn por pilha")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    print(f"Banco: {url}")
+    print(f"{args.requests} requisições, concorrência {args.concurrency}, escrita {args.write_ratio:.0%}\n")
+
+    for label, async_db in (("sync ", False), ("async", True)):
+        populate(url, args.stores, args.products)
+        server = start_server(url, async_db, args.port, args.workers)
+        try:
+            duration, latencies, errors = asyncio.run(run_load(args.port, args))
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"{label}: {len(latencies) / duration:8.1f} req/s  "
+            f"p50 {statistics.median(latencies):7.1f} ms  "
+            f"p99 {percentile(latencies, 0.99):7.1f} ms  "
+            f"erros {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
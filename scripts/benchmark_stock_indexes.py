@@ -0,0 +1,160 @@
+"""
+Benchmark de latência das consultas de estoque antes e depois dos índices compostos.
+
+Popula um banco descartável com N movimentações (padrão: 1.000.000) sem os índices
+da migração 0001_stock_lookup_indexes, mede as consultas mais frequentes, cria os
+índices e mede novamente.
+
+Uso:
+    python scripts/benchmark_stock_indexes.py
+    python scripts/benchmark_stock_indexes.py --movements 200000 --url postgresql+psycopg2://...
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import MetaData, create_engine, insert, select, text
+from app.db.database import Base
+from app.models import Product, Store, StockMovement, StockStore
+
+INDEX_DDL = [
+    "CREATE UNIQUE INDEX uq_stock_store_store_product ON stock_store (store_id, product_id)",
+    "CREATE INDEX ix_stock_movements_reference ON stock_movements (reference_type, reference_id)",
+    "CREATE INDEX ix_stock_movements_store_product_date "
+    "ON stock_movements (store_id, product_id, movement_date)",
+]
+CHUNK_SIZE = 50_000
+
+
+def build_schema_without_indexes(engine):
+    """Cria as tabelas sem os índices compostos (estado anterior à migração)."""
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    stock_store = metadata.tables["stock_store"]
+    stock_store.constraints = {
+        c for c in stock_store.constraints if c.name != "uq_stock_store_store_product"
+    }
+    stock_movements = metadata.tables["stock_movements"]
+    stock_movements.indexes = {
+        i for i in stock_movements.indexes
+        if i.name not in ("ix_stock_movements_reference", "ix_stock_movements_store_product_date")
+    }
+    metadata.drop_all(bind=engine)
+    metadata.create_all(bind=engine)
+
+
+def populate(engine, stores: int, products: int, movements: int):
+    """Popula lojas, produtos, saldos e movimentações com inserts em lote."""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Store), [{"id": i, "name": f"Loja {i}"} for i in range(1, stores + 1)])
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"Produto {i}", "cost_price": 1.0, "sale_price": 2.0}
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(StockStore), [
+            {"store_id": s, "product_id": p, "quantity": 100}
+            for s in range(1, stores + 1) for p in range(1, products + 1)
+        ])
+
+    for offset in range(0, movements, CHUNK_SIZE):
+        rows = []
+        for i in range(offset, min(offset + CHUNK_SIZE, movements)):
+            rows.append({
+                "product_id": rng.randint(1, products),
+                "store_id": rng.randint(1, stores),
+                "movement_type": "sale",
+                "quantity": 1,
+                "movement_date": start + timedelta(seconds=i * 30),
+                "reference_id": i // 3,
+                "reference_type": "sale",
+                "stock_before": 1,
+                "stock_after": 0,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(StockMovement), rows)
+
+
+def measure(engine, stores: int, products: int, movements: int, samples: int) -> dict:
+    """Mede a latência (ms) das consultas quentes com parâmetros aleatórios."""
+    rng = random.Random(7)
+    queries = {
+        "stock_store (store_id, product_id)": lambda: select(StockStore).where(
+            StockStore.store_id == rng.randint(1, stores),
+            StockStore.product_id == rng.randint(1, products),
+        ),
+        "movements by-reference": lambda: select(StockMovement).where(
+            StockMovement.reference_type == "sale",
+            StockMovement.reference_id == rng.randint(0, movements // 3),
+        ),
+        "movements store+product by date": lambda: select(StockMovement).where(
+            StockMovement.store_id == rng.randint(1, stores),
+            StockMovement.product_id == rng.randint(1, products),
+        ).order_by(StockMovement.movement_date.desc()).limit(10),
+    }
+
+    results = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            timings = []
+            for _ in range(samples):
+                stmt = build()
+                began = time.perf_counter()
+                conn.execute(stmt).all()
+                timings.append((time.perf_counter() - began) * 1000)
+            timings.sort()
+            results[name] = (statistics.median(timings), timings[int(len(timings) * 0.95) - 1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="URL do banco (padrão: SQLite temporário)")
+    parser.add_argument("--movements", type=int, default=1_000_000)
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    engine = create_engine(url)
+
+    print(f"Populando {args.movements} movimentações em {engine.url.render_as_string()}...")
+    build_schema_without_indexes(engine)
+    populate(engine, args.stores, args.products, args.movements)
+
+    before = measure(engine, args.stores, args.products, args.movements, args.samples)
+    with engine.begin() as conn:
+        for ddl in INDEX_DDL:
+            conn.execute(text(ddl))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE stock_store; ANALYZE stock_movements"))
+    after = measure(engine, args.stores, args.products, args.movements, args.samples)
+
+    print(f"\n{'consulta':<36}{'antes p50/p95 (ms)':>22}{'depois p50/p95 (ms)':>24}")
+    for name in before:
+        b50, b95 = before[name]
+        a50, a95 = after[name]
+        print(f"{name:<36}{b50:>11.3f} /{b95:>9.3f}{a50:>13.3f} /{a95:>9.3f}")
+
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
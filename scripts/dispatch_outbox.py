@@ -0,0 +1,70 @@
+"""
+Dispatcher do outbox de movimentações de estoque.
+
+Entrega as movimentações gravadas em outbox_events (OUTBOX_ENABLED=true) a um
+arquivo NDJSON local ou a um endpoint HTTP, em lotes, até ser interrompido.
+Várias instâncias podem rodar ao mesmo tempo: cada lote é reivindicado com
+FOR UPDATE SKIP LOCKED.
+
+Uso:
+    python scripts/dispatch_outbox.py --target /var/lib/systock/movements.ndjson
+    python scripts/dispatch_outbox.py --target http://localhost:9000/stock-events --batch-size 500
+    python scripts/dispatch_outbox.py --target ... --once
+    python scripts/dispatch_outbox.py --purge-days 7
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.services.outbox_service import OutboxService, run_dispatcher, sink_from_target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL http(s) ou caminho do arquivo NDJSON")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=1.0, help="Espera (s) com o outbox vazio")
+    parser.add_argument("--once", action="store_true", help="Entrega os pendentes e termina")
+    parser.add_argument("--purge-days", type=int, help="Remove eventos entregues há mais de N dias e termina")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.purge_days is not None:
+        db = SessionLocal()
+        try:
+            deleted = OutboxService.purge_dispatched(db, datetime.utcnow() - timedelta(days=args.purge_days))
+        finally:
+            db.close()
+        print(f"{deleted} eventos entregues removidos")
+        return
+
+    if not args.target:
+        parser.error("--target é obrigatório")
+    sink = sink_from_target(args.target)
+
+    if args.once:
+        total = 0
+        db = SessionLocal()
+        try:
+            while delivered := OutboxService.dispatch_batch(db, sink, args.batch_size):
+                total += delivered
+        finally:
+            db.close()
+        print(f"{total} eventos entregues")
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_dispatcher(SessionLocal, sink, args.batch_size, args.interval, stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Varredor de reservas de estoque vencidas.
+
+Expira, em lotes, as reservas ativas cujo prazo (RESERVATION_TTL_SECONDS) passou,
+devolvendo as unidades reservadas à disponibilidade das lojas e marcando as
+vendas pendentes correspondentes como 'expired'. Várias instâncias podem rodar
+ao mesmo tempo: cada lote é reivindicado com FOR UPDATE SKIP LOCKED.
+
+Uso:
+    python scripts/expire_reservations.py
+    python scripts/expire_reservations.py --batch-size 1000 --interval 10
+    python scripts/expire_reservations.py --once
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.services.stock_service import StockService, run_reservation_sweeper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=30.0, help="Espera (s) sem reservas vencidas")
+    parser.add_argument("--once", action="store_true", help="Expira as vencidas e termina")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.once:
+        total = 0
+        db = SessionLocal()
+        try:
+            while expired := StockService.expire_reservations(db, args.batch_size):
+                db.commit()
+                total += expired
+        finally:
+            db.close()
+        print(f"{total} reservas expiradas")
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_reservation_sweeper(SessionLocal, args.batch_size, args.interval, stop)
+
+
+if __name__ == "__main__":
+    main()
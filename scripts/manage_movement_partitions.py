@@ -0,0 +1,82 @@
+"""
+Manutenção das partições mensais de stock_movements e arquivamento de meses frios.
+
+Cria as partições dos próximos meses (PostgreSQL particionado; sem efeito em
+outros bancos) e, com --archive-older-than-months N, arquiva em arquivos
+NDJSON compactados cada mês terminado há mais de N meses, um commit por mês.
+Meses sem nenhuma movimentação não são arquivados, e o arquivamento para no
+primeiro mês ainda não coberto por uma fotografia de estoque
+(scripts/take_stock_snapshot.py). Indicado para o cron diário, depois da fotografia.
+
+Uso:
+    python scripts/manage_movement_partitions.py
+    python scripts/manage_movement_partitions.py --ahead 6
+    python scripts/manage_movement_partitions.py --archive-older-than-months 12 --dir /mnt/archive
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models import StockMovement
+from app.services.movement_archive_service import MovementArchiveService, add_months, month_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--ahead", type=int, default=settings.movement_partitions_ahead,
+        help="Meses à frente com partição criada",
+    )
+    parser.add_argument(
+        "--archive-older-than-months", type=int, default=None,
+        help="Arquiva os meses terminados há mais de N meses",
+    )
+    parser.add_argument("--dir", default=settings.movement_archive_dir, help="Diretório dos arquivos")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        created = MovementArchiveService.ensure_partitions(db, args.ahead)
+        db.commit()
+        print(f"{len(created)} partições criadas" + (f": {', '.join(created)}" if created else ""))
+
+        if args.archive_older_than_months is None:
+            return
+        cutoff = add_months(month_start(datetime.utcnow()), -args.archive_older_than_months)
+        oldest = db.query(func.min(StockMovement.movement_date)).filter(
+            StockMovement.movement_date < cutoff,
+        ).scalar()
+        month = month_start(oldest) if oldest else cutoff
+        archived = 0
+        while month < cutoff:
+            has_rows = db.query(StockMovement.id).filter(
+                StockMovement.movement_date >= month,
+                StockMovement.movement_date < add_months(month, 1),
+            ).first()
+            if has_rows:
+                try:
+                    archive = MovementArchiveService.archive_month(db, month, args.dir)
+                except ValueError as e:
+                    db.rollback()
+                    print(e)
+                    sys.exit(1)
+                db.commit()
+                archived += 1
+                print(f"{month:%Y-%m}: {archive.row_count} movimentações em {archive.path}")
+            month = add_months(month, 1)
+        print(f"{archived} meses arquivados")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
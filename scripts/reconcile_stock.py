@@ -0,0 +1,50 @@
+"""
+Reconciliação do razão de movimentações com os saldos de estoque.
+
+Compara, por faixas de produtos, o saldo esperado pelo razão (soma das
+movimentações) com stock_store e lista as divergências. Com --repair, lança
+ajustes (adjustment_in/adjustment_out, reference_type='reconciliation') que
+igualam o razão aos saldos atuais, sem alterar stock_store.
+
+Uso:
+    python scripts/reconcile_stock.py
+    python scripts/reconcile_stock.py --repair --chunk-size 5000
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.services.reconciliation_service import RECONCILIATION_CHUNK_SIZE, ReconciliationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=RECONCILIATION_CHUNK_SIZE, help="Produtos por faixa")
+    parser.add_argument("--repair", action="store_true", help="Lança os ajustes no razão")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        result = ReconciliationService.reconcile(db, args.chunk_size, args.repair)
+    finally:
+        db.close()
+
+    for item in result["drift"]:
+        print(
+            f"loja {item['store_id']} produto {item['product_id']}: "
+            f"razão {item['expected']}, saldo {item['actual']}"
+        )
+    print(
+        f"{result['chunks']} faixas, {len(result['drift'])} divergências, "
+        f"{result['repaired']} ajustes lançados"
+    )
+    sys.exit(1 if result["drift"] and not args.repair else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Grava uma fotografia dos saldos de estoque.
+
+Pensado para execução periódica (cron, agendador do container), por exemplo
+diariamente, limitando o trabalho de /stock/as-of às movimentações de um dia.
+
+Uso:
+    python scripts/take_stock_snapshot.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.services.snapshot_service import StockSnapshotService
+
+
+def main():
+    db = SessionLocal()
+    try:
+        snapshot = StockSnapshotService.take_snapshot(db)
+        db.commit()
+        print(
+            f"Fotografia #{snapshot.id} gravada em {snapshot.taken_at.isoformat()} "
+            f"(até a movimentação #{snapshot.last_movement_id})"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
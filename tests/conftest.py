@@ -0,0 +1,149 @@
+"""Configuração compartilhada dos testes."""
+import os
+
+# A aplicação exige DATABASE_URL na importação; os testes usam SQLite em memória
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from contextlib import contextmanager
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.core.reference_cache import reference_cache
+from app.db.database import Base, get_db
+from app.models import Client, Category, Product, Supplier, Store
+
+# Usar banco de dados em memória para testes
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base.metadata.create_all(bind=engine)
+
+
+def override_get_db():
+    """Override da dependência get_db para usar banco de testes."""
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+client = TestClient(app)
+
+
+@contextmanager
+def count_queries():
+    """Coleta as instruções SQL executadas no banco de testes dentro do bloco."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """Falha se o bloco executar mais instruções SQL do que o orçamento."""
+    with count_queries() as statements:
+        yield statements
+    assert len(statements) <= budget, (
+        f"{len(statements)} consultas executadas (orçamento: {budget}):\n"
+        + "\n".join(statements)
+    )
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    """Setup do banco de dados para cada teste."""
+    Base.metadata.create_all(bind=engine)
+    # Os IDs se repetem entre testes: o cache de referência não pode sobreviver ao banco
+    reference_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def create_test_data():
+    """Cria dados de teste."""
+    db = TestingSessionLocal(expire_on_commit=False)
+    
+    # Criar categoria
+    category = Category(name="Eletrônicos", description="Produtos eletrônicos")
+    db.add(category)
+    db.flush()
+    
+    # Criar produto
+    product = Product(
+        name="Notebook",
+        description="Notebook de 15 polegadas",
+        cost_price=2000.0,
+        sale_price=3000.0,
+        active=True,
+        category_id=category.id,
+    )
+    db.add(product)
+    db.flush()
+    
+    # Criar segundo produto
+    product2 = Product(
+        name="Mouse",
+        description="Mouse sem fio",
+        cost_price=50.0,
+        sale_price=100.0,
+        active=True,
+        category_id=category.id,
+    )
+    db.add(product2)
+    db.flush()
+    
+    # Criar fornecedor
+    supplier = Supplier(
+        name="Tech Supplies",
+        cnpj="12.345.678/0001-00",
+        contact_info="contato@techsupplies.com",
+    )
+    db.add(supplier)
+    db.flush()
+    
+    # Criar lojas
+    store1 = Store(name="Loja Centro", address="Rua A, 100")
+    store2 = Store(name="Loja Zona Leste", address="Rua B, 200")
+    db.add(store1)
+    db.add(store2)
+    db.flush()
+    
+    # Criar cliente
+    client_obj = Client(
+        name="João Silva",
+        cpf_cnpj="123.456.789-00",
+        email="joao@example.com",
+        phone="11999999999",
+    )
+    db.add(client_obj)
+    db.flush()
+    
+    db.commit()
+    
+    return {
+        "category": category,
+        "product": product,
+        "product2": product2,
+        "supplier": supplier,
+        "store1": store1,
+        "store2": store2,
+        "client": client_obj,
+    }
@@ -0,0 +1,138 @@
+"""
+Testes da pilha assíncrona (ASYNC_DB=true).
+
+Os routers adaptados com make_async_router recebem uma AsyncSession sobre
+aiosqlite, apontando para um arquivo SQLite temporário compartilhado com uma
+sessão síncrona usada para preparar e conferir os dados.
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.async_router import make_async_router
+from app.db.database import Base, get_async_db, get_db
+from app.models import Category, Product, Store, StockStore
+from app.routers import movements, products, stock
+from app.services.async_stock_service import AsyncStockService
+
+
+@pytest.fixture
+def async_stack(tmp_path):
+    """App com routers async e dados iniciais em um SQLite em arquivo."""
+    database = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(bind=sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine, expire_on_commit=False)
+
+    db = SyncSession()
+    category = Category(name="Eletrônicos")
+    db.add(category)
+    db.flush()
+    product = Product(name="Notebook", cost_price=2000.0, sale_price=3000.0, category_id=category.id)
+    store = Store(name="Loja Centro")
+    db.add_all([product, store])
+    db.commit()
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    AsyncSession = async_sessionmaker(bind=async_engine, autoflush=False)
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    def unused_get_db():
+        raise AssertionError("rota async não deve usar a sessão síncrona")
+        yield
+
+    app = FastAPI()
+    for router in (products.router, stock.router, movements.router):
+        app.include_router(make_async_router(router))
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = unused_get_db
+
+    with TestClient(app) as test_client:
+        yield {
+            "client": test_client,
+            "session": SyncSession,
+            "async_session": AsyncSession,
+            "product": product,
+            "store": store,
+        }
+
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+
+def test_async_router_endpoints_are_coroutines(async_stack):
+    """Testa que as rotas adaptadas são async, exceto as exportações em streaming."""
+    app = async_stack["client"].app
+    endpoints = {route.path: route.endpoint for route in app.routes if hasattr(route, "methods")}
+
+    assert asyncio.iscoroutinefunction(endpoints["/products"])
+    assert asyncio.iscoroutinefunction(endpoints["/stock/{stock_id}"])
+    assert not asyncio.iscoroutinefunction(endpoints["/products/all"])
+
+
+def test_async_stack_crud_and_pagination(async_stack):
+    """Testa leitura, escrita e cabeçalho de cursor pela pilha async."""
+    client = async_stack["client"]
+
+    response = client.post("/products", json={
+        "name": "Mouse", "cost_price": 50.0, "sale_price": 100.0,
+    })
+    assert response.status_code == 201
+    assert response.json()["name"] == "Mouse"
+
+    response = client.get("/products", params={"limit": 1})
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Notebook"]
+    assert response.headers["X-Next-Cursor"]
+
+    assert client.get("/products/999").status_code == 404
+
+
+def test_async_stock_service_register_movement(async_stack):
+    """Testa o AsyncStockService atualizando saldo e ledger via run_sync."""
+    product = async_stack["product"]
+    store = async_stack["store"]
+
+    async def run():
+        async with async_stack["async_session"]() as db:
+            await AsyncStockService.register_movement(db, product.id, store.id, "entry", 7)
+            await AsyncStockService.register_movement(db, product.id, store.id, "sale", 2)
+            await db.commit()
+            quantity = await AsyncStockService.get_stock_by_store_and_product(db, store.id, product.id)
+            enough = await AsyncStockService.validate_stock_availability(db, store.id, product.id, 6)
+            return quantity, enough
+
+    assert asyncio.run(run()) == (5, False)
+
+    db = async_stack["session"]()
+    assert db.query(StockStore).one().quantity == 5
+    db.close()
+
+    response = async_stack["client"].get("/movements", params={"product_id": product.id})
+    assert [m["movement_type"] for m in response.json()] == ["sale", "entry"]
+
+
+def test_async_stock_availability_excludes_reserved(async_stack):
+    """Testa que a validação assíncrona desconta as unidades reservadas."""
+    product = async_stack["product"]
+    store = async_stack["store"]
+    db = async_stack["session"]()
+    db.add(StockStore(store_id=store.id, product_id=product.id, quantity=5, reserved=3))
+    db.commit()
+    db.close()
+
+    async def run():
+        async with async_stack["async_session"]() as db:
+            return [
+                await AsyncStockService.validate_stock_availability(db, store.id, product.id, quantity)
+                for quantity in (2, 3)
+            ]
+
+    assert asyncio.run(run()) == [True, False]
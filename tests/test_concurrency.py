@@ -0,0 +1,138 @@
+"""
+Teste de estresse de concorrência no caminho de venda.
+
+Vários threads vendem o mesmo produto (SKU "quente") ao mesmo tempo. O teste
+valida que o estoque nunca fica negativo e que o saldo final bate com o
+livro-razão de movimentações.
+
+Por padrão usa um SQLite em arquivo com BEGIN IMMEDIATE (o SQLite não tem
+bloqueio por linha, então a transação inteira é serializada). Defina
+TEST_DATABASE_URL para rodar contra um PostgreSQL de verdade, onde o
+SELECT ... FOR UPDATE é exercitado.
+"""
+import os
+import threading
+import pytest
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base
+from app.models import (
+    Client, Product, Store, Sale, SaleItem, StockStore, StockMovement
+)
+from app.services.sales_service import SalesService
+from app.services.stock_service import InsufficientStockError
+
+THREADS = 16
+ATTEMPTS_PER_THREAD = 10
+INITIAL_STOCK = 100
+
+
+@pytest.fixture
+def stress_engine(tmp_path):
+    """Engine isolado com conexões independentes por thread."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        engine = create_engine(url, pool_size=THREADS)
+    else:
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'stress.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=THREADS,
+        )
+
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def test_concurrent_sales_never_oversell(stress_engine):
+    """Testa vendas concorrentes do mesmo produto contra o livro-razão."""
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=stress_engine)
+
+    db = Session()
+    store = Store(name="Loja Centro")
+    product = Product(name="SKU Quente", cost_price=1.0, sale_price=2.0)
+    client_obj = Client(name="Cliente", cpf_cnpj="000", email="c@example.com")
+    db.add_all([store, product, client_obj])
+    db.flush()
+    db.add(StockStore(store_id=store.id, product_id=product.id, quantity=INITIAL_STOCK))
+    db.commit()
+    store_id, product_id, client_id = store.id, product.id, client_obj.id
+    db.close()
+
+    results = {"sold": 0, "rejected": 0, "errors": []}
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker():
+        barrier.wait()
+        for _ in range(ATTEMPTS_PER_THREAD):
+            session = Session()
+            try:
+                sale = Sale(client_id=client_id, store_id=store_id)
+                session.add(sale)
+                session.flush()
+                session.add(SaleItem(
+                    sale_id=sale.id, product_id=product_id, quantity=1, unit_price=2.0,
+                ))
+                session.flush()
+                SalesService.register_sale_movements(session, sale.id)
+                session.commit()
+                outcome = "sold"
+            except InsufficientStockError:
+                session.rollback()
+                outcome = "rejected"
+            except Exception as e:
+                session.rollback()
+                with lock:
+                    results["errors"].append(e)
+                continue
+            finally:
+                session.close()
+            with lock:
+                results[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["errors"] == []
+    assert results["sold"] == INITIAL_STOCK
+    assert results["rejected"] == THREADS * ATTEMPTS_PER_THREAD - INITIAL_STOCK
+
+    db = Session()
+    stock = db.query(StockStore).filter(
+        StockStore.store_id == store_id,
+        StockStore.product_id == product_id,
+    ).one()
+    movements = db.query(StockMovement).filter(
+        StockMovement.store_id == store_id,
+        StockMovement.product_id == product_id,
+    ).all()
+    sold_in_ledger = db.query(func.sum(StockMovement.quantity)).filter(
+        StockMovement.movement_type == "sale",
+    ).scalar()
+
+    # Saldo final igual ao saldo inicial menos o livro-razão
+    assert stock.quantity == 0
+    assert stock.quantity == INITIAL_STOCK - sold_in_ledger
+
+    # Cada movimentação encadeia um stock_before distinto, sem saldo negativo
+    befores = sorted(m.stock_before for m in movements)
+    assert befores == list(range(1, INITIAL_STOCK + 1))
+    assert all(m.stock_after == m.stock_before - 1 for m in movements)
+    assert db.query(Sale).count() == INITIAL_STOCK
+
+    db.close()
@@ -0,0 +1,98 @@
+"""
+Testes de ETag e GET condicional (If-None-Match) em /products, /stock e /stores/{id}.
+"""
+from app.core.etag import etag_matches
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client, count_queries
+
+
+def _revalidate(url, etag):
+    with count_queries() as statements:
+        response = client.get(url, headers={"If-None-Match": etag})
+    return response, statements
+
+
+def test_products_not_modified_until_write(create_test_data):
+    """Testa 304 sem executar a listagem e novo ETag após escrita."""
+    response = client.get("/products?limit=5")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    response, statements = _revalidate("/products?limit=5", etag)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1 and "table_versions" in statements[0]
+
+    # Outros parâmetros, outro ETag
+    assert client.get("/products?limit=6").headers["ETag"] != etag
+
+    client.put(f"/products/{create_test_data['product'].id}", json={"sale_price": 3500.0})
+    response, _ = _revalidate("/products?limit=5", etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    etag = response.headers["ETag"]
+    client.post("/products/import", content=b"name,cost_price,sale_price\nTeclado,80,150\n")
+    assert _revalidate("/products?limit=5", etag)[0].status_code == 200
+
+
+def test_stock_etag_follows_movements(create_test_data):
+    """Testa que movimentações e reservas mudam o ETag de /stock, e um rollback não."""
+    data = create_test_data
+    url = f"/stock?store_id={data['store1'].id}"
+    client.post(f"/entries?store_id={data['store1'].id}", json={
+        "supplier_id": data["supplier"].id,
+        "items": [{"product_id": data["product"].id, "quantity": 5, "unit_price": 10.0}],
+    })
+    etag = client.get(url).headers["ETag"]
+    response, statements = _revalidate(url, etag)
+    assert response.status_code == 304
+    assert len(statements) == 1 and "table_versions" in statements[0]
+
+    client.post(f"/entries?store_id={data['store1'].id}", json={
+        "supplier_id": data["supplier"].id,
+        "items": [{"product_id": data["product"].id, "quantity": 1, "unit_price": 10.0}],
+    })
+    response, _ = _revalidate(url, etag)
+    assert response.status_code == 200
+    assert response.json()[0]["quantity"] == 6
+
+    # Transação desfeita não muda a versão
+    etag = response.headers["ETag"]
+    db = TestingSessionLocal()
+    StockService.register_movement(db, data["product"].id, data["store1"].id, "entry", 1)
+    db.rollback()
+    db.close()
+    assert _revalidate(url, etag)[0].status_code == 304
+
+    # Reserva altera só stock_store.reserved
+    client.post("/sales", params={"reserve": True}, json={
+        "client_id": data["client"].id,
+        "store_id": data["store1"].id,
+        "items": [{"product_id": data["product"].id, "quantity": 2, "unit_price": 3000.0}],
+    })
+    response, _ = _revalidate(url, etag)
+    assert response.status_code == 200
+    assert response.json()[0]["reserved"] == 2
+
+
+def test_store_etag(create_test_data):
+    """Testa 304 em /stores/{id} e invalidação pela atualização da loja."""
+    store_id = create_test_data["store1"].id
+    etag = client.get(f"/stores/{store_id}").headers["ETag"]
+    assert _revalidate(f"/stores/{store_id}", etag)[0].status_code == 304
+
+    client.put(f"/stores/{store_id}", json={"address": "Rua C, 300"})
+    response, _ = _revalidate(f"/stores/{store_id}", etag)
+    assert response.status_code == 200
+    assert response.json()["address"] == "Rua C, 300"
+
+
+def test_etag_matching():
+    """Testa a comparação fraca de If-None-Match."""
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('W/"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
@@ -0,0 +1,72 @@
+"""
+Testes para a exportação em streaming das rotas /all.
+"""
+import csv
+import io
+import json
+from app.models import StockMovement
+from app.core import export
+from .conftest import TestingSessionLocal, client
+
+
+def _create_movements(data, count):
+    db = TestingSessionLocal()
+    for i in range(count):
+        db.add(StockMovement(
+            product_id=data["product"].id,
+            store_id=data["store1"].id,
+            movement_type="entry",
+            quantity=i + 1,
+        ))
+    db.commit()
+    db.close()
+
+
+def test_export_json_default_spans_chunks(create_test_data, monkeypatch):
+    """Testa que o formato padrão continua sendo um array JSON completo."""
+    monkeypatch.setattr(export, "EXPORT_CHUNK_SIZE", 3)
+    _create_movements(create_test_data, 10)
+
+    response = client.get("/movements/all")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/json")
+    movements = response.json()
+    assert len(movements) == 10
+    assert sorted(m["quantity"] for m in movements) == list(range(1, 11))
+
+
+def test_export_ndjson(create_test_data, monkeypatch):
+    """Testa exportação NDJSON, um registro por linha."""
+    monkeypatch.setattr(export, "EXPORT_CHUNK_SIZE", 4)
+    _create_movements(create_test_data, 10)
+
+    response = client.get("/movements/all", params={"format": "ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 10
+    assert all(json.loads(line)["movement_type"] == "entry" for line in lines)
+
+
+def test_export_csv_skips_nested_fields(create_test_data):
+    """Testa exportação CSV com cabeçalho e sem campos aninhados."""
+    response = client.get("/products/all", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == ["Notebook", "Mouse"]
+
+    sales = client.get("/sales/all", params={"format": "csv"})
+    header = sales.text.splitlines()[0].split(",")
+    assert "items" not in header
+    assert "store_id" in header
+
+
+def test_export_empty_json():
+    """Testa exportação sem registros."""
+    response = client.get("/carriers/all")
+    assert response.status_code == 200
+    assert response.json() == []
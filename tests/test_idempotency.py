@@ -0,0 +1,136 @@
+"""
+Testes do cabeçalho Idempotency-Key em POST /sales, /entries e /internal-distributions.
+"""
+from app.core.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAY_HEADER
+from app.models import Sale, StockMovement, StockStore
+from app.services.idempotency_service import IdempotencyService
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, assert_max_queries, client
+
+
+def _stock(data, product_key="product", store_key="store1"):
+    db = TestingSessionLocal()
+    quantity = StockService.get_stock_by_store_and_product(
+        db, data[store_key].id, data[product_key].id,
+    )
+    db.close()
+    return quantity
+
+
+def _seed_stock(data, quantity):
+    db = TestingSessionLocal()
+    StockService.register_movement(db, data["product"].id, data["store1"].id, "entry", quantity)
+    db.commit()
+    db.close()
+
+
+def _sale_payload(data, quantity=2):
+    return {
+        "client_id": data["client"].id,
+        "store_id": data["store1"].id,
+        "items": [{"product_id": data["product"].id, "quantity": quantity, "unit_price": 10.0}],
+    }
+
+
+def test_sale_retry_replays_response_without_stock_change(create_test_data):
+    """Testa que a repetição devolve a mesma venda e não baixa o estoque de novo."""
+    data = create_test_data
+    _seed_stock(data, 10)
+    headers = {IDEMPOTENCY_KEY_HEADER: "venda-123"}
+
+    first = client.post("/sales", json=_sale_payload(data), headers=headers)
+    assert first.status_code == 201
+    assert IDEMPOTENT_REPLAY_HEADER not in first.headers
+
+    # Uma única consulta indexada, nenhuma escrita
+    with assert_max_queries(1):
+        second = client.post("/sales", json=_sale_payload(data), headers=headers)
+    assert second.status_code == 201
+    assert second.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+    assert second.json() == first.json()
+
+    assert _stock(data) == 8
+    db = TestingSessionLocal()
+    assert db.query(Sale).count() == 1
+    assert db.query(StockMovement).filter(StockMovement.movement_type == "sale").count() == 1
+    db.close()
+
+
+def test_key_reused_with_different_body(create_test_data):
+    """Testa 422 quando a chave já foi usada com outro corpo."""
+    data = create_test_data
+    _seed_stock(data, 10)
+    headers = {IDEMPOTENCY_KEY_HEADER: "venda-456"}
+
+    assert client.post("/sales", json=_sale_payload(data, 2), headers=headers).status_code == 201
+    response = client.post("/sales", json=_sale_payload(data, 3), headers=headers)
+    assert response.status_code == 422
+    assert _stock(data) == 8
+
+
+def test_failed_request_is_not_stored(create_test_data):
+    """Testa que uma venda rejeitada pode ser repetida com a mesma chave."""
+    data = create_test_data
+    headers = {IDEMPOTENCY_KEY_HEADER: "venda-789"}
+
+    assert client.post("/sales", json=_sale_payload(data), headers=headers).status_code == 400
+    _seed_stock(data, 5)
+    assert client.post("/sales", json=_sale_payload(data), headers=headers).status_code == 201
+    assert _stock(data) == 3
+
+
+def test_entry_and_distribution_idempotency(create_test_data):
+    """Testa entradas (com store_id no hash) e distribuições."""
+    data = create_test_data
+    entry = {
+        "supplier_id": data["supplier"].id,
+        "items": [{"product_id": data["product"].id, "quantity": 10, "unit_price": 5.0}],
+    }
+    url = f"/entries?store_id={data['store1'].id}"
+    headers = {IDEMPOTENCY_KEY_HEADER: "entrada-1"}
+    assert client.post(url, json=entry, headers=headers).status_code == 201
+    assert client.post(url, json=entry, headers=headers).headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+    assert client.post(
+        f"/entries?store_id={data['store2'].id}", json=entry, headers=headers,
+    ).status_code == 422
+    assert _stock(data) == 10
+
+    distribution = {
+        "from_store_id": data["store1"].id,
+        "to_store_id": data["store2"].id,
+        "items": [{"product_id": data["product"].id, "quantity": 4}],
+    }
+    # A mesma chave em outra rota é independente
+    for _ in range(2):
+        response = client.post("/internal-distributions", json=distribution, headers=headers)
+        assert response.status_code == 201
+    assert _stock(data) == 6
+    assert _stock(data, store_key="store2") == 4
+
+
+def test_concurrent_duplicate_rolls_back_and_replays(create_test_data, monkeypatch):
+    """Testa a corrida em que outra requisição grava a chave depois da consulta."""
+    data = create_test_data
+    _seed_stock(data, 10)
+    headers = {IDEMPOTENCY_KEY_HEADER: "venda-corrida"}
+    first = client.post("/sales", json=_sale_payload(data), headers=headers)
+
+    # Simula a requisição concorrente: a consulta inicial ainda não vê a chave
+    real_find = IdempotencyService.find
+    calls = []
+
+    def racing_find(db, scope, key):
+        calls.append(key)
+        return None if len(calls) == 1 else real_find(db, scope, key)
+
+    monkeypatch.setattr(IdempotencyService, "find", staticmethod(racing_find))
+    second = client.post("/sales", json=_sale_payload(data), headers=headers)
+
+    assert len(calls) == 2
+    assert second.status_code == 201
+    assert second.json() == first.json()
+    assert _stock(data) == 8
+    db = TestingSessionLocal()
+    assert db.query(Sale).count() == 1
+    assert db.query(StockStore).count() == 1
+    db.close()
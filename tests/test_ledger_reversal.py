@@ -0,0 +1,105 @@
+"""
+Testes do estorno no razão ao cancelar ou deletar vendas, entradas e distribuições.
+"""
+from app.models import StockMovement, StockStore
+from .conftest import TestingSessionLocal, client, count_queries
+
+
+def _entry(data, quantity=10, products=("product",)):
+    response = client.post(f"/entries?store_id={data['store1'].id}", json={
+        "supplier_id": data["supplier"].id,
+        "invoice_number": "NF-001",
+        "items": [
+            {"product_id": data[product].id, "quantity": quantity, "unit_price": 200.0}
+            for product in products
+        ],
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _balances(data):
+    db = TestingSessionLocal()
+    balances = {
+        (row.store_id, row.product_id): row.quantity for row in db.query(StockStore)
+    }
+    db.close()
+    return balances
+
+
+def _ledger(reference_type, reference_id):
+    db = TestingSessionLocal()
+    movements = [
+        (m.store_id, m.movement_type, m.quantity, m.stock_before, m.stock_after)
+        for m in db.query(StockMovement).filter(
+            StockMovement.reference_type == reference_type,
+            StockMovement.reference_id == reference_id,
+        ).order_by(StockMovement.id)
+    ]
+    db.close()
+    return movements
+
+
+def test_cancel_distribution_posts_compensating_transfers(create_test_data):
+    """Testa o cancelamento de distribuição em um único lote e a idempotência do estorno."""
+    data = create_test_data
+    s1, s2 = data["store1"].id, data["store2"].id
+    _entry(data, products=("product", "product2"))
+    distribution_id = client.post("/internal-distributions", json={
+        "from_store_id": s1,
+        "to_store_id": s2,
+        "items": [
+            {"product_id": data["product"].id, "quantity": 4},
+            {"product_id": data["product2"].id, "quantity": 3},
+        ],
+    }).json()["id"]
+
+    with count_queries() as statements:
+        response = client.put(f"/internal-distributions/{distribution_id}", params={"status": "cancelled"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    # Os saldos afetados são bloqueados em uma única consulta
+    assert len([s for s in statements if s.lstrip().startswith("SELECT") and "FROM stock_store" in s]) == 1
+
+    assert _balances(data) == {
+        (s1, data["product"].id): 10, (s1, data["product2"].id): 10,
+        (s2, data["product"].id): 0, (s2, data["product2"].id): 0,
+    }
+    ledger = _ledger("distribution", distribution_id)
+    assert [m[1] for m in ledger] == ["transfer_out", "transfer_in"] * 2 + ["transfer_in"] * 2 + ["transfer_out"] * 2
+
+    # Cancelar de novo não gera movimentações; cancelada não volta a outro status
+    assert client.put(f"/internal-distributions/{distribution_id}", params={"status": "cancelled"}).status_code == 200
+    assert client.put(f"/internal-distributions/{distribution_id}", params={"status": "pending"}).status_code == 409
+    assert client.delete(f"/internal-distributions/{distribution_id}").status_code == 204
+    assert len(_ledger("distribution", distribution_id)) == 8
+
+
+def test_delete_sale_and_entry_restore_stock(create_test_data):
+    """Testa o estorno na exclusão de venda e de entrada, e a recusa sem estoque."""
+    data = create_test_data
+    s1, product_id = data["store1"].id, data["product"].id
+    entry_id = _entry(data)
+    sale_id = client.post("/sales", json={
+        "client_id": data["client"].id,
+        "store_id": s1,
+        "items": [{"product_id": product_id, "quantity": 6, "unit_price": 3000.0}],
+    }).json()["id"]
+
+    # A entrada não pode ser estornada enquanto as unidades vendidas faltam
+    assert client.delete(f"/entries/{entry_id}").status_code == 409
+    assert client.put(f"/entries/{entry_id}", params={"status": "cancelled"}).status_code == 409
+    assert _balances(data) == {(s1, product_id): 4}
+
+    assert client.delete(f"/sales/{sale_id}").status_code == 204
+    assert _ledger("sale", sale_id) == [
+        (s1, "sale", 6, 10, 4),
+        (s1, "adjustment_in", 6, 4, 10),
+    ]
+
+    assert client.delete(f"/entries/{entry_id}").status_code == 204
+    assert _ledger("entry", entry_id) == [
+        (s1, "entry", 10, 0, 10),
+        (s1, "adjustment_out", 10, 10, 0),
+    ]
+    assert _balances(data) == {(s1, product_id): 0}
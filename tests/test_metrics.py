@@ -0,0 +1,95 @@
+"""
+Testes das métricas Prometheus expostas em /metrics.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.core import metrics
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.registry.clear()
+    yield
+
+
+def _sample(body: str, prefix: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"amostra não encontrada: {prefix}")
+
+
+def test_request_latency_and_sql_per_route(create_test_data):
+    """Testa contagem, latência e SQL por requisição com rótulo do template da rota."""
+    product_id = create_test_data["product"].id
+    client.get(f"/products/{product_id}")
+    client.get(f"/products/{product_id}")
+    client.get("/nao-existe")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    assert _sample(
+        body, 'systock_http_requests_total{method="GET",route="/products/{product_id}",status="200"}',
+    ) == 2
+    assert _sample(
+        body, 'systock_http_request_duration_seconds_count{method="GET",route="/products/{product_id}"}',
+    ) == 2
+    assert _sample(
+        body, 'systock_http_request_db_statements_sum{method="GET",route="/products/{product_id}"}',
+    ) == 2
+    assert _sample(
+        body, 'systock_http_requests_total{method="GET",route="unmatched",status="404"}',
+    ) == 1
+    # A requisição a /metrics ainda está em andamento quando é renderizada
+    assert _sample(body, 'systock_http_requests_in_flight{method="GET"}') == 1
+    assert "# TYPE systock_http_request_duration_seconds histogram" in body
+
+
+def test_stock_movement_throughput(create_test_data):
+    """Testa o contador de movimentações confirmadas por tipo."""
+    data = create_test_data
+    response = client.post(f"/entries?store_id={data['store1'].id}", json={
+        "supplier_id": data["supplier"].id,
+        "items": [
+            {"product_id": data["product"].id, "quantity": 5, "unit_price": 10.0},
+            {"product_id": data["product2"].id, "quantity": 3, "unit_price": 10.0},
+        ],
+    })
+    assert response.status_code == 201
+
+    # Lote desfeito não conta como throughput
+    db = TestingSessionLocal()
+    StockService.register_movement(db, data["product"].id, data["store1"].id, "sale", 1)
+    db.rollback()
+    db.close()
+
+    body = client.get("/metrics").text
+    assert _sample(body, 'systock_stock_movements_total{movement_type="entry"}') == 2
+    assert 'systock_stock_movements_total{movement_type="sale"}' not in body
+    assert _sample(body, "systock_stock_movement_batches_total") == 1
+    assert _sample(body, 'systock_http_request_db_statements_count{method="POST",route="/entries"}') == 1
+    assert 'systock_db_pool_checkouts_total{engine="sync"}' in body
+
+
+def test_failed_statement_is_timed_once(create_test_data):
+    """Testa que uma instrução que falha é contada e não desalinha as medições seguintes."""
+    stats = metrics.RequestDbStats()
+    token = metrics.current_request_db_stats.set(stats)
+    db = TestingSessionLocal()
+    try:
+        with pytest.raises(OperationalError):
+            db.execute(text("SELECT * FROM tabela_inexistente"))
+        db.rollback()
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+        metrics.current_request_db_stats.reset(token)
+
+    assert stats.statements == 2
+    assert 0 < stats.seconds < 1
@@ -0,0 +1,119 @@
+"""
+Testes do arquivamento de meses de movimentações e da leitura dos arquivos.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+import pytest
+from app.models import StockMovement, StockMovementArchive
+from app.services.movement_archive_service import MovementArchiveService
+from app.services.reconciliation_service import ReconciliationService
+from app.services.snapshot_service import StockSnapshotService
+from app.services.stock_service import ArchivedMovementsError, StockService
+from .conftest import TestingSessionLocal, client
+
+
+def _movements_in_january(data) -> list[int]:
+    """Lança 3 movimentações e as data em janeiro de 2025."""
+    s1, p1, p2 = data["store1"].id, data["product"].id, data["product2"].id
+    db = TestingSessionLocal()
+    movements = StockService.register_movements(db, [
+        {"product_id": p1, "store_id": s1, "movement_type": "entry", "quantity": 10,
+         "reference_type": "entry", "reference_id": 1},
+        {"product_id": p1, "store_id": s1, "movement_type": "sale", "quantity": 4},
+        {"product_id": p2, "store_id": s1, "movement_type": "entry", "quantity": 6},
+    ])
+    ids = [movement.id for movement in movements]
+    for day, movement_id in enumerate(ids, start=10):
+        db.query(StockMovement).filter(StockMovement.id == movement_id).update(
+            {"movement_date": datetime(2025, 1, day)}
+        )
+    # Movimentação do mês seguinte, que não é arquivada
+    StockService.register_movements(db, [
+        {"product_id": p2, "store_id": s1, "movement_type": "sale", "quantity": 1},
+    ])
+    db.commit()
+    db.close()
+    return ids
+
+
+def test_archive_month_moves_rows_to_file(create_test_data, tmp_path):
+    """Testa o arquivo gerado, a remoção das linhas e a reconciliação com o mês arquivado."""
+    ids = _movements_in_january(create_test_data)
+    db = TestingSessionLocal()
+
+    # Sem fotografia que cubra o mês, /stock/as-of perderia as linhas arquivadas
+    with pytest.raises(ValueError):
+        MovementArchiveService.archive_month(db, datetime(2025, 1, 20), str(tmp_path))
+    db.rollback()
+    snapshot = StockSnapshotService.take_snapshot(db)
+    db.commit()
+
+    archive = MovementArchiveService.archive_month(db, datetime(2025, 1, 20), str(tmp_path))
+    db.commit()
+
+    assert archive.period_start == datetime(2025, 1, 1)
+    assert archive.period_end == datetime(2025, 2, 1)
+    assert (archive.row_count, archive.min_movement_id, archive.max_movement_id) == (3, ids[0], ids[-1])
+    assert archive.sha256 == MovementArchiveService.file_sha256(archive.path)
+    with gzip.open(archive.path, "rt", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["id"] for record in records] == ids
+    assert records[1]["movement_type"] == "sale"
+    assert records[0]["movement_date"] == "2025-01-10T00:00:00"
+
+    assert db.query(StockMovement).filter(StockMovement.id.in_(ids)).count() == 0
+    assert db.query(StockMovement).count() == 1
+    # Os totais do mês arquivado entram no saldo esperado
+    assert ReconciliationService.reconcile(db)["drift"] == []
+    # O estorno de um documento com movimentações arquivadas é recusado
+    with pytest.raises(ArchivedMovementsError):
+        StockService.reverse_reference(db, "entry", 1)
+    db.rollback()
+
+    # /stock/as-of: a partir da fotografia funciona; antes dela, dependeria do mês arquivado
+    params = {"store_id": create_test_data["store1"].id, "product_id": create_test_data["product"].id}
+    response = client.get("/stock/as-of", params={"date": snapshot.taken_at.isoformat(), **params})
+    assert response.json()[0]["quantity"] == 6
+    response = client.get("/stock/as-of", params={"date": "2025-01-31T00:00:00", **params})
+    assert response.status_code == 409
+
+    with pytest.raises(ValueError):
+        MovementArchiveService.archive_month(db, datetime(2025, 1, 1), str(tmp_path))
+    with pytest.raises(ValueError):
+        MovementArchiveService.archive_month(db, datetime.utcnow(), str(tmp_path))
+    db.close()
+
+
+def test_archived_movements_endpoint(create_test_data, tmp_path):
+    """Testa GET /movements/archived: filtros, período, formatos e arquivo ausente."""
+    ids = _movements_in_january(create_test_data)
+    product_id = create_test_data["product"].id
+    db = TestingSessionLocal()
+    StockSnapshotService.take_snapshot(db)
+    MovementArchiveService.archive_month(db, datetime(2025, 1, 1), str(tmp_path))
+    db.commit()
+
+    response = client.get("/movements/archived", params={"date_from": "2025-01-01T00:00:00"})
+    assert response.status_code == 200
+    assert [movement["id"] for movement in response.json()] == ids
+
+    response = client.get("/movements/archived", params={
+        "date_from": "2025-01-11T00:00:00",
+        "date_to": "2025-01-31T00:00:00",
+        "product_id": product_id,
+    })
+    assert [movement["id"] for movement in response.json()] == [ids[1]]
+
+    # Período sem meses arquivados
+    response = client.get("/movements/archived", params={"date_from": "2025-03-01T00:00:00"})
+    assert response.json() == []
+
+    response = client.get("/movements/archived", params={"format": "ndjson", "movement_type": "entry"})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [ids[0], ids[2]]
+
+    path = db.query(StockMovementArchive.path).scalar()
+    db.close()
+    os.remove(path)
+    assert client.get("/movements/archived").status_code == 404
@@ -0,0 +1,108 @@
+"""
+Testes do outbox transacional de movimentações de estoque.
+"""
+import json
+import httpx
+import pytest
+from app.core.config import settings
+from app.models import OutboxEvent
+from app.services.outbox_service import FileSink, HttpSink, OutboxService
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def outbox_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_enabled", True)
+
+
+def _movements(data, *stores, movement_type="entry"):
+    return [
+        {"product_id": data["product"].id, "store_id": data[store].id,
+         "movement_type": movement_type, "quantity": 1}
+        for store in stores
+    ]
+
+
+def test_sequences_per_store_written_with_movements(create_test_data):
+    """Testa sequências contíguas por loja e descarte junto com o rollback."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    StockService.register_movements(db, _movements(data, "store1", "store2", "store1"))
+    db.commit()
+
+    StockService.register_movements(db, _movements(data, "store1"))
+    db.rollback()
+
+    StockService.register_movements(db, _movements(data, "store1", "store2"))
+    db.commit()
+
+    rows = [
+        (row.store_id, row.sequence)
+        for row in db.query(OutboxEvent).order_by(OutboxEvent.id)
+    ]
+    db.close()
+    store1, store2 = data["store1"].id, data["store2"].id
+    assert rows == [(store1, 1), (store2, 1), (store1, 2), (store1, 3), (store2, 2)]
+
+
+def test_dispatch_to_file_sink(create_test_data, tmp_path):
+    """Testa entrega em lotes, ordem e marcação das linhas entregues."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    StockService.register_movements(db, _movements(data, "store1", "store1", "store2"))
+    db.commit()
+
+    path = tmp_path / "movements.ndjson"
+    sink = FileSink(str(path))
+    assert OutboxService.dispatch_batch(db, sink, limit=2) == 2
+    assert OutboxService.dispatch_batch(db, sink, limit=2) == 1
+    assert OutboxService.dispatch_batch(db, sink, limit=2) == 0
+    assert db.query(OutboxEvent).filter(OutboxEvent.dispatched_at.is_(None)).count() == 0
+    db.close()
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e["store_id"], e["sequence"]) for e in events] == [
+        (data["store1"].id, 1), (data["store1"].id, 2), (data["store2"].id, 1),
+    ]
+    assert events[1]["stock_before"] == 1 and events[1]["stock_after"] == 2
+    assert events[0]["movement_type"] == "entry"
+
+
+def test_failed_delivery_is_retried(create_test_data):
+    """Testa que uma falha do sink mantém o lote pendente (at-least-once)."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    StockService.register_movements(db, _movements(data, "store1", "store2"))
+    db.commit()
+
+    received = []
+
+    def handler(request):
+        if not received:
+            received.append(None)
+            return httpx.Response(503)
+        received.append(json.loads(request.content))
+        return httpx.Response(204)
+
+    sink = HttpSink("http://downstream.local/events", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    with pytest.raises(httpx.HTTPStatusError):
+        OutboxService.dispatch_batch(db, sink)
+    pending = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [(e.attempts, e.dispatched_at) for e in pending] == [(1, None), (1, None)]
+    assert "503" in pending[0].last_error
+
+    assert OutboxService.dispatch_batch(db, sink) == 2
+    assert [e["sequence"] for e in received[1]["events"]] == [1, 1]
+    assert db.query(OutboxEvent).filter(OutboxEvent.dispatched_at.is_(None)).count() == 0
+    db.close()
+
+
+def test_outbox_disabled(create_test_data, monkeypatch):
+    """Testa que nada é gravado com OUTBOX_ENABLED=false."""
+    monkeypatch.setattr(settings, "outbox_enabled", False)
+    db = TestingSessionLocal()
+    StockService.register_movements(db, _movements(create_test_data, "store1"))
+    db.commit()
+    assert db.query(OutboxEvent).count() == 0
+    db.close()
@@ -0,0 +1,108 @@
+"""
+Testes para a paginação por cursor (keyset) das rotas de listagem.
+"""
+from datetime import datetime, timedelta
+from app.models import Store, StockMovement
+from .conftest import TestingSessionLocal, client, count_queries
+
+
+def _create_movements(data, count, start=datetime(2025, 1, 1)):
+    db = TestingSessionLocal()
+    for i in range(count):
+        db.add(StockMovement(
+            product_id=data["product"].id,
+            store_id=data["store1"].id,
+            movement_type="entry",
+            quantity=1,
+            # Datas repetidas de dois em dois para exercitar o desempate por id
+            movement_date=start + timedelta(minutes=i // 2),
+        ))
+    db.commit()
+    db.close()
+
+
+def test_movements_cursor_walks_all_pages(create_test_data):
+    """Testa que o cursor percorre todas as movimentações sem repetir nem pular."""
+    _create_movements(create_test_data, 25)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/movements", params=params)
+        assert response.status_code == 200
+        seen.extend(m["id"] for m in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+    # Mesma ordem da listagem legada (movement_date desc, id desc)
+    db = TestingSessionLocal()
+    expected = [m.id for m in db.query(StockMovement).order_by(
+        StockMovement.movement_date.desc(), StockMovement.id.desc()
+    )]
+    db.close()
+    assert seen == expected
+
+
+def test_movements_cursor_stable_under_inserts(create_test_data):
+    """Testa que novas movimentações não deslocam a página seguinte."""
+    _create_movements(create_test_data, 20)
+
+    first = client.get("/movements", params={"limit": 10})
+    cursor = first.headers["X-Next-Cursor"]
+    expected_next = client.get("/movements", params={"limit": 10, "cursor": cursor}).json()
+
+    # Inserções mais recentes entram no topo e não afetam o cursor
+    _create_movements(create_test_data, 5, start=datetime(2026, 1, 1))
+    after_insert = client.get("/movements", params={"limit": 10, "cursor": cursor}).json()
+
+    assert after_insert == expected_next
+
+
+def test_list_cursor_and_legacy_skip(create_test_data):
+    """Testa cursor por id e compatibilidade do parâmetro skip."""
+    db = TestingSessionLocal()
+    for i in range(5):
+        db.add(Store(name=f"Loja {i}"))
+    db.commit()
+    db.close()
+
+    first = client.get("/stores", params={"limit": 3})
+    second = client.get("/stores", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    third = client.get("/stores", params={"limit": 3, "cursor": second.headers["X-Next-Cursor"]})
+    legacy = client.get("/stores", params={"limit": 3, "skip": 3})
+
+    # 2 lojas do fixture + 5 criadas
+    ids = [s["id"] for s in first.json() + second.json() + third.json()]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 7
+    assert second.json() == legacy.json()
+    assert "X-Next-Cursor" not in third.headers
+
+
+def test_invalid_cursor_returns_400():
+    """Testa rejeição de cursor malformado."""
+    response = client.get("/products", params={"cursor": "nao-e-um-cursor"})
+    assert response.status_code == 400
+
+
+def test_movements_page_uses_date_index(create_test_data):
+    """Testa que a página sem filtros de /movements lê o índice (movement_date, id) sem ordenar o razão."""
+    _create_movements(create_test_data, 3)
+    with count_queries() as statements:
+        assert client.get("/movements", params={"limit": 2}).status_code == 200
+    listing = next(statement for statement in statements if "FROM stock_movements" in statement)
+
+    db = TestingSessionLocal()
+    plan = " ".join(
+        row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {listing}", (0,) * listing.count("?"))
+    )
+    db.close()
+    assert "ix_stock_movements_date_id" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,73 @@
+"""
+Testes da configuração do pool de conexões e das métricas do pool.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.core.config import settings
+from app.db.database import engine_options
+from app.db.pool_metrics import InstrumentedQueuePool, PoolMetrics, instrument_pool
+from .conftest import client
+
+
+def test_engine_options_postgres(monkeypatch):
+    """Testa que pool e statement_timeout vêm das configurações."""
+    monkeypatch.setattr(settings, "db_pool_size", 20)
+    monkeypatch.setattr(settings, "db_max_overflow", 5)
+    monkeypatch.setattr(settings, "db_pool_timeout", 2.5)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 1500)
+
+    options = engine_options("postgresql+psycopg2://user:pass@db/systock")
+    assert options["echo"] is False
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 5
+    assert options["pool_timeout"] == 2.5
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+    async_options = engine_options("postgresql+asyncpg://user:pass@db/systock", async_driver=True)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+
+    assert "pool_size" not in engine_options("sqlite://")
+
+
+def test_pool_metrics_count_checkouts_and_timeouts(tmp_path):
+    """Testa contadores de checkout, espera e timeout com um pool de uma conexão."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = PoolMetrics()
+    instrument_pool(engine.pool, metrics)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot["checked_out"] == 1
+
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 1
+    assert snapshot["checkins"] == 1
+    assert snapshot["connects"] == 1
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_seconds_max"] >= 0.05
+    assert snapshot["size"] == 1
+
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert metrics.snapshot(engine.pool)["checkouts"] == 2
+
+
+def test_pool_metrics_endpoint():
+    """Testa o endpoint de métricas do pool."""
+    response = client.get("/metrics/pool")
+    assert response.status_code == 200
+    body = response.json()
+    assert "checkouts" in body["sync"]
+    assert "pid" in body["sync"]
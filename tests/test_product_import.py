@@ -0,0 +1,148 @@
+"""
+Testes para POST /products/import (importação de produtos em massa).
+"""
+import json
+from datetime import date
+from app.models import Product, StockMovement, StockStore
+from app.services import product_import_service
+from .conftest import TestingSessionLocal, client
+
+
+CSV_FILE = (
+    "name,description,cost_price,sale_price,category,opening_quantity\n"
+    "Teclado,Teclado ABNT2,80,150,eletrônicos,10\n"
+    "Monitor,,700,1100,Eletrônicos,\n"
+    "Teclado,Duplicado,80,150,Eletrônicos,5\n"
+    "Webcam,,abc,200,Eletrônicos,\n"
+    "Cabo,,5,10,Cozinha,\n"
+)
+
+
+def _balance(store_id, product_id):
+    db = TestingSessionLocal()
+    stock = db.query(StockStore).filter(
+        StockStore.store_id == store_id, StockStore.product_id == product_id,
+    ).first()
+    db.close()
+    return stock.quantity if stock else 0
+
+
+def _product(name):
+    db = TestingSessionLocal()
+    product = db.query(Product).filter(Product.name == name).first()
+    db.close()
+    return product
+
+
+def test_csv_import_reports_errors_per_line(create_test_data):
+    """Testa criação, saldo inicial e erros por linha (duplicado, preço e categoria)."""
+    store_id = create_test_data["store1"].id
+    response = client.post(
+        f"/products/import?format=csv&store_id={store_id}",
+        content=CSV_FILE.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["total_rows"] == 5
+    assert report["created"] == 2
+    assert report["updated"] == 0
+    assert report["opening_balances"] == 1
+    assert report["failed"] == 3
+    assert [error["line"] for error in report["errors"]] == [4, 5, 6]
+    assert "linha 2" in report["errors"][0]["error"]
+    assert report["errors"][1]["error"].startswith("cost_price")
+    assert "Cozinha" in report["errors"][2]["error"]
+
+    keyboard = _product("Teclado")
+    assert keyboard.category_id == create_test_data["category"].id
+    assert _balance(store_id, keyboard.id) == 10
+
+
+def test_ndjson_import_updates_existing_products(create_test_data):
+    """Testa upsert pelo nome e linha JSON inválida."""
+    data = create_test_data
+    body = "\n".join([
+        json.dumps({"name": "Notebook", "cost_price": 2100, "sale_price": 3200,
+                    "category_id": data["category"].id}),
+        "{inválido",
+        json.dumps({"name": "Headset", "cost_price": 90, "sale_price": 180}),
+        "",
+    ])
+    response = client.post("/products/import?format=ndjson", content=body.encode())
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 1)
+    assert report["errors"][0]["line"] == 2
+
+    notebook = _product("Notebook")
+    assert notebook.id == data["product"].id
+    assert notebook.sale_price == 3200
+
+
+def test_reimport_sets_balance_without_duplicating(create_test_data):
+    """Testa que reimportar o arquivo leva o saldo ao valor informado, sem somar."""
+    store_id = create_test_data["store1"].id
+    product_id = create_test_data["product"].id
+    body = "name,cost_price,sale_price,opening_quantity\nNotebook,2000,3000,7\n".encode()
+
+    for _ in range(2):
+        response = client.post(f"/products/import?store_id={store_id}", content=body)
+        assert response.status_code == 200
+    assert _balance(store_id, product_id) == 7
+
+    body = "name,cost_price,sale_price,opening_quantity\nNotebook,2000,3000,4\n".encode()
+    assert client.post(f"/products/import?store_id={store_id}", content=body).json()["opening_balances"] == 1
+    assert _balance(store_id, product_id) == 4
+
+    db = TestingSessionLocal()
+    movements = db.query(StockMovement.movement_type, StockMovement.quantity).filter(
+        StockMovement.reference_type == "import",
+    ).order_by(StockMovement.id).all()
+    db.close()
+    assert movements == [("adjustment_in", 7), ("adjustment_out", 3)]
+
+
+def test_import_is_chunked(create_test_data, monkeypatch):
+    """Testa o processamento em blocos e o saldo inicial sem loja informada."""
+    monkeypatch.setattr(product_import_service, "IMPORT_CHUNK_SIZE", 2)
+    lines = ["name,cost_price,sale_price,opening_quantity"]
+    lines += [f"Produto {i},1,2," for i in range(5)]
+    lines.append("Produto 9,1,2,3")
+    response = client.post("/products/import", content="\n".join(lines).encode())
+    assert response.status_code == 200
+    report = response.json()
+    assert report["created"] == 5
+    assert report["errors"] == [
+        {"line": 7, "name": "Produto 9", "error": "store_id obrigatório para saldo inicial"},
+    ]
+
+
+def test_import_unknown_store(create_test_data):
+    """Testa loja inexistente."""
+    response = client.post("/products/import?store_id=9999", content=b"name,cost_price,sale_price\n")
+    assert response.status_code == 404
+
+
+def test_import_keeps_absent_fields(create_test_data):
+    """Testa que campos ausentes na linha não sobrescrevem o produto existente."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    db.query(Product).filter(Product.id == data["product"].id).update({
+        "description": "Notebook 16GB", "date_added": date(2025, 1, 2), "active": False,
+    })
+    db.commit()
+    db.close()
+
+    body = "name,description,cost_price,sale_price\nNotebook,,2100,3200\n"
+    assert client.post("/products/import", content=body.encode()).json()["updated"] == 1
+    notebook = _product("Notebook")
+    assert (notebook.description, notebook.date_added, notebook.active) == ("Notebook 16GB", date(2025, 1, 2), False)
+    assert notebook.category_id == data["category"].id
+    assert notebook.sale_price == 3200
+
+    body = json.dumps({"name": "Notebook", "cost_price": 2100, "sale_price": 3200,
+                       "active": True, "date_added": "2026-01-01"})
+    client.post("/products/import?format=ndjson", content=body.encode())
+    notebook = _product("Notebook")
+    assert (notebook.active, notebook.date_added) == (True, date(2025, 1, 2))
@@ -0,0 +1,90 @@
+"""
+Testes de orçamento de consultas SQL por rota de listagem.
+
+Detectam regressões N+1: com vários documentos e itens no banco, cada listagem
+deve executar um número fixo de consultas, independente da quantidade de linhas.
+"""
+import pytest
+from app.models import (
+    Carrier, Sale, SaleItem, ProductEntry, ProductEntryItem,
+    InternalDistribution, InternalDistributionItem, StockStore, StockMovement,
+)
+from .conftest import TestingSessionLocal, assert_max_queries, client
+
+# Cabeçalhos + uma consulta selectinload para os itens
+LIST_QUERY_BUDGET = 2
+DOCUMENTS = 5
+
+LIST_ENDPOINTS = [
+    "/clients",
+    "/categories",
+    "/products",
+    "/suppliers",
+    "/stores",
+    "/carriers",
+    "/stock",
+    "/movements",
+    "/entries",
+    "/internal-distributions",
+    "/sales",
+]
+
+
+@pytest.fixture
+def populated(create_test_data):
+    """Cria vários documentos com itens para expor carregamentos preguiçosos."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    product_ids = [data["product"].id, data["product2"].id]
+    for _ in range(DOCUMENTS):
+        sale = Sale(client_id=data["client"].id, store_id=data["store1"].id)
+        entry = ProductEntry(supplier_id=data["supplier"].id)
+        distribution = InternalDistribution(
+            from_store_id=data["store1"].id, to_store_id=data["store2"].id,
+        )
+        db.add_all([sale, entry, distribution])
+        db.flush()
+        for product_id in product_ids:
+            db.add(SaleItem(sale_id=sale.id, product_id=product_id, quantity=1, unit_price=1.0))
+            db.add(ProductEntryItem(
+                product_entry_id=entry.id, product_id=product_id, quantity=1, unit_price=1.0,
+            ))
+            db.add(InternalDistributionItem(
+                internal_distribution_id=distribution.id, product_id=product_id, quantity=1,
+            ))
+            db.add(StockMovement(
+                product_id=product_id, store_id=data["store1"].id,
+                movement_type="entry", quantity=1,
+            ))
+    db.add(Carrier(name="Transportadora"))
+    for product_id in product_ids:
+        db.add(StockStore(store_id=data["store1"].id, product_id=product_id, quantity=1))
+    db.commit()
+    db.close()
+    return data
+
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+def test_list_endpoint_query_budget(populated, path):
+    """Testa que cada listagem respeita o orçamento fixo de consultas."""
+    with assert_max_queries(LIST_QUERY_BUDGET):
+        response = client.get(path, params={"limit": 100})
+    assert response.status_code == 200
+    assert len(response.json()) > 0
+
+
+@pytest.mark.parametrize("path", ["/sales", "/entries", "/internal-distributions"])
+def test_document_items_are_eager_loaded(populated, path):
+    """Testa que os itens vêm na listagem e no detalhe sem N+1."""
+    with assert_max_queries(LIST_QUERY_BUDGET):
+        documents = client.get(path, params={"limit": 100}).json()
+    assert len(documents) == DOCUMENTS
+    assert all(len(document["items"]) == 2 for document in documents)
+
+    with assert_max_queries(LIST_QUERY_BUDGET):
+        detail = client.get(f"{path}/{documents[0]['id']}").json()
+    assert len(detail["items"]) == 2
+
+    with assert_max_queries(LIST_QUERY_BUDGET):
+        exported = client.get(f"{path}/all").json()
+    assert len(exported) == DOCUMENTS
@@ -0,0 +1,59 @@
+"""
+Testes da reconciliação entre o razão de movimentações e os saldos.
+"""
+from app.models import Product, StockMovement, StockStore
+from app.services.reconciliation_service import ReconciliationService
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal
+
+
+def test_reconcile_reports_and_repairs_drift(create_test_data):
+    """Testa a detecção por faixas e os ajustes que igualam o razão aos saldos."""
+    data = create_test_data
+    s1, s2 = data["store1"].id, data["store2"].id
+    p1, p2 = data["product"].id, data["product2"].id
+    db = TestingSessionLocal()
+    db.add(Product(name="Sem estoque", cost_price=1, sale_price=2))
+    StockService.register_movements(db, [
+        {"product_id": p1, "store_id": s1, "movement_type": "entry", "quantity": 10},
+        {"product_id": p1, "store_id": s2, "movement_type": "entry", "quantity": 5},
+        {"product_id": p2, "store_id": s1, "movement_type": "entry", "quantity": 8},
+    ])
+    # Saldo criado sem movimentação
+    db.add(StockStore(store_id=s2, product_id=p2, quantity=3))
+    db.commit()
+
+    # Alterações diretas de saldo, sem movimentação (cargas manuais no banco)
+    db.query(StockStore).filter(StockStore.store_id == s1, StockStore.product_id == p1).update({"quantity": 7})
+    db.query(StockStore).filter(StockStore.store_id == s2, StockStore.product_id == p1).delete()
+    db.commit()
+
+    result = ReconciliationService.reconcile(db, chunk_size=1)
+    assert result["chunks"] == 3
+    assert result["repaired"] == 0
+    assert result["drift"] == [
+        {"store_id": s1, "product_id": p1, "expected": 10, "actual": 7},
+        {"store_id": s2, "product_id": p1, "expected": 5, "actual": 0},
+        {"store_id": s2, "product_id": p2, "expected": 0, "actual": 3},
+    ]
+
+    result = ReconciliationService.reconcile(db, chunk_size=2, repair=True)
+    assert result["repaired"] == 3
+    assert ReconciliationService.reconcile(db)["drift"] == []
+
+    adjustments = [
+        (m.store_id, m.product_id, m.movement_type, m.quantity, m.stock_before, m.stock_after)
+        for m in db.query(StockMovement).filter(
+            StockMovement.reference_type == "reconciliation"
+        ).order_by(StockMovement.store_id, StockMovement.product_id)
+    ]
+    assert adjustments == [
+        (s1, p1, "adjustment_out", 3, 10, 7),
+        (s2, p1, "adjustment_out", 5, 5, 0),
+        (s2, p2, "adjustment_in", 3, 0, 3),
+    ]
+    # Os saldos não mudam
+    assert dict(
+        ((row.store_id, row.product_id), row.quantity) for row in db.query(StockStore)
+    ) == {(s1, p1): 7, (s1, p2): 8, (s2, p2): 3}
+    db.close()
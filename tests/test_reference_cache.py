@@ -0,0 +1,91 @@
+"""
+Testes do cache de dados de referência (TTL, LRU, invalidação e canal entre workers).
+"""
+import time
+from app.core.reference_cache import ReferenceDataCache, TTLCache, reference_cache
+from app.models import Store
+from .conftest import TestingSessionLocal, client, count_queries
+
+
+def test_get_is_served_from_cache_and_invalidated_on_update(create_test_data):
+    """Testa leitura sem SQL após a primeira e invalidação pelo PUT."""
+    store_id = create_test_data["store1"].id
+    assert client.get(f"/stores/{store_id}").json()["name"] == "Loja Centro"
+
+    with count_queries() as statements:
+        response = client.get(f"/stores/{store_id}")
+    assert response.json()["name"] == "Loja Centro"
+    # Apenas a versão da tabela, usada no ETag
+    assert len(statements) == 1 and "table_versions" in statements[0]
+
+    client.put(f"/stores/{store_id}", json={"name": "Loja Centro Novo"})
+    assert client.get(f"/stores/{store_id}").json()["name"] == "Loja Centro Novo"
+
+    client.delete(f"/stores/{store_id}")
+    assert client.get(f"/stores/{store_id}").status_code == 404
+
+    stats = client.get("/metrics/cache").json()["stores"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    body = client.get("/metrics").text
+    assert 'systock_reference_cache_requests_total{table="stores",result="hit"} 1' in body
+
+
+def test_get_many_queries_only_missing_ids(create_test_data):
+    """Testa que get_many consulta apenas os IDs fora do cache."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    reference_cache.get(db, Store, data["store1"].id)
+    with count_queries() as statements:
+        stores = reference_cache.get_many(db, Store, [data["store1"].id, data["store2"].id, 9999])
+    db.close()
+    assert set(stores) == {data["store1"].id, data["store2"].id}
+    assert len(statements) == 1
+
+
+def test_ttl_and_lru_eviction():
+    """Testa expiração por TTL e descarte do item menos usado."""
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1, cache.generation)
+    cache.set("b", 2, cache.generation)
+    assert cache.get("a") == 1          # "b" passa a ser o menos usado
+    cache.set("c", 3, cache.generation)
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("b") != 2
+    assert cache.get("a") == 1
+
+    now[0] = 11
+    assert cache.get("a") != 1
+    assert cache.stats()["entries"] == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 2)
+
+    # Leitura iniciada antes de uma invalidação não grava o valor antigo
+    generation = cache.generation
+    cache.invalidate(["c"])
+    cache.set("c", "antigo", generation)
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidation_channel_between_workers(create_test_data, tmp_path):
+    """Testa que a invalidação publicada por um worker chega ao outro."""
+    store_id = create_test_data["store1"].id
+    worker_a = ReferenceDataCache(max_entries=100, ttl=300)
+    worker_b = ReferenceDataCache(max_entries=100, ttl=300)
+    worker_a.start_channel(str(tmp_path))
+    worker_b.start_channel(str(tmp_path))
+    try:
+        db = TestingSessionLocal()
+        worker_b.get(db, Store, store_id)
+        db.close()
+        assert worker_b.stats()["stores"]["entries"] == 1
+
+        worker_a.invalidate(Store, store_id)
+        deadline = time.monotonic() + 2
+        while worker_b.stats()["stores"]["entries"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert worker_b.stats()["stores"]["entries"] == 0
+    finally:
+        worker_a.stop_channel()
+        worker_b.stop_channel()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,130 @@
+"""
+Testes das reservas de estoque (vendas pendentes com prazo de validade).
+"""
+from datetime import datetime, timedelta
+from app.models import Sale, StockMovement, StockReservation, StockStore
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client
+
+
+def _stock_in(data, quantity=10):
+    db = TestingSessionLocal()
+    StockService.register_movement(db, data["product"].id, data["store1"].id, "entry", quantity)
+    db.commit()
+    db.close()
+
+
+def _sale(data, quantity, reserve=True):
+    return client.post("/sales", params={"reserve": reserve}, json={
+        "client_id": data["client"].id,
+        "store_id": data["store1"].id,
+        "items": [{"product_id": data["product"].id, "quantity": quantity, "unit_price": 3000.0}],
+    })
+
+
+def _stock(data):
+    db = TestingSessionLocal()
+    stock = db.query(StockStore).filter(
+        StockStore.store_id == data["store1"].id,
+        StockStore.product_id == data["product"].id,
+    ).one()
+    db.close()
+    return stock.quantity, stock.reserved
+
+
+def test_reserve_confirm_and_release(create_test_data):
+    """Testa que a reserva bloqueia a disponibilidade e só baixa o saldo na confirmação."""
+    data = create_test_data
+    _stock_in(data)
+
+    reserved = _sale(data, 6)
+    assert reserved.status_code == 201
+    assert _stock(data) == (10, 6)
+
+    # Unidades reservadas não podem ser vendidas nem reservadas de novo
+    assert _sale(data, 5, reserve=False).status_code == 400
+    assert _sale(data, 5).status_code == 400
+    assert _sale(data, 4, reserve=False).status_code == 201
+    assert _stock(data) == (6, 6)
+
+    sale_id = reserved.json()["id"]
+    confirmed = client.post(f"/sales/{sale_id}/confirm")
+    assert confirmed.status_code == 200
+    assert confirmed.json()["status"] == "confirmed"
+    assert _stock(data) == (0, 0)
+    assert client.post(f"/sales/{sale_id}/confirm").status_code == 409
+
+    db = TestingSessionLocal()
+    movement = db.query(StockMovement).filter(StockMovement.reference_id == sale_id).one()
+    assert (movement.movement_type, movement.quantity, movement.stock_before, movement.stock_after) == (
+        "sale", 6, 6, 0,
+    )
+    db.close()
+
+    # Liberação e exclusão devolvem a disponibilidade
+    _stock_in(data, 5)
+    released = _sale(data, 3).json()["id"]
+    deleted = _sale(data, 2).json()["id"]
+    assert _stock(data) == (5, 5)
+    assert client.post(f"/sales/{released}/release").json()["status"] == "cancelled"
+    assert client.delete(f"/sales/{deleted}").status_code == 204
+    assert _stock(data) == (5, 0)
+
+
+def test_sweeper_expires_in_batches(create_test_data):
+    """Testa a expiração em lotes das reservas vencidas e das vendas pendentes."""
+    data = create_test_data
+    _stock_in(data)
+    sale_ids = [_sale(data, 2).json()["id"] for _ in range(3)]
+    assert _stock(data) == (10, 6)
+
+    db = TestingSessionLocal()
+    db.query(StockReservation).filter(StockReservation.reference_id.in_(sale_ids[:2])).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False,
+    )
+    db.commit()
+
+    assert StockService.expire_reservations(db, limit=1) == 1
+    db.commit()
+    assert StockService.expire_reservations(db, limit=1) == 1
+    db.commit()
+    assert StockService.expire_reservations(db, limit=1) == 0
+    statuses = dict(db.query(Sale.id, Sale.status))
+    db.close()
+
+    assert [statuses[sale_id] for sale_id in sale_ids] == ["expired", "expired", "pending"]
+    assert _stock(data) == (10, 2)
+    # Uma reserva vencida não pode mais ser confirmada, mesmo antes da varredura
+    assert client.post(f"/sales/{sale_ids[0]}/confirm").status_code == 409
+    db = TestingSessionLocal()
+    db.query(StockReservation).filter(StockReservation.reference_id == sale_ids[2]).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False,
+    )
+    db.commit()
+    db.close()
+    response = client.post(f"/sales/{sale_ids[2]}/confirm")
+    assert response.status_code == 409
+    assert "vencida" in response.json()["detail"]
+    assert _stock(data) == (10, 2)
+
+
+def test_inbound_movements_below_reserved(create_test_data):
+    """Testa que estornos e entradas não são recusados com o saldo abaixo do reservado."""
+    data = create_test_data
+    _stock_in(data)
+    sold = _sale(data, 3, reserve=False).json()["id"]
+    _sale(data, 7)
+    assert _stock(data) == (7, 7)
+
+    # Saldo abaixo do reservado (ex.: contagem lançada antes desta validação)
+    db = TestingSessionLocal()
+    db.query(StockStore).filter(
+        StockStore.store_id == data["store1"].id,
+        StockStore.product_id == data["product"].id,
+    ).update({"quantity": 2}, synchronize_session=False)
+    db.commit()
+    db.close()
+
+    assert client.put(f"/sales/{sold}", params={"status": "cancelled"}).status_code == 200
+    assert _stock(data) == (5, 7)
+    assert _sale(data, 1, reserve=False).status_code == 400
@@ -0,0 +1,120 @@
+"""
+Testes para POST /sales/batch (vendas em lote).
+"""
+from app.models import Sale, SaleItem, StockMovement, StockStore
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client, count_queries
+
+
+def _seed_stock(data, quantity):
+    db = TestingSessionLocal()
+    StockService.register_movements(db, [
+        {"product_id": data["product"].id, "store_id": data["store1"].id,
+         "movement_type": "entry", "quantity": quantity},
+        {"product_id": data["product2"].id, "store_id": data["store1"].id,
+         "movement_type": "entry", "quantity": quantity},
+    ])
+    db.commit()
+    db.close()
+
+
+def _sale(data, product_key="product", quantity=1, **overrides):
+    sale = {
+        "client_id": data["client"].id,
+        "store_id": data["store1"].id,
+        "items": [{"product_id": data[product_key].id, "quantity": quantity, "unit_price": 10.0}],
+    }
+    sale.update(overrides)
+    return sale
+
+
+def test_batch_reports_per_sale_results(create_test_data):
+    """Testa sucesso e falha por venda, com o saldo encadeado dentro do lote."""
+    data = create_test_data
+    _seed_stock(data, 5)
+
+    response = client.post("/sales/batch", json={"sales": [
+        _sale(data, quantity=3),
+        _sale(data, quantity=3),                 # só restam 2
+        _sale(data, quantity=2),
+        _sale(data, client_id=9999),
+        _sale(data, "product2", quantity=1, items=[
+            {"product_id": data["product2"].id, "quantity": 1, "unit_price": 5.0},
+            {"product_id": 9999, "quantity": 1, "unit_price": 5.0},
+        ]),
+        _sale(data, "product2", quantity=4),
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (6, 3, 3)
+    results = body["results"]
+    assert [r["success"] for r in results] == [True, False, True, False, False, True]
+    assert "Estoque insuficiente" in results[1]["error"]
+    assert "Disponível: 2, Solicitado: 3" in results[1]["error"]
+    assert "Cliente 9999" in results[3]["error"]
+    assert "Produto 9999" in results[4]["error"]
+
+    db = TestingSessionLocal()
+    assert db.query(Sale).count() == 3
+    assert db.query(SaleItem).count() == 3
+    balances = {s.product_id: s.quantity for s in db.query(StockStore)}
+    assert balances == {data["product"].id: 0, data["product2"].id: 1}
+
+    movements = db.query(StockMovement).filter(StockMovement.movement_type == "sale").all()
+    assert {m.reference_id for m in movements} == {results[i]["sale_id"] for i in (0, 2, 5)}
+    first = next(m for m in movements if m.reference_id == results[0]["sale_id"])
+    assert (first.stock_before, first.stock_after) == (5, 2)
+    db.close()
+
+
+def test_batch_commits_in_chunks(create_test_data, monkeypatch):
+    """Testa que cada bloco é uma transação independente."""
+    data = create_test_data
+    _seed_stock(data, 100)
+    from app.services.sales_service import SalesService
+
+    original = SalesService.create_sales_chunk
+    calls = []
+
+    def failing_second_chunk(db, sales, start_index=0):
+        calls.append(start_index)
+        if len(calls) == 2:
+            original(db, sales, start_index)
+            raise RuntimeError("falha simulada")
+        return original(db, sales, start_index)
+
+    monkeypatch.setattr(SalesService, "create_sales_chunk", staticmethod(failing_second_chunk))
+    response = client.post(
+        "/sales/batch", params={"chunk_size": 2},
+        json={"sales": [_sale(data) for _ in range(5)]},
+    )
+
+    body = response.json()
+    assert calls == [0, 2, 4]
+    assert [r["success"] for r in body["results"]] == [True, True, False, False, True]
+    assert "falha simulada" in body["results"][2]["error"]
+
+    db = TestingSessionLocal()
+    assert db.query(Sale).count() == 3
+    assert StockService.get_stock_by_store_and_product(db, data["store1"].id, data["product"].id) == 97
+    db.close()
+
+
+def test_batch_query_count_is_independent_of_size(create_test_data):
+    """Testa que o número de instruções SQL não cresce com o número de vendas."""
+    data = create_test_data
+    _seed_stock(data, 1000)
+
+    with count_queries() as statements:
+        response = client.post("/sales/batch", json={
+            "sales": [_sale(data, "product" if i % 2 else "product2") for i in range(200)],
+        })
+    assert response.json()["succeeded"] == 200
+
+    # O SQLite não tem sentinela para INSERT ... RETURNING ordenado e grava uma
+    # linha por instrução; no Postgres o insertmanyvalues agrupa em lotes
+    reads_and_updates = [s for s in statements if not s.lstrip().startswith("INSERT")]
+    assert len(reads_and_updates) <= 10
+    inserts = [s for s in statements if s.lstrip().startswith("INSERT INTO sale_items")]
+    assert len(inserts) == 1
@@ -0,0 +1,108 @@
+"""
+Testes do profiler de SQL por requisição e do log de consultas lentas.
+"""
+import logging
+import pytest
+from app.core import sql_profiler
+from app.core.config import settings
+from app.models import Sale, SaleItem, Store
+from .conftest import TestingSessionLocal, client
+
+
+def _create_sales(data, count):
+    db = TestingSessionLocal()
+    for _ in range(count):
+        sale = Sale(client_id=data["client"].id, store_id=data["store1"].id)
+        db.add(sale)
+        db.flush()
+        db.add(SaleItem(sale_id=sale.id, product_id=data["product"].id, quantity=1, unit_price=1.0))
+    db.commit()
+    db.close()
+
+
+def test_profiling_is_opt_in(create_test_data):
+    """Testa que sem cabeçalho nem configuração não há Server-Timing."""
+    response = client.get("/products")
+    assert "server-timing" not in response.headers
+    assert sql_profiler.PROFILE_ID_HEADER not in response.headers
+
+
+def test_profile_header_returns_server_timing_and_report(create_test_data):
+    """Testa o relatório com instruções, ponto de chamada e Server-Timing."""
+    response = client.get(
+        f"/products/{create_test_data['product'].id}",
+        headers={sql_profiler.PROFILE_HEADER: "1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+    profile_id = response.headers[sql_profiler.PROFILE_ID_HEADER]
+    report = client.get(f"/metrics/sql-profiles/{profile_id}").json()
+    assert report["path"] == f"/products/{create_test_data['product'].id}"
+    assert report["status"] == 200
+    assert report["statement_count"] == 1
+    assert report["statements"][0]["sql"].lstrip().upper().startswith("SELECT")
+    assert report["statements"][0]["call_site"].startswith("app/routers/products.py:")
+    assert report["repeated"] == []
+
+    summaries = client.get("/metrics/sql-profiles").json()
+    assert summaries[0]["id"] == int(profile_id)
+
+
+def test_repeated_statements_are_flagged(create_test_data, monkeypatch):
+    """Testa que carregamentos preguiçosos repetidos aparecem em repeated (N+1)."""
+    monkeypatch.setattr(settings, "sql_profiling", True)
+    _create_sales(create_test_data, 3)
+
+    def lazy_items(db):
+        return [len(sale.items) for sale in db.query(Sale).all()]
+
+    profile = sql_profiler.SqlProfile("GET", "/teste")
+    token = sql_profiler.current_profile.set(profile)
+    db = TestingSessionLocal()
+    try:
+        assert lazy_items(db) == [1, 1, 1]
+    finally:
+        db.close()
+        sql_profiler.current_profile.reset(token)
+
+    repeated = profile.repeated()
+    assert len(repeated) == 1
+    assert repeated[0]["count"] == 3
+    assert "sale_items" in repeated[0]["sql"]
+    assert repeated[0]["call_sites"][0].startswith("test_sql_profiler.py:")
+
+    # A rota com selectinload não repete instruções
+    response = client.get("/sales")
+    report = client.get(f"/metrics/sql-profiles/{response.headers[sql_profiler.PROFILE_ID_HEADER]}").json()
+    assert report["repeated"] == []
+
+
+def test_slow_query_logged_with_plan(create_test_data, monkeypatch, caplog):
+    """Testa o log de consulta lenta com o plano de execução."""
+    monkeypatch.setattr(settings, "sql_slow_query_ms", 0.000001)
+    with caplog.at_level(logging.WARNING, logger=sql_profiler.__name__):
+        response = client.get(f"/products/{create_test_data['product'].id}")
+    assert response.status_code == 200
+
+    messages = [r.getMessage() for r in caplog.records if "Consulta lenta" in r.getMessage()]
+    assert messages
+    assert "FROM products" in messages[0]
+    assert "Plano:" in messages[0] and "EXPLAIN falhou" not in messages[0]
+
+
+def test_failed_explain_keeps_transaction(create_test_data):
+    """Testa que um EXPLAIN que falha é desfeito no savepoint, sem perder a transação."""
+    db = TestingSessionLocal()
+    db.add(Store(name="Loja Nova", address="Rua C, 300"))
+    db.flush()
+    with pytest.raises(Exception):
+        sql_profiler.explain(db.connection(), "SELECT * FROM tabela_inexistente", ())
+
+    assert db.query(Store).filter(Store.name == "Loja Nova").count() == 1
+    db.commit()
+    db.close()
+    db = TestingSessionLocal()
+    assert db.query(Store).filter(Store.name == "Loja Nova").count() == 1
+    db.close()
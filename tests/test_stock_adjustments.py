@@ -0,0 +1,113 @@
+"""
+Testes dos ajustes manuais de estoque via razão (PUT /stock/{id} e POST /stock/adjustments).
+"""
+from app.models import StockMovement, StockStore, StockSummary
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client
+
+
+def _seed(data):
+    db = TestingSessionLocal()
+    StockService.register_movements(db, [
+        {"product_id": data["product"].id, "store_id": data["store1"].id, "movement_type": "entry", "quantity": 10},
+        {"product_id": data["product2"].id, "store_id": data["store1"].id, "movement_type": "entry", "quantity": 4},
+    ])
+    db.commit()
+    stock_id = db.query(StockStore.id).filter(StockStore.product_id == data["product"].id).scalar()
+    db.close()
+    return stock_id
+
+
+def _adjustments():
+    db = TestingSessionLocal()
+    rows = [
+        (m.store_id, m.product_id, m.movement_type, m.quantity, m.stock_before, m.stock_after)
+        for m in db.query(StockMovement).filter(
+            StockMovement.reference_type == "adjustment"
+        ).order_by(StockMovement.id)
+    ]
+    db.close()
+    return rows
+
+
+def test_put_stock_posts_adjustment(create_test_data):
+    """Testa que PUT e DELETE em /stock lançam ajustes em vez de sobrescrever o saldo."""
+    data = create_test_data
+    s1, p1 = data["store1"].id, data["product"].id
+    stock_id = _seed(data)
+
+    response = client.put(f"/stock/{stock_id}", json={"quantity": 7})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 7
+    # Mesma contagem não gera movimentação
+    client.put(f"/stock/{stock_id}", json={"quantity": 7})
+    assert client.put(f"/stock/{stock_id}", json={"quantity": -1}).status_code == 422
+
+    assert client.delete(f"/stock/{stock_id}").status_code == 204
+    assert _adjustments() == [
+        (s1, p1, "adjustment_out", 3, 10, 7),
+        (s1, p1, "adjustment_out", 7, 7, 0),
+    ]
+
+
+def test_cycle_count(create_test_data):
+    """Testa a contagem em lote: ajustes, resumo atualizado e validação."""
+    data = create_test_data
+    s1, s2 = data["store1"].id, data["store2"].id
+    p1, p2 = data["product"].id, data["product2"].id
+    _seed(data)
+
+    response = client.post("/stock/adjustments", json={"items": [
+        {"store_id": s1, "product_id": p1, "quantity": 10},
+        {"store_id": s1, "product_id": p2, "quantity": 6},
+        {"store_id": s2, "product_id": p1, "quantity": 2},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["counted"], body["adjusted"]) == (3, 2)
+    assert _adjustments() == [
+        (s1, p2, "adjustment_in", 2, 4, 6),
+        (s2, p1, "adjustment_in", 2, 0, 2),
+    ]
+
+    db = TestingSessionLocal()
+    units = dict(db.query(StockSummary.store_id, StockSummary.total_units))
+    db.close()
+    assert units == {s1: 16, s2: 2}
+
+    # Item repetido ou referência inexistente rejeitam a contagem inteira
+    duplicated = client.post("/stock/adjustments", json={"items": [
+        {"store_id": s1, "product_id": p1, "quantity": 1},
+        {"store_id": s1, "product_id": p1, "quantity": 2},
+    ]})
+    assert duplicated.status_code == 400
+    unknown = client.post("/stock/adjustments", json={"items": [
+        {"store_id": s1, "product_id": p1, "quantity": 1},
+        {"store_id": 999, "product_id": p1, "quantity": 1},
+    ]})
+    assert unknown.status_code == 400
+    assert len(_adjustments()) == 2
+
+
+def test_count_below_reserved_is_rejected(create_test_data):
+    """Testa que uma contagem abaixo das unidades reservadas é recusada (PUT e lote)."""
+    data = create_test_data
+    s1, p1 = data["store1"].id, data["product"].id
+    stock_id = _seed(data)
+    client.post("/sales", params={"reserve": True}, json={
+        "client_id": data["client"].id,
+        "store_id": s1,
+        "items": [{"product_id": p1, "quantity": 7, "unit_price": 3000.0}],
+    })
+
+    response = client.put(f"/stock/{stock_id}", json={"quantity": 2})
+    assert response.status_code == 400
+    assert "reservada" in response.json()["detail"]
+    assert client.post("/stock/adjustments", json={"items": [
+        {"store_id": s1, "product_id": p1, "quantity": 6},
+    ]}).status_code == 400
+    assert client.delete(f"/stock/{stock_id}").status_code == 409
+    assert _adjustments() == []
+
+    # Contar exatamente o reservado é aceito
+    assert client.put(f"/stock/{stock_id}", json={"quantity": 7}).json()["quantity"] == 7
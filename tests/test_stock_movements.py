@@ -7,119 +7,9 @@ Estes testes validam:
 3. Criação de venda com validação de estoque insuficiente
 """
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.main import app
-from app.db.database import Base, get_db
-from app.models import (
-    Client, Category, Product, Supplier, Store,
-    StockStore, StockMovement
-)
-
-# Usar banco de dados em memória para testes
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-
-def override_get_db():
-    """Override da dependência get_db para usar banco de testes."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-client = TestClient(app)
-
-
-@pytest.fixture(autouse=True)
-def setup_database():
-    """Setup do banco de dados para cada teste."""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture
-def create_test_data():
-    """Cria dados de teste."""
-    db = TestingSessionLocal()
-    
-    # Criar categoria
-    category = Category(name="Eletrônicos", description="Produtos eletrônicos")
-    db.add(category)
-    db.flush()
-    
-    # Criar produto
-    product = Product(
-        name="Notebook",
-        description="Notebook de 15 polegadas",
-        cost_price=2000.0,
-        sale_price=3000.0,
-        active=True,
-        category_id=category.id,
-    )
-    db.add(product)
-    db.flush()
-    
-    # Criar segundo produto
-    product2 = Product(
-        name="Mouse",
-        description="Mouse sem fio",
-        cost_price=50.0,
-        sale_price=100.0,
-        active=True,
-        category_id=category.id,
-    )
-    db.add(product2)
-    db.flush()
-    
-    # Criar fornecedor
-    supplier = Supplier(
-        name="Tech Supplies",
-        cnpj="12.345.678/0001-00",
-        contact_info="contato@techsupplies.com",
-    )
-    db.add(supplier)
-    db.flush()
-    
-    # Criar lojas
-    store1 = Store(name="Loja Centro", address="Rua A, 100")
-    store2 = Store(name="Loja Zona Leste", address="Rua B, 200")
-    db.add(store1)
-    db.add(store2)
-    db.flush()
-    
-    # Criar cliente
-    client_obj = Client(
-        name="João Silva",
-        cpf_cnpj="123.456.789-00",
-        email="joao@example.com",
-        phone="11999999999",
-    )
-    db.add(client_obj)
-    db.flush()
-    
-    db.commit()
-    
-    return {
-        "category": category,
-        "product": product,
-        "product2": product2,
-        "supplier": supplier,
-        "store1": store1,
-        "store2": store2,
-        "client": client_obj,
-    }
+from app.models import StockStore, StockMovement
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client
 
 
 def test_create_entry_with_stock_movement(create_test_data):
@@ -392,3 +282,91 @@ def test_create_distribution_with_insufficient_stock(create_test_data):
     
     assert response.status_code == 400
     assert "Estoque insuficiente" in response.json()["detail"]
+
+
+def test_register_movements_batch_chains_repeated_products(create_test_data):
+    """Testa lote de movimentações com o mesmo produto repetido."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    store_id = data["store1"].id
+    product_id = data["product"].id
+    product2_id = data["product2"].id
+
+    db.add(StockStore(store_id=store_id, product_id=product_id, quantity=5))
+    db.commit()
+
+    movements = StockService.register_movements(db, [
+        {"product_id": product_id, "store_id": store_id, "movement_type": "entry", "quantity": 10},
+        {"product_id": product2_id, "store_id": store_id, "movement_type": "entry", "quantity": 3},
+        {"product_id": product_id, "store_id": store_id, "movement_type": "sale", "quantity": 4},
+    ])
+    db.commit()
+
+    assert [(m.stock_before, m.stock_after) for m in movements] == [(5, 15), (0, 3), (15, 11)]
+    assert StockService.get_stock_by_store_and_product(db, store_id, product_id) == 11
+    assert StockService.get_stock_by_store_and_product(db, store_id, product2_id) == 3
+    assert db.query(StockMovement).count() == 3
+
+    db.close()
+
+
+def test_register_movements_rejects_invalid_type(create_test_data):
+    """Testa que um tipo inválido no lote não altera o estoque."""
+    data = create_test_data
+    db = TestingSessionLocal()
+
+    with pytest.raises(ValueError):
+        StockService.register_movements(db, [
+            {"product_id": data["product"].id, "store_id": data["store1"].id,
+             "movement_type": "entry", "quantity": 10},
+            {"product_id": data["product"].id, "store_id": data["store1"].id,
+             "movement_type": "invalid", "quantity": 1},
+        ])
+
+    assert db.query(StockStore).count() == 0
+    assert db.query(StockMovement).count() == 0
+
+    db.close()
+
+
+def test_register_movements_creates_new_key_once(create_test_data, monkeypatch):
+    """Testa a criação do saldo de uma chave nova repetida no lote e disputada por outra sessão."""
+    data = create_test_data
+    store_id = data["store1"].id
+    product_id = data["product"].id
+    entry = {"product_id": product_id, "store_id": store_id, "movement_type": "entry"}
+
+    db = TestingSessionLocal()
+    movements = StockService.register_movements(db, [{**entry, "quantity": 3}, {**entry, "quantity": 2}])
+    db.commit()
+    assert [(m.stock_before, m.stock_after) for m in movements] == [(0, 3), (3, 5)]
+    assert db.query(StockStore).count() == 1
+
+    # Outra sessão cria o saldo de product2 entre o bloqueio (que não o
+    # encontrou) e a criação: a chave não é duplicada nem gera erro
+    product2_id = data["product2"].id
+    lock_stocks = StockService._lock_stocks
+    raced = []
+
+    def racing_lock_stocks(session, keys):
+        stocks = lock_stocks(session, keys)
+        if not raced:
+            raced.append(True)
+            other = TestingSessionLocal()
+            StockService.register_movements(other, [
+                {"product_id": product2_id, "store_id": store_id, "movement_type": "entry", "quantity": 4},
+            ])
+            other.commit()
+            other.close()
+        return stocks
+
+    monkeypatch.setattr(StockService, "_lock_stocks", staticmethod(racing_lock_stocks))
+    movements = StockService.register_movements(db, [
+        {"product_id": product2_id, "store_id": store_id, "movement_type": "entry", "quantity": 6},
+    ])
+    db.commit()
+
+    assert [(m.stock_before, m.stock_after) for m in movements] == [(4, 10)]
+    assert db.query(StockStore).filter(StockStore.product_id == product2_id).count() == 1
+    assert StockService.get_stock_by_store_and_product(db, store_id, product2_id) == 10
+    db.close()
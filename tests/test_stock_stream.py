@@ -0,0 +1,89 @@
+"""
+Testes do fluxo de eventos de estoque (GET /stock/stream).
+"""
+import asyncio
+import json
+from app.core.stock_events import DROPPED, StockEventBroker, stock_event_broker, stream_stock_events
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal
+
+
+def _entry(data, store_key="store1", quantity=5):
+    return {
+        "product_id": data["product"].id,
+        "store_id": data[store_key].id,
+        "movement_type": "entry",
+        "quantity": quantity,
+    }
+
+
+def test_events_are_published_only_after_commit(create_test_data):
+    """Testa publicação após commit, descarte no rollback e filtro por loja."""
+    data = create_test_data
+
+    async def scenario():
+        store1 = stock_event_broker.subscribe(store_id=data["store1"].id)
+        everything = stock_event_broker.subscribe()
+        db = TestingSessionLocal()
+        try:
+            StockService.register_movements(db, [_entry(data, quantity=2)])
+            db.rollback()
+
+            StockService.register_movements(db, [_entry(data), _entry(data, "store2")])
+            await asyncio.sleep(0)
+            assert everything.queue.empty()
+            db.commit()
+        finally:
+            db.close()
+        await asyncio.sleep(0)
+
+        received = [store1.queue.get_nowait() for _ in range(store1.queue.qsize())]
+        assert [(e["store_id"], e["quantity"], e["balance"]) for e in received] == [
+            (data["store1"].id, 5, 5),
+        ]
+        assert everything.queue.qsize() == 2
+        stock_event_broker.unsubscribe(store1)
+        stock_event_broker.unsubscribe(everything)
+
+    asyncio.run(scenario())
+    assert stock_event_broker.subscriber_count() == 0
+
+
+def test_slow_consumer_is_dropped():
+    """Testa que um assinante com a fila cheia é desconectado sem afetar os demais."""
+    broker = StockEventBroker()
+    event = {"id": 1, "store_id": 1, "product_id": 1}
+
+    async def scenario():
+        slow = broker.subscribe(queue_size=2)
+        fast = broker.subscribe(queue_size=10)
+        broker.publish([event, event, event])
+        await asyncio.sleep(0)
+        assert slow.queue.get_nowait() is DROPPED
+        assert fast.queue.qsize() == 3
+        assert broker.subscriber_count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_sse_body():
+    """Testa o formato text/event-stream, o heartbeat e o encerramento por lentidão."""
+    broker = StockEventBroker()
+
+    async def scenario():
+        subscription = broker.subscribe(queue_size=1)
+        stream = stream_stock_events(subscription, heartbeat=0.01)
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        assert await stream.__anext__() == ": ping\n\n"
+
+        broker.publish([{"id": 7, "store_id": 1, "product_id": 2, "balance": 3}])
+        chunk = await stream.__anext__()
+        assert chunk.startswith("event: stock\nid: 7\ndata: ")
+        assert json.loads(chunk.split("data: ")[1])["balance"] == 3
+
+        broker.publish([{"id": 8, "store_id": 1, "product_id": 2}] * 2)
+        await asyncio.sleep(0)
+        assert (await stream.__anext__()).startswith("event: dropped")
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
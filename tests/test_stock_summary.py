@@ -0,0 +1,80 @@
+"""
+Testes para o resumo materializado de estoque por loja e categoria.
+"""
+import pytest
+from app.models import StockStore, StockSummary
+from app.services.stock_service import StockService
+from app.services.stock_summary_service import StockSummaryService
+from .conftest import TestingSessionLocal, client
+
+
+def _entry(data, product_key, store_key, quantity):
+    db = TestingSessionLocal()
+    StockService.register_movement(
+        db, data[product_key].id, data[store_key].id, "entry", quantity,
+    )
+    db.commit()
+    db.close()
+
+
+def test_summary_follows_movements(create_test_data):
+    """Testa que entradas e vendas atualizam unidades e valores por loja."""
+    data = create_test_data
+    _entry(data, "product", "store1", 10)   # custo 2000, venda 3000
+    _entry(data, "product2", "store1", 4)   # custo 50, venda 100
+    _entry(data, "product", "store2", 1)
+
+    db = TestingSessionLocal()
+    StockService.register_movement(db, data["product"].id, data["store1"].id, "sale", 3)
+    db.commit()
+    db.close()
+
+    summary = {row["store_id"]: row for row in client.get("/stock/summary").json()}
+    store1 = summary[data["store1"].id]
+    assert store1["total_units"] == 11
+    assert store1["cost_value"] == pytest.approx(7 * 2000.0 + 4 * 50.0)
+    assert store1["sale_value"] == pytest.approx(7 * 3000.0 + 4 * 100.0)
+    assert summary[data["store2"].id]["total_units"] == 1
+
+    by_category = client.get(
+        "/stock/summary", params={"by_category": True, "store_id": data["store1"].id},
+    ).json()
+    assert [row["category_id"] for row in by_category] == [data["category"].id]
+
+
+def test_summary_reprices_and_matches_rebuild(create_test_data):
+    """Testa reavaliação por mudança de preço e consistência com o recálculo."""
+    data = create_test_data
+    _entry(data, "product", "store1", 5)
+    _entry(data, "product", "store2", 2)
+
+    response = client.put(f"/products/{data['product'].id}", json={"cost_price": 1000.0})
+    assert response.status_code == 200
+
+    incremental = client.get("/stock/summary").json()
+    assert sum(row["cost_value"] for row in incremental) == pytest.approx(7 * 1000.0)
+
+    rebuilt = client.post("/stock/summary/rebuild").json()
+    assert rebuilt == incremental
+
+
+def test_rebuild_covers_direct_balances(create_test_data):
+    """Testa o recálculo para saldos criados fora do StockService."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    db.add(StockStore(store_id=data["store1"].id, product_id=data["product2"].id, quantity=8))
+    db.commit()
+    assert db.query(StockSummary).count() == 0
+
+    StockSummaryService.rebuild(db)
+    db.commit()
+    db.close()
+
+    summary = client.get("/stock/summary").json()
+    assert summary == [{
+        "store_id": data["store1"].id,
+        "category_id": None,
+        "total_units": 8,
+        "cost_value": pytest.approx(400.0),
+        "sale_value": pytest.approx(800.0),
+    }]
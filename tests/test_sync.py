@@ -0,0 +1,108 @@
+"""
+Testes da sincronização incremental (GET /sync).
+"""
+import pytest
+from app.core.config import settings
+from app.models import Product
+from app.services.stock_service import StockService
+from .conftest import TestingSessionLocal, client
+
+
+@pytest.fixture(autouse=True)
+def no_settle_window(monkeypatch):
+    # Movimentações dos testes são imediatamente consideradas confirmadas
+    monkeypatch.setattr(settings, "sync_settle_seconds", -1)
+
+
+def _entry(data, product_key, store_key="store1", quantity=1):
+    db = TestingSessionLocal()
+    StockService.register_movements(db, [{
+        "product_id": data[product_key].id, "store_id": data[store_key].id,
+        "movement_type": "entry", "quantity": quantity,
+    }])
+    db.commit()
+    db.close()
+
+
+def _sync_all(store_id, token=None, limit=500):
+    products, stock, pages = [], [], 0
+    while True:
+        params = {"store_id": store_id, "limit": limit}
+        if token:
+            params["since"] = token
+        response = client.get("/sync", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        products += body["products"]
+        stock += body["stock"]
+        token = body["token"]
+        pages += 1
+        if not body["has_more"]:
+            return products, stock, token, pages
+
+
+def test_delta_contains_only_changes(create_test_data):
+    """Testa a sincronização completa e o delta de produtos, preços e saldos."""
+    data = create_test_data
+    store_id = data["store1"].id
+    _entry(data, "product")
+    _entry(data, "product2")
+    _entry(data, "product", "store2")
+
+    products, stock, token, _ = _sync_all(store_id)
+    assert {p["name"] for p in products} == {"Notebook", "Mouse"}
+    assert {(s["product_id"], s["quantity"]) for s in stock} == {
+        (data["product"].id, 1), (data["product2"].id, 1),
+    }
+
+    # Nada mudou
+    products, stock, token, _ = _sync_all(store_id, token)
+    assert (products, stock) == ([], [])
+
+    # Novo preço e movimentação apenas do Mouse na loja 1 (e outra na loja 2)
+    client.put(f"/products/{data['product2'].id}", json={"sale_price": 120.0})
+    _entry(data, "product2", quantity=4)
+    _entry(data, "product", "store2")
+    products, stock, token, _ = _sync_all(store_id, token)
+    assert [(p["name"], p["sale_price"]) for p in products] == [("Mouse", 120.0)]
+    assert [(s["product_id"], s["quantity"]) for s in stock] == [(data["product2"].id, 5)]
+
+    assert _sync_all(store_id, token)[:2] == ([], [])
+
+
+def test_first_sync_is_paged(create_test_data):
+    """Testa a divisão da primeira sincronização em páginas."""
+    data = create_test_data
+    db = TestingSessionLocal()
+    db.add_all([Product(name=f"Item {i}", cost_price=1, sale_price=2) for i in range(5)])
+    db.commit()
+    db.close()
+    _entry(data, "product")
+    _entry(data, "product2")
+
+    products, stock, _, pages = _sync_all(data["store1"].id, limit=3)
+    assert len(products) == 7
+    assert len({p["id"] for p in products}) == 7
+    assert len(stock) == 2
+    assert pages == 3
+
+
+def test_recent_movements_are_resent(create_test_data, monkeypatch):
+    """Testa que o token não avança além de movimentações ainda recentes."""
+    monkeypatch.setattr(settings, "sync_settle_seconds", 3600)
+    data = create_test_data
+    _entry(data, "product")
+    _, stock, token, _ = _sync_all(data["store1"].id)
+    assert len(stock) == 1
+    # A movimentação ainda pode ter concorrentes em aberto: o saldo volta no próximo delta
+    assert len(_sync_all(data["store1"].id, token)[1]) == 1
+
+
+def test_token_of_another_store(create_test_data):
+    """Testa token de outra loja e token inválido."""
+    data = create_test_data
+    token = client.get("/sync", params={"store_id": data["store1"].id}).json()["token"]
+    response = client.get("/sync", params={"store_id": data["store2"].id, "since": token})
+    assert response.status_code == 400
+    assert client.get("/sync", params={"store_id": data["store1"].id, "since": "xx"}).status_code == 400
+    assert client.get("/sync", params={"store_id": 9999}).status_code == 404